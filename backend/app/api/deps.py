@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
@@ -8,16 +9,13 @@ from sqlmodel import select
 
 from app.core.config import settings
 from app.core.security import verify_token
-from app.db import SessionDep
+from app.db import AsyncSessionDep, SessionDep
 from app.models import User, UserDepartment, Department
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_current_user(
-    session: SessionDep,
-    token: str = Depends(oauth2_scheme),
-) -> User:
+def _user_id_from_token(token: str) -> UUID:
     try:
         payload = verify_token(token, token_type="access")
         user_id = payload.get("sub")
@@ -34,9 +32,10 @@ def get_current_user(
             detail="Invalid authentication payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return UUID(user_id)
+
 
-    statement = select(User).where(User.id == UUID(user_id))
-    user = session.exec(statement).one_or_none()
+def _ensure_active(user: Optional[User]) -> User:
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,6 +45,23 @@ def get_current_user(
     return user
 
 
+def get_current_user(
+    session: SessionDep,
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    statement = select(User).where(User.id == _user_id_from_token(token))
+    return _ensure_active(session.exec(statement).one_or_none())
+
+
+async def get_current_user_async(
+    session: AsyncSessionDep,
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """Same as :func:`get_current_user` for ``async def`` endpoints using ``AsyncSessionDep``."""
+    statement = select(User).where(User.id == _user_id_from_token(token))
+    return _ensure_active((await session.exec(statement)).one_or_none())
+
+
 def is_admin_or_it(user: User, session: SessionDep) -> bool:
     """
     Check if user has admin rights:
@@ -75,3 +91,16 @@ def is_admin_or_it(user: User, session: SessionDep) -> bool:
     
     return False
 
+
+async def is_admin_or_it_async(user: User, session: AsyncSessionDep) -> bool:
+    """Same as :func:`is_admin_or_it` for ``async def`` endpoints using ``AsyncSessionDep``."""
+    if user.role == "admin":
+        return True
+    names = (
+        await session.exec(
+            select(Department.name)
+            .join(UserDepartment, UserDepartment.department_id == Department.id)
+            .where(UserDepartment.user_id == user.id)
+        )
+    ).all()
+    return any(name and ("ит" in name.lower() or "it" in name.lower()) for name in names)
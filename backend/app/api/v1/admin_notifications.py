@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime, timedelta, timezone
 from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import and_, or_
 from sqlmodel import select
 
-from app.api.deps import SessionDep, get_current_user, is_admin_or_it
+from app.api.deps import SessionDep, get_current_user, get_current_user_async, is_admin_or_it
+from app.db import AsyncSessionDep
 from app.models import (
     AdminNotification,
     AdminNotificationDismissal,
-    Department,
+    AdminNotificationTarget,
+    AdminNotificationTargetType,
     User,
     UserDepartment,
 )
@@ -20,9 +24,59 @@ from app.schemas.admin_notification import (
     AdminNotificationDismiss,
     AdminNotificationRead,
 )
+from app.services.cache import (
+    ADMIN_NOTIFICATIONS_VERSION,
+    VersionedCache,
+    bump_cache_version,
+    get_cache_version_async,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Активные уведомления «для всех», ключ версии — ADMIN_NOTIFICATIONS_VERSION
+_broadcast_cache = VersionedCache(maxsize=4)
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _serialize_notification(notification: AdminNotification) -> AdminNotificationRead:
+    return AdminNotificationRead(
+        id=notification.id,
+        title=notification.title,
+        message=notification.message,
+        created_by=notification.created_by,
+        created_at=_as_utc(notification.created_at),
+        target_user_ids=[UUID(str(uid)) for uid in (notification.target_user_ids or [])],
+        target_department_ids=[UUID(str(did)) for did in (notification.target_department_ids or [])],
+        display_duration_hours=notification.display_duration_hours,
+        expires_at=_as_utc(notification.expires_at),
+        is_active=notification.is_active,
+        is_dismissed=False,
+    )
+
+
+async def _get_broadcast_notifications(session: AsyncSessionDep) -> List[AdminNotificationRead]:
+    """Active broadcast notifications, cached per version (expiry is checked by the caller)."""
+    version = await get_cache_version_async(session, ADMIN_NOTIFICATIONS_VERSION)
+    cached = _broadcast_cache.get("broadcast", version)
+    if cached is None:
+        notifications = (
+            await session.exec(
+                select(AdminNotification)
+                .where(AdminNotification.is_active == True, AdminNotification.is_broadcast == True)
+                .order_by(AdminNotification.created_at.desc())
+            )
+        ).all()
+        cached = [_serialize_notification(notification) for notification in notifications]
+        _broadcast_cache.set("broadcast", version, cached)
+    return cached
+
 
 @router.get("/test", summary="Test endpoint")
 def test_endpoint():
@@ -42,29 +96,11 @@ def create_admin_notification(
     current_user: User = Depends(get_current_user),
 ) -> AdminNotificationRead:
     """Create a new admin notification."""
-    print(f"\n[DEBUG] ===== Creating notification =====")
-    print(f"[DEBUG] User: {current_user.id} ({current_user.email})")
-    print(f"[DEBUG] Payload type: {type(payload)}")
-    print(f"[DEBUG] Payload: {payload.model_dump()}")
-    
     # Проверяем права доступа
-    try:
-        is_admin = is_admin_or_it(current_user, session)
-        print(f"[DEBUG] User is_admin_or_it: {is_admin}")
-        if not is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only admins can create notifications",
-            )
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"[ERROR] Error checking admin rights: {e}")
-        import traceback
-        traceback.print_exc()
+    if not is_admin_or_it(current_user, session):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error checking permissions: {str(e)}",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can create notifications",
         )
 
     # Вычисляем время окончания
@@ -72,64 +108,55 @@ def create_admin_notification(
     if payload.display_duration_hours > 0:
         expires_at = datetime.now(timezone.utc) + timedelta(hours=payload.display_duration_hours)
 
-    # Создаем уведомление
+    target_user_ids = list(dict.fromkeys(payload.target_user_ids or []))
+    target_department_ids = list(dict.fromkeys(payload.target_department_ids or []))
+
     try:
-        print(f"[DEBUG] Preparing notification data...")
-        print(f"[DEBUG] target_user_ids type: {type(payload.target_user_ids)}, value: {payload.target_user_ids}")
-        print(f"[DEBUG] target_department_ids type: {type(payload.target_department_ids)}, value: {payload.target_department_ids}")
-        
-        # Конвертируем UUID в строки для хранения в JSON
-        target_user_ids = [str(uid) if isinstance(uid, UUID) else str(uid) for uid in (payload.target_user_ids or [])]
-        target_department_ids = [str(did) if isinstance(did, UUID) else str(did) for did in (payload.target_department_ids or [])]
-        
-        print(f"[DEBUG] Converted target_user_ids: {target_user_ids}")
-        print(f"[DEBUG] Converted target_department_ids: {target_department_ids}")
-        print(f"[DEBUG] expires_at: {expires_at}, type: {type(expires_at)}")
-        
         notification = AdminNotification(
             title=payload.title,
             message=payload.message,
             created_by=current_user.id,
-            target_user_ids=target_user_ids,
-            target_department_ids=target_department_ids,
+            # JSON-копия получателей для ответа API; выборка идёт по admin_notification_targets
+            target_user_ids=[str(uid) for uid in target_user_ids],
+            target_department_ids=[str(did) for did in target_department_ids],
             display_duration_hours=payload.display_duration_hours,
             expires_at=expires_at,
             is_active=True,
+            is_broadcast=not target_user_ids and not target_department_ids,
         )
-        print(f"[DEBUG] Notification object created successfully")
         session.add(notification)
-        print(f"[DEBUG] Notification added to session")
+        session.flush()
+
+        session.add_all(
+            [
+                AdminNotificationTarget(
+                    notification_id=notification.id,
+                    target_type=AdminNotificationTargetType.USER,
+                    target_id=user_id,
+                )
+                for user_id in target_user_ids
+            ]
+            + [
+                AdminNotificationTarget(
+                    notification_id=notification.id,
+                    target_type=AdminNotificationTargetType.DEPARTMENT,
+                    target_id=department_id,
+                )
+                for department_id in target_department_ids
+            ]
+        )
+        bump_cache_version(session, ADMIN_NOTIFICATIONS_VERSION)
         session.commit()
-        print(f"[DEBUG] Session committed successfully")
         session.refresh(notification)
-        print(f"[DEBUG] Notification refreshed: id={notification.id}")
     except Exception as e:
-        print(f"[ERROR] Error creating notification: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creating admin notification")
         session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating notification: {str(e)}",
         )
 
-    # Конвертируем строки обратно в UUID для ответа
-    target_user_ids_uuid = [UUID(uid) for uid in (notification.target_user_ids or [])]
-    target_department_ids_uuid = [UUID(did) for did in (notification.target_department_ids or [])]
-    
-    return AdminNotificationRead(
-        id=notification.id,
-        title=notification.title,
-        message=notification.message,
-        created_by=notification.created_by,
-        created_at=notification.created_at,
-        target_user_ids=target_user_ids_uuid,
-        target_department_ids=target_department_ids_uuid,
-        display_duration_hours=notification.display_duration_hours,
-        expires_at=notification.expires_at,
-        is_active=notification.is_active,
-        is_dismissed=False,
-    )
+    return _serialize_notification(notification)
 
 
 @router.get(
@@ -137,216 +164,75 @@ def create_admin_notification(
     response_model=List[AdminNotificationRead],
     summary="Get active notifications for current user",
 )
-def get_user_notifications(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+async def get_user_notifications(
+    session: AsyncSessionDep,
+    current_user: User = Depends(get_current_user_async),
 ) -> List[AdminNotificationRead]:
     """Get active notifications for the current user."""
-    try:
-        print(f"[DEBUG] ===== START get_user_notifications =====")
-        print(f"[DEBUG] Getting notifications for user {current_user.id} ({current_user.email})")
-        now = datetime.now(timezone.utc)
-        print(f"[DEBUG] Current time: {now}")
+    now = datetime.now(timezone.utc)
+    # В БД время хранится без timezone (UTC)
+    now_naive = now.replace(tzinfo=None)
 
-        # Получаем все активные уведомления
-        try:
-            statement = select(AdminNotification).where(
-                AdminNotification.is_active == True
+    # Адресные уведомления: один запрос по индексу (target_type, target_id),
+    # скрытые пользователем и истёкшие отсекаются в SQL
+    user_department_ids = select(UserDepartment.department_id).where(
+        UserDepartment.user_id == current_user.id
+    )
+    targeted_ids = select(AdminNotificationTarget.notification_id).where(
+        or_(
+            and_(
+                AdminNotificationTarget.target_type == AdminNotificationTargetType.USER,
+                AdminNotificationTarget.target_id == current_user.id,
+            ),
+            and_(
+                AdminNotificationTarget.target_type == AdminNotificationTargetType.DEPARTMENT,
+                AdminNotificationTarget.target_id.in_(user_department_ids),
+            ),
+        )
+    )
+    targeted = (
+        await session.exec(
+            select(AdminNotification)
+            .outerjoin(
+                AdminNotificationDismissal,
+                and_(
+                    AdminNotificationDismissal.notification_id == AdminNotification.id,
+                    AdminNotificationDismissal.user_id == current_user.id,
+                ),
             )
-            notifications = session.exec(statement).all()
-            if notifications is None:
-                notifications = []
-            print(f"[DEBUG] Found {len(notifications)} active notifications")
-        except Exception as e:
-            print(f"[ERROR] Error loading notifications: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            notifications = []
-
-        # Если уведомлений нет, возвращаем пустой список
-        if not notifications or len(notifications) == 0:
-            print(f"[DEBUG] No notifications found, returning empty list")
-            return []
+            .where(
+                AdminNotification.is_active == True,
+                AdminNotification.is_broadcast == False,
+                or_(AdminNotification.expires_at.is_(None), AdminNotification.expires_at >= now_naive),
+                AdminNotification.id.in_(targeted_ids),
+                AdminNotificationDismissal.id.is_(None),
+            )
+            .order_by(AdminNotification.created_at.desc())
+        )
+    ).all()
+    result = [_serialize_notification(notification) for notification in targeted]
 
-        # Фильтруем по времени и получателям
-        user_notifications = []
-        try:
-            dismissed_results = session.exec(
-                select(AdminNotificationDismissal.notification_id).where(
-                    AdminNotificationDismissal.user_id == current_user.id
+    # Уведомления «для всех» из кэша; скрытые запрашиваем только среди них
+    broadcast = [
+        notification
+        for notification in await _get_broadcast_notifications(session)
+        if notification.expires_at is None or notification.expires_at >= now
+    ]
+    if broadcast:
+        dismissed_ids = set(
+            (
+                await session.exec(
+                    select(AdminNotificationDismissal.notification_id).where(
+                        AdminNotificationDismissal.user_id == current_user.id,
+                        AdminNotificationDismissal.notification_id.in_([n.id for n in broadcast]),
+                    )
                 )
             ).all()
-            # Убеждаемся, что все ID - это UUID объекты
-            dismissed_ids = set()
-            if dismissed_results:
-                for nid in dismissed_results:
-                    if isinstance(nid, UUID):
-                        dismissed_ids.add(nid)
-                    else:
-                        try:
-                            dismissed_ids.add(UUID(str(nid)))
-                        except (ValueError, TypeError):
-                            continue
-        except Exception as e:
-            print(f"[WARNING] Error loading dismissed notifications: {e}")
-            dismissed_ids = set()
-        print(f"[DEBUG] User has dismissed {len(dismissed_ids)} notifications")
-
-        for notification in notifications:
-            try:
-                print(f"[DEBUG] Processing notification {notification.id}")
-                
-                # Проверяем срок действия
-                if notification.expires_at:
-                    try:
-                        if notification.expires_at < now:
-                            print(f"[DEBUG] Notification {notification.id} expired")
-                            continue
-                    except Exception as e:
-                        print(f"[WARNING] Error checking expiration for notification {notification.id}: {e}")
-                        # Продолжаем обработку даже если есть проблема с expires_at
-
-                # Проверяем, скрыто ли пользователем
-                if notification.id in dismissed_ids:
-                    print(f"[DEBUG] Notification {notification.id} dismissed by user")
-                    continue
-
-                # Проверяем, является ли пользователь получателем
-                is_recipient = False
-
-                # Если оба списка пустые, уведомление для всех
-                target_user_ids = notification.target_user_ids or []
-                target_department_ids = notification.target_department_ids or []
-                
-                print(f"[DEBUG] Notification {notification.id}: target_user_ids={len(target_user_ids)}, target_department_ids={len(target_department_ids)}")
-                
-                if not target_user_ids and not target_department_ids:
-                    is_recipient = True
-                    print(f"[DEBUG] Notification {notification.id} is for everyone")
-                else:
-                    # Проверяем прямых получателей (конвертируем строки в UUID для сравнения)
-                    if target_user_ids:
-                        try:
-                            target_user_ids_uuid = set()
-                            for uid in target_user_ids:
-                                try:
-                                    target_user_ids_uuid.add(UUID(str(uid)))
-                                except (ValueError, TypeError):
-                                    continue
-                            if current_user.id in target_user_ids_uuid:
-                                is_recipient = True
-                        except Exception:
-                            pass
-
-                    # Проверяем получателей через отделы
-                    if not is_recipient and target_department_ids:
-                        try:
-                            user_departments = session.exec(
-                                select(UserDepartment).where(UserDepartment.user_id == current_user.id)
-                            ).all()
-                            user_dept_ids = {ud.department_id for ud in user_departments}
-                            target_dept_ids_uuid = set()
-                            for did in target_department_ids:
-                                try:
-                                    target_dept_ids_uuid.add(UUID(str(did)))
-                                except (ValueError, TypeError):
-                                    continue
-                            if user_dept_ids.intersection(target_dept_ids_uuid):
-                                is_recipient = True
-                        except Exception:
-                            pass
-
-                if is_recipient:
-                    # Конвертируем строки обратно в UUID для ответа
-                    target_user_ids_uuid = []
-                    for uid in (notification.target_user_ids or []):
-                        try:
-                            # Если уже UUID, используем как есть, иначе конвертируем из строки
-                            if isinstance(uid, UUID):
-                                target_user_ids_uuid.append(uid)
-                            else:
-                                target_user_ids_uuid.append(UUID(str(uid)))
-                        except (ValueError, TypeError, AttributeError):
-                            continue
-                    
-                    target_department_ids_uuid = []
-                    for did in (notification.target_department_ids or []):
-                        try:
-                            # Если уже UUID, используем как есть, иначе конвертируем из строки
-                            if isinstance(did, UUID):
-                                target_department_ids_uuid.append(did)
-                            else:
-                                target_department_ids_uuid.append(UUID(str(did)))
-                        except (ValueError, TypeError, AttributeError):
-                            continue
-                    
-                    # Создаем объект уведомления для чтения
-                    try:
-                        # Убеждаемся, что datetime объекты имеют timezone
-                        created_at = notification.created_at
-                        if created_at and created_at.tzinfo is None:
-                            created_at = created_at.replace(tzinfo=timezone.utc)
-                        
-                        expires_at = notification.expires_at
-                        if expires_at and expires_at.tzinfo is None:
-                            expires_at = expires_at.replace(tzinfo=timezone.utc)
-                        
-                        # Создаем объект уведомления для чтения
-                        notification_read = AdminNotificationRead(
-                            id=notification.id,
-                            title=notification.title,
-                            message=notification.message,
-                            created_by=notification.created_by,
-                            created_at=created_at,
-                            target_user_ids=target_user_ids_uuid,
-                            target_department_ids=target_department_ids_uuid,
-                            display_duration_hours=notification.display_duration_hours,
-                            expires_at=expires_at,
-                            is_active=notification.is_active,
-                            is_dismissed=notification.id in dismissed_ids,
-                        )
-                        user_notifications.append(notification_read)
-                        print(f"[DEBUG] Successfully added notification {notification.id} to user notifications")
-                    except Exception as e:
-                        print(f"[ERROR] Error creating AdminNotificationRead for notification {notification.id}: {type(e).__name__}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        continue
-            except Exception as e:
-                print(f"[ERROR] Error processing notification {notification.id}: {type(e).__name__}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Пропускаем это уведомление, но продолжаем обработку остальных
-                continue
+        )
+        result.extend(n for n in broadcast if n.id not in dismissed_ids)
 
-        print(f"[DEBUG] Returning {len(user_notifications)} notifications for user")
-        
-        # Убеждаемся, что возвращаем список
-        if not isinstance(user_notifications, list):
-            print(f"[WARNING] user_notifications is not a list, converting...")
-            user_notifications = list(user_notifications) if user_notifications else []
-        
-        print(f"[DEBUG] Final return: {len(user_notifications)} notifications, type: {type(user_notifications)}")
-        print(f"[DEBUG] ===== END get_user_notifications (SUCCESS) =====")
-        return user_notifications
-    except HTTPException as e:
-        print(f"[DEBUG] Re-raising HTTPException: {e.status_code} - {e.detail}")
-        print(f"[DEBUG] ===== END get_user_notifications (HTTPException) =====")
-        raise
-    except Exception as e:
-        print(f"[ERROR] ===== ERROR in get_user_notifications =====")
-        print(f"[ERROR] Error type: {type(e).__name__}")
-        print(f"[ERROR] Error message: {e}")
-        print(f"[ERROR] Error args: {e.args}")
-        import traceback
-        print(f"[ERROR] Traceback:")
-        traceback.print_exc()
-        print(f"[ERROR] ===== END ERROR =====")
-        # В случае ошибки возвращаем пустой список вместо 500 ошибки
-        # Это позволит фронтенду работать даже если есть проблемы с данными
-        print(f"[WARNING] Returning empty list due to error")
-        print(f"[DEBUG] ===== END get_user_notifications (ERROR -> empty list) =====")
-        return []
+    result.sort(key=lambda n: n.created_at, reverse=True)
+    return result
 
 
 @router.post(
@@ -360,12 +246,9 @@ def dismiss_notification(
     current_user: User = Depends(get_current_user),
 ):
     """Dismiss a notification for the current user."""
-    print(f"[DEBUG] Dismissing notification {notification_id} for user {current_user.id}")
-    
     # Проверяем, существует ли уведомление
     notification = session.get(AdminNotification, notification_id)
     if not notification:
-        print(f"[WARNING] Notification {notification_id} not found")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found",
@@ -380,16 +263,12 @@ def dismiss_notification(
     ).one_or_none()
 
     if not existing:
-        print(f"[DEBUG] Creating dismissal record for notification {notification_id}")
         dismissal = AdminNotificationDismissal(
             notification_id=notification_id,
             user_id=current_user.id,
         )
         session.add(dismissal)
         session.commit()
-        print(f"[DEBUG] Notification {notification_id} dismissed successfully")
-    else:
-        print(f"[DEBUG] Notification {notification_id} already dismissed")
+        logger.debug("Notification %s dismissed by user %s", notification_id, current_user.id)
 
     return None
-
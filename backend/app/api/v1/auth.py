@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import logging
+
 from fastapi import APIRouter, HTTPException, Request, status
 from sqlmodel import select
 
@@ -7,10 +9,12 @@ from app.core.security import (
     create_access_token,
     create_refresh_token,
     get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
     verify_token,
 )
-from app.db import SessionDep
+from app.db import AsyncSessionDep, SessionDep
 from app.models import User
 from app.schemas import (
     RefreshTokenRequest,
@@ -19,6 +23,9 @@ from app.schemas import (
     UserLogin,
     UserRead,
 )
+from app.services.cache import USERS_VERSION, bump_cache_version
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -49,6 +56,7 @@ def register_user(
         organization_id=payload.organization_id,
     )
     session.add(user)
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
     session.refresh(user)
     
@@ -58,9 +66,7 @@ def register_user(
         ensure_personal_calendar(session, user.id)
     except Exception as e:
         # Логируем ошибку, но не прерываем регистрацию
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Не удалось создать личный календарь для пользователя {user.id}: {e}")
+        logger.warning("Не удалось создать личный календарь для пользователя %s: %s", user.id, e)
     
     return user
 
@@ -70,10 +76,11 @@ def register_user(
     response_model=TokenPair,
     summary="Login and obtain tokens",
 )
-def login(payload: UserLogin, session: SessionDep) -> TokenPair:
+async def login(payload: UserLogin, session: AsyncSessionDep) -> TokenPair:
+    # bcrypt выполняется в отдельном пуле (app/core/security.py), event loop не блокируется
     email = payload.email.lower()
-    user = session.exec(select(User).where(User.email == email)).one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    user = (await session.exec(select(User).where(User.email == email))).one_or_none()
+    if not user or not await verify_password_async(payload.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect email or password",
@@ -84,6 +91,12 @@ def login(payload: UserLogin, session: SessionDep) -> TokenPair:
             detail="User is inactive",
         )
 
+    # Стоимость bcrypt изменилась — пересчитываем хеш, пока известен пароль
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(payload.password)
+        session.add(user)
+        await session.commit()
+
     return TokenPair(
         access_token=create_access_token(user.id),
         refresh_token=create_refresh_token(user.id),
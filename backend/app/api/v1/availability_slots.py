@@ -344,6 +344,7 @@ def book_availability_slot(
     
     # Create the event
     from app.api.v1.events import _attach_participants, _ensure_no_conflicts
+    from app.services.room_booking import RoomBooking, book_rooms
     
     # Add participants: slot owner and current user (booker)
     participant_ids = [slot.user_id, current_user.id]
@@ -357,16 +358,14 @@ def book_availability_slot(
     # Skip availability check for current user (booker) - they explicitly want to book this slot
     _ensure_no_conflicts(
         session,
-        calendar_id=payload.calendar_id,
-        starts_at=slot.starts_at,
-        ends_at=slot.ends_at,
-        room_id=payload.room_id,
+        slots=[(slot.starts_at, slot.ends_at)],
         participant_ids=participant_ids,
         skip_availability_check_for=[current_user.id],
     )
     
     event = Event(
         calendar_id=payload.calendar_id,
+        room_id=payload.room_id,
         title=payload.title,
         description=payload.description,
         starts_at=slot.starts_at,
@@ -377,8 +376,9 @@ def book_availability_slot(
     )
     session.add(event)
     session.flush()
+    book_rooms(session, [RoomBooking(event.id, event.room_id, event.starts_at, event.ends_at)])
     
-    _attach_participants(session, event.id, participant_ids)
+    _attach_participants(session, [event.id], participant_ids)
     
     # Update slot status
     slot.status = "booked"
@@ -1,16 +1,33 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime
-from typing import List
+from itertools import chain, groupby
+from operator import attrgetter
+from typing import Iterator, List, Literal, Optional
 from uuid import UUID, uuid5, NAMESPACE_URL
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy import select as sql_select
-from sqlmodel import and_, or_, select
+from sqlmodel import Session, and_, or_, select
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import get_current_user
-from app.db import SessionDep
-from app.models import Calendar, CalendarMember, Event, EventParticipant, Room, User, UserAvailabilitySchedule
+from app.core.config import settings
+from app.db import SessionDep, engine
+from app.models import (
+    Calendar,
+    CalendarMember,
+    Event,
+    EventImportJob,
+    EventParticipant,
+    Room,
+    User,
+    UserAvailabilitySchedule,
+)
 from app.schemas import (
     CalendarCreate,
     CalendarMemberCreate,
@@ -19,6 +36,8 @@ from app.schemas import (
     CalendarReadWithRole,
     CalendarUpdate,
     ConflictEntry,
+    ConflictEventSummary,
+    EventImportJobRead,
     EventRead,
 )
 from app.services.permissions import (
@@ -27,9 +46,19 @@ from app.services.permissions import (
     ensure_calendar_access,
     get_user_calendar_role,
 )
+from app.services.cache import etag_matches
+from app.services.conflicts import sweep_conflicts
+from app.services.event_import import IMPORTS_DIR, detect_format, process_import_job
+from app.services.ical import ICAL_MEDIA_TYPE, export_etag, series_order, stream_ics
+from app.services.storage import stage_upload
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Размер пакета при потоковом чтении событий для /conflicts
+CONFLICT_FETCH_BATCH = 1000
+
 
 def _serialize_calendar_with_role(
     calendar: Calendar,
@@ -165,6 +194,159 @@ def delete_calendar(
     return {"status": "deleted"}
 
 
+@router.get(
+    "/{calendar_id}/export.ics",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/calendar": {}}}, 304: {"description": "Not modified"}},
+    summary="Export calendar as iCalendar",
+)
+def export_calendar_ics(
+    calendar_id: UUID,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """
+    All events of the calendar as a streamed RFC 5545 file (series as RRULE).
+
+    The ETag changes with any event or calendar change, so subscribed clients
+    revalidate with If-None-Match and get 304 without the body being built.
+    """
+    calendar = ensure_calendar_access(session, calendar_id, current_user)
+    count, last_updated = session.exec(
+        sql_select(func.count(Event.id), func.max(Event.updated_at)).where(Event.calendar_id == calendar_id)
+    ).one()
+    headers = {
+        "ETag": export_etag(calendar_id, calendar.updated_at, count, last_updated),
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="calendar-{calendar_id}.ics"'
+    statement = series_order(select(Event).where(Event.calendar_id == calendar_id))
+    return StreamingResponse(
+        stream_ics(statement, name=calendar.name),
+        media_type=ICAL_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+@router.post(
+    "/{calendar_id}/import",
+    response_model=EventImportJobRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={202: {"model": EventImportJobRead, "description": "Import queued"}},
+    summary="Import events from ICS or CSV",
+)
+async def import_calendar_events(
+    calendar_id: UUID,
+    response: Response,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+    file: UploadFile = File(...),
+    format: Optional[Literal["ics", "csv"]] = Query(None, description="Detected from the file name if omitted"),
+    timezone: str = Query("UTC", description="Time zone of times without offset"),
+    background: Optional[bool] = Query(
+        None, description="Run as a background job (default: only for large files)"
+    ),
+) -> EventImportJob:
+    """
+    Bulk-create events from an iCalendar or CSV file.
+
+    Small files are imported within the request (201 with the finished job);
+    large ones are queued (202) and progress is polled via
+    ``GET /calendars/{id}/import/{job_id}``. Records that cannot be imported
+    (invalid data, room already booked) are skipped and reported in ``errors``.
+    """
+    # Синхронная сессия: все обращения к БД — в пуле потоков, не в event loop
+    await run_in_threadpool(_ensure_import_allowed, session, calendar_id, current_user)
+    import_format = format or detect_format(file.filename, file.content_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format, expected .ics or .csv",
+        )
+    try:
+        ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown time zone: {timezone}",
+        ) from None
+
+    stored = await stage_upload(file, IMPORTS_DIR, settings.EVENT_IMPORT_MAX_SIZE)
+    job = EventImportJob(
+        calendar_id=calendar_id,
+        user_id=current_user.id,
+        format=import_format,
+        timezone=timezone,
+        file_name=(file.filename or "")[:255] or None,
+        size=stored.size,
+    )
+    path = await run_in_threadpool(stored.commit, IMPORTS_DIR / f"{job.id}.{import_format}")
+    job.file_path = str(path)
+    await run_in_threadpool(_save_import_job, session, job)
+
+    if background is None:
+        background = stored.size > settings.EVENT_IMPORT_SYNC_MAX_SIZE
+    if not background:
+        await run_in_threadpool(process_import_job, job.id)
+        await run_in_threadpool(session.refresh, job)
+        return job
+
+    from app.tasks.imports import import_events
+
+    try:
+        await run_in_threadpool(import_events.apply_async, args=(str(job.id),), retry=False)
+    except Exception:
+        logger.warning("Failed to enqueue event import %s", job.id, exc_info=True)
+        path.unlink(missing_ok=True)
+        job.status = "failed"
+        job.error = "Task queue is unavailable"
+        await run_in_threadpool(_save_import_job, session, job)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Task queue is unavailable, try again later or upload a smaller file",
+        )
+    response.status_code = status.HTTP_202_ACCEPTED
+    return job
+
+
+def _ensure_import_allowed(session: SessionDep, calendar_id: UUID, user: User) -> None:
+    calendar = ensure_calendar_access(session, calendar_id, user)
+    if calendar.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only calendar owner can create events in this calendar",
+        )
+
+
+def _save_import_job(session: SessionDep, job: EventImportJob) -> None:
+    session.add(job)
+    session.commit()
+    # Загружаем поля сразу, чтобы сериализация ответа не ходила в БД из event loop
+    session.refresh(job)
+
+
+@router.get(
+    "/{calendar_id}/import/{job_id}",
+    response_model=EventImportJobRead,
+    summary="Get event import progress",
+)
+def get_import_job(
+    calendar_id: UUID,
+    job_id: UUID,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+) -> EventImportJob:
+    ensure_calendar_access(session, calendar_id, current_user)
+    job = session.get(EventImportJob, job_id)
+    if not job or job.calendar_id != calendar_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    return job
+
+
 @router.get(
     "/{calendar_id}/members",
     response_model=List[CalendarMemberRead],
@@ -683,57 +865,104 @@ def get_user_availability(
         
         return real_events
     except Exception as e:
-        # Логируем ошибку для отладки
-        import traceback
-        print(f"[ERROR] get_user_availability failed: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("get_user_availability failed for user %s", user_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get user availability: {str(e)}"
         )
 
 
-def _build_conflict_entry(
-    *,
-    conflict_type: str,
-    resource_id: UUID | None,
-    resource_label: str,
-    slot_start: datetime,
-    slot_end: datetime,
-    events: list[dict],
-) -> ConflictEntry:
-    return ConflictEntry(
-        type=conflict_type,  # type: ignore[arg-type]
-        resource_id=resource_id,
-        resource_label=resource_label,
-        slot_start=slot_start,
-        slot_end=slot_end,
-        events=[
-            {
-                "id": e["id"],
-                "title": e["title"],
-                "starts_at": e["starts_at"],
-                "ends_at": e["ends_at"],
-                "room_id": e["room_id"],
-            }
-            for e in events
-        ],
+def _conflict_rows(session: Session, statement) -> Iterator:
+    return session.exec(statement.execution_options(yield_per=CONFLICT_FETCH_BATCH))
+
+
+def _iter_conflict_entries(
+    session: Session, calendar_id: UUID, from_date: datetime, to_date: datetime
+) -> Iterator[ConflictEntry]:
+    """Room conflicts, then participant conflicts, one merged entry per maximal slot."""
+    in_range = and_(
+        Event.calendar_id == calendar_id,
+        Event.starts_at < to_date,
+        Event.ends_at > from_date,
+    )
+    # Одно описание события на все конфликты, в которых оно участвует
+    summaries: dict[UUID, ConflictEventSummary] = {}
+
+    def summary(row) -> ConflictEventSummary:
+        event_summary = summaries.get(row.id)
+        if event_summary is None:
+            event_summary = summaries[row.id] = ConflictEventSummary(
+                id=row.id,
+                title=row.title,
+                starts_at=row.starts_at,
+                ends_at=row.ends_at,
+                room_id=row.room_id,
+            )
+        return event_summary
+
+    event_columns = (Event.id, Event.title, Event.starts_at, Event.ends_at, Event.room_id)
+
+    room_rows = _conflict_rows(
+        session,
+        sql_select(*event_columns, Room.name.label("room_name"))
+        .outerjoin(Room, Room.id == Event.room_id)
+        .where(in_range, Event.room_id.is_not(None))
+        .order_by(Event.room_id, Event.starts_at),
+    )
+    for room_id, rows in groupby(room_rows, key=attrgetter("room_id")):
+        first = next(rows)
+        label = first.room_name or "Переговорка"
+        for slot in sweep_conflicts(
+            map(summary, chain((first,), rows)),
+            start=attrgetter("starts_at"),
+            end=attrgetter("ends_at"),
+            presorted=True,
+        ):
+            yield ConflictEntry(
+                type="room",
+                resource_id=room_id,
+                resource_label=label,
+                slot_start=slot.slot_start,
+                slot_end=slot.slot_end,
+                events=slot.items,
+            )
+
+    participant_rows = _conflict_rows(
+        session,
+        sql_select(*event_columns, EventParticipant.user_id, User.full_name, User.email)
+        .join(EventParticipant, EventParticipant.event_id == Event.id)
+        .join(User, User.id == EventParticipant.user_id)
+        .where(in_range)
+        .order_by(EventParticipant.user_id, Event.starts_at),
     )
+    for user_id, rows in groupby(participant_rows, key=attrgetter("user_id")):
+        first = next(rows)
+        label = first.full_name or first.email
+        for slot in sweep_conflicts(
+            map(summary, chain((first,), rows)),
+            start=attrgetter("starts_at"),
+            end=attrgetter("ends_at"),
+            presorted=True,
+        ):
+            yield ConflictEntry(
+                type="participant",
+                resource_id=user_id,
+                resource_label=label,
+                slot_start=slot.slot_start,
+                slot_end=slot.slot_end,
+                events=slot.items,
+            )
 
 
-def _detect_overlaps(events: list[dict]) -> list[tuple[datetime, datetime, list[dict]]]:
-    overlaps: list[tuple[datetime, datetime, list[dict]]] = []
-    sorted_events = sorted(events, key=lambda e: e["starts_at"])
-    for i in range(len(sorted_events)):
-        current = sorted_events[i]
-        for j in range(i + 1, len(sorted_events)):
-            candidate = sorted_events[j]
-            if candidate["starts_at"] >= current["ends_at"]:
-                break
-            slot_start = max(current["starts_at"], candidate["starts_at"])
-            slot_end = min(current["ends_at"], candidate["ends_at"])
-            overlaps.append((slot_start, slot_end, [current, candidate]))
-    return overlaps
+def _stream_conflicts(calendar_id: UUID, from_date: datetime, to_date: datetime) -> Iterator[str]:
+    # Собственная сессия: сессия запроса закрывается до отправки тела ответа
+    with Session(engine) as session:
+        yield "["
+        separator = ""
+        for entry in _iter_conflict_entries(session, calendar_id, from_date, to_date):
+            yield separator + entry.model_dump_json()
+            separator = ","
+        yield "]"
 
 
 @router.get(
@@ -747,101 +976,15 @@ def get_conflicts(
     current_user: User = Depends(get_current_user),
     from_date: datetime = Query(..., alias="from", description="Start date (ISO format)"),
     to_date: datetime = Query(..., alias="to", description="End date (ISO format)"),
-) -> List[ConflictEntry]:
-    ensure_calendar_access(session, calendar_id, current_user)
+) -> StreamingResponse:
+    """
+    Overlapping events of the calendar grouped by room and by participant.
 
-    events_stmt = (
-        select(Event)
-        .where(Event.calendar_id == calendar_id)
-        .where(Event.starts_at < to_date)
-        .where(Event.ends_at > from_date)
+    Each entry is a maximal slot where at least two events overlap and lists
+    all of them. The JSON array is streamed, so large ranges are not buffered.
+    """
+    ensure_calendar_access(session, calendar_id, current_user)
+    return StreamingResponse(
+        _stream_conflicts(calendar_id, from_date, to_date),
+        media_type="application/json",
     )
-    events = session.exec(events_stmt).all()
-    if not events:
-        return []
-
-    event_ids = [event.id for event in events]
-    room_ids = {event.room_id for event in events if event.room_id is not None}
-
-    room_labels: dict[UUID, str] = {}
-    if room_ids:
-        room_rows = session.exec(select(Room).where(Room.id.in_(room_ids))).all()
-        room_labels = {room.id: room.name for room in room_rows}
-
-    participants_by_event: dict[UUID, list[dict]] = {event_id: [] for event_id in event_ids}
-    if event_ids:
-        participant_rows = session.exec(
-            sql_select(EventParticipant, User)
-            .join(User, User.id == EventParticipant.user_id)
-            .where(EventParticipant.event_id.in_(event_ids))
-        ).all()
-        for participant, user in participant_rows:
-            participants_by_event[participant.event_id].append(
-                {
-                    "user_id": user.id,
-                    "label": user.full_name or user.email,
-                }
-            )
-
-    event_payloads: list[dict] = []
-    for event in events:
-        event_payloads.append(
-            {
-                "id": event.id,
-                "title": event.title,
-                "starts_at": event.starts_at,
-                "ends_at": event.ends_at,
-                "room_id": event.room_id,
-                "room_label": room_labels.get(event.room_id) if event.room_id else None,
-                "participants": participants_by_event.get(event.id, []),
-            }
-        )
-
-    conflicts: list[ConflictEntry] = []
-
-    # Room conflicts
-    rooms_map: dict[UUID, list[dict]] = {}
-    for payload in event_payloads:
-        room_id = payload["room_id"]
-        if not room_id:
-            continue
-        rooms_map.setdefault(room_id, []).append(payload)
-
-    for room_id, items in rooms_map.items():
-        overlaps = _detect_overlaps(items)
-        for slot_start, slot_end, overlap_events in overlaps:
-            conflicts.append(
-                _build_conflict_entry(
-                    conflict_type="room",
-                    resource_id=room_id,
-                    resource_label=room_labels.get(room_id, "Переговорка"),
-                    slot_start=slot_start,
-                    slot_end=slot_end,
-                    events=overlap_events,
-                )
-            )
-
-    # Participant conflicts
-    events_by_user: dict[UUID, list[dict]] = {}
-    for payload in event_payloads:
-        for participant in payload["participants"]:
-            events_by_user.setdefault(participant["user_id"], []).append(
-                {**payload, "participant_label": participant["label"]}
-            )
-
-    for user_id, items in events_by_user.items():
-        overlaps = _detect_overlaps(items)
-        for slot_start, slot_end, overlap_events in overlaps:
-            conflicts.append(
-                _build_conflict_entry(
-                    conflict_type="participant",
-                    resource_id=user_id,
-                    resource_label=items[0]["participant_label"],
-                    slot_start=slot_start,
-                    slot_end=slot_end,
-                    events=overlap_events,
-                )
-            )
-
-    return conflicts
-
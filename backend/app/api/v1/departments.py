@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import List
+from collections import defaultdict
+from typing import Dict, List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response
+from sqlalchemy import func
 from sqlmodel import select
 
 from app.api.deps import get_current_user, is_admin_or_it
@@ -16,51 +18,91 @@ from app.schemas import (
     DepartmentReadWithChildren,
     DepartmentUpdate,
 )
+from app.services.cache import (
+    DEPARTMENTS_VERSION,
+    USERS_VERSION,
+    VersionedCache,
+    bump_cache_version,
+    get_cache_version,
+)
 
 router = APIRouter()
 
 
-def _serialize_department_with_children(
-    department: Department,
-    *,
+# Сериализованное дерево отделов по organization_id (None — все отделы),
+# ключ версии — (версия отделов, версия пользователей)
+_department_tree_cache = VersionedCache(maxsize=32)
+
+
+def _build_department_tree(
     session: SessionDep,
-    all_departments: List[Department],
-    all_users: List[User],
-) -> DepartmentReadWithChildren:
-    """Serialize department with children and employee count."""
-    # Count employees in this department
-    employee_count = len([u for u in all_users if u.department_id == department.id])
-    
-    # Get manager name
-    manager_name = None
-    if department.manager_id:
-        manager = next((u for u in all_users if u.id == department.manager_id), None)
-        if manager:
-            manager_name = manager.full_name or manager.email
-    
-    # Get children - ПРОСТОЕ И НАДЕЖНОЕ РЕШЕНИЕ: сравниваем UUID как строки
-    children = []
-    dept_id_str = str(department.id)
-    for child in all_departments:
-        if child.parent_id is not None:
-            child_parent_str = str(child.parent_id)
-            if child_parent_str == dept_id_str:
-                children.append(
-                    _serialize_department_with_children(
-                        child, 
-                        session=session, 
-                        all_departments=all_departments, 
-                        all_users=all_users
-                    )
-                )
-    
-    base = DepartmentRead.model_validate(department)
-    return DepartmentReadWithChildren(
-        **base.model_dump(),
-        children=children,
-        employee_count=employee_count,
-        manager_name=manager_name,
+    departments: List[Department],
+    roots: List[Department] | None = None,
+) -> tuple[List[DepartmentReadWithChildren], Dict[UUID, DepartmentReadWithChildren]]:
+    """
+    Build the department tree in O(D): children are looked up in a parent→children
+    dict, employee counts come from one GROUP BY query and managers from one IN query.
+    Returns root nodes (departments without parent by default) and an id→node index.
+    """
+    children_by_parent: Dict[UUID, List[Department]] = defaultdict(list)
+    for department in departments:
+        if department.parent_id is not None:
+            children_by_parent[department.parent_id].append(department)
+
+    employee_counts: Dict[UUID, int] = dict(
+        session.exec(
+            select(User.department_id, func.count(User.id))
+            .where(User.department_id.isnot(None))
+            .group_by(User.department_id)
+        ).all()
+    )
+
+    manager_ids = {d.manager_id for d in departments if d.manager_id}
+    manager_names: Dict[UUID, str] = {}
+    if manager_ids:
+        manager_names = {
+            row.id: row.full_name or row.email
+            for row in session.exec(
+                select(User.id, User.full_name, User.email).where(User.id.in_(manager_ids))
+            ).all()
+        }
+
+    nodes: Dict[UUID, DepartmentReadWithChildren] = {}
+
+    def serialize(department: Department) -> DepartmentReadWithChildren:
+        node = DepartmentReadWithChildren(
+            **DepartmentRead.model_validate(department).model_dump(),
+            children=[serialize(child) for child in children_by_parent.get(department.id, [])],
+            employee_count=employee_counts.get(department.id, 0),
+            manager_name=manager_names.get(department.manager_id) if department.manager_id else None,
+        )
+        nodes[department.id] = node
+        return node
+
+    if roots is None:
+        roots = [d for d in departments if d.parent_id is None]
+    return [serialize(d) for d in roots], nodes
+
+
+def _get_department_tree(
+    session: SessionDep,
+    organization_id: UUID | None = None,
+) -> tuple[List[DepartmentReadWithChildren], Dict[UUID, DepartmentReadWithChildren]]:
+    """Return the (cached) department tree for an organization or for all departments."""
+    version = (
+        get_cache_version(session, DEPARTMENTS_VERSION),
+        get_cache_version(session, USERS_VERSION),
     )
+    cached = _department_tree_cache.get(organization_id, version)
+    if cached is not None:
+        return cached
+
+    statement = select(Department)
+    if organization_id:
+        statement = statement.where(Department.organization_id == organization_id)
+    tree = _build_department_tree(session, session.exec(statement).all())
+    _department_tree_cache.set(organization_id, version, tree)
+    return tree
 
 
 @router.get(
@@ -80,29 +122,9 @@ def list_departments(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to organizational structure denied",
         )
-    
-    # Принудительно обновляем сессию, чтобы увидеть все изменения
-    session.expire_all()
-    
-    statement = select(Department)
-    if organization_id:
-        statement = statement.where(Department.organization_id == organization_id)
-    
-    departments = session.exec(statement).all()
-    users = session.exec(select(User)).all()
-    
-    # Get root departments (no parent) - ПРОСТОЕ РЕШЕНИЕ
-    root_departments = [d for d in departments if d.parent_id is None]
-    
-    # Сериализуем все корневые отделы со всеми детьми рекурсивно
-    result = [
-        _serialize_department_with_children(
-            dept, session=session, all_departments=departments, all_users=users
-        )
-        for dept in root_departments
-    ]
-    
-    return result
+
+    roots, _ = _get_department_tree(session, organization_id)
+    return roots
 
 
 @router.post(
@@ -182,6 +204,7 @@ def create_department(
     dept_data['organization_id'] = organization_id
     department = Department(**dept_data)
     session.add(department)
+    bump_cache_version(session, DEPARTMENTS_VERSION)
     session.commit()
     session.refresh(department)
     
@@ -213,12 +236,14 @@ def get_department(
             detail="Department not found",
         )
     
-    departments = session.exec(select(Department)).all()
-    users = session.exec(select(User)).all()
-    
-    return _serialize_department_with_children(
-        department, session=session, all_departments=departments, all_users=users
-    )
+    _, nodes = _get_department_tree(session)
+    if department.id not in nodes:
+        # Отдел вне дерева (родитель удалён) — сериализуем его поддерево напрямую
+        (node,), _ = _build_department_tree(
+            session, session.exec(select(Department)).all(), roots=[department]
+        )
+        return node
+    return nodes[department.id]
 
 
 @router.put(
@@ -278,6 +303,7 @@ def update_department(
     department.touch()
     
     session.add(department)
+    bump_cache_version(session, DEPARTMENTS_VERSION)
     session.commit()
     session.refresh(department)
     return DepartmentRead.model_validate(department)
@@ -333,6 +359,7 @@ def delete_department(
             if org:
                 session.delete(org)
     
+    bump_cache_version(session, DEPARTMENTS_VERSION)
     session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
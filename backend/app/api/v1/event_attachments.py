@@ -1,19 +1,29 @@
 from __future__ import annotations
 
-import os
+import logging
 from pathlib import Path
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
-from fastapi.responses import FileResponse
-from sqlmodel import select
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from sqlmodel import and_, select
 
 from app.api.deps import get_current_user
 from app.db import SessionDep
-from app.models import Event, EventAttachment, User
+from app.models import Calendar, CalendarMember, Event, EventAttachment, User
 from app.schemas.event_attachment import EventAttachmentRead
+from app.services.blob_store import (
+    acquire_blob,
+    release_attachment_quota,
+    release_blobs,
+    remove_legacy_file,
+    reserve_attachment_quota,
+    stage_blob,
+)
+from app.services.downloads import download_response
 from app.services.permissions import ensure_calendar_access
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Максимальный размер одного файла: 20 МБ
@@ -21,19 +31,9 @@ MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 МБ в байтах
 # Максимальный размер всех файлов для события: 20 МБ
 MAX_TOTAL_SIZE = 20 * 1024 * 1024  # 20 МБ в байтах
 
-# Директория для хранения файлов (относительно корня проекта backend)
-# Use the same BASE_DIR as in main.py (backend directory)
+# Файлы хранятся в content-addressed хранилище (app/services/blob_store.py);
+# BASE_DIR нужен для относительных путей старых вложений
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
-UPLOAD_DIR = BASE_DIR / "uploads" / "event_attachments"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-
-def _get_total_attachment_size(session: SessionDep, event_id: UUID) -> int:
-    """Получить общий размер всех файлов события."""
-    attachments = session.exec(
-        select(EventAttachment).where(EventAttachment.event_id == event_id)
-    ).all()
-    return sum(att.file_size for att in attachments)
 
 
 @router.post(
@@ -60,44 +60,31 @@ async def upload_attachment(
     # Проверяем доступ к календарю события
     ensure_calendar_access(session, event.calendar_id, current_user)
 
-    # Проверяем размер файла
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024 * 1024):.0f} MB",
-        )
-
-    # Проверяем общий размер всех файлов события
-    total_size = _get_total_attachment_size(session, event_id)
-    if total_size + file_size > MAX_TOTAL_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Total file size exceeds maximum allowed size of {MAX_TOTAL_SIZE / (1024 * 1024):.0f} MB",
-        )
+    # Копируем файл во временный файл потоково; лимит и SHA-256 считаются по ходу чтения
+    stored = await stage_blob(file, MAX_FILE_SIZE)
 
-    # Сохраняем файл
     try:
-        file_extension = Path(file.filename or "").suffix
-        filename = f"{event_id}_{uuid4().hex}{file_extension}"
-        file_path = UPLOAD_DIR / filename
-        
-        # Убеждаемся, что директория существует
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        # Проверяем и резервируем общий размер файлов события одним условным UPDATE
+        if not reserve_attachment_quota(session, Event, event_id, stored.size, MAX_TOTAL_SIZE):
+            stored.discard()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Total file size exceeds maximum allowed size of {MAX_TOTAL_SIZE / (1024 * 1024):.0f} MB",
+            )
+
+        # Одинаковое содержимое хранится один раз — повторная загрузка только добавляет ссылку
+        blob, blob_file = acquire_blob(session, stored)
 
         # Создаем запись в БД
+        file_extension = Path(file.filename or "").suffix
         attachment = EventAttachment(
             event_id=event_id,
-            filename=filename,
+            filename=f"{event_id}_{uuid4().hex}{file_extension}",
             original_filename=file.filename or "unknown",
-            file_size=file_size,
+            file_size=blob.size,
             content_type=file.content_type or "application/octet-stream",
-            file_path=str(file_path.absolute()),
+            file_path=str(blob_file.absolute()),
+            blob_sha256=blob.sha256,
             uploaded_by=current_user.id,
         )
         session.add(attachment)
@@ -105,16 +92,13 @@ async def upload_attachment(
         session.refresh(attachment)
 
         return EventAttachmentRead.model_validate(attachment)
+    except HTTPException:
+        session.rollback()
+        raise
     except Exception as e:
-        import traceback
-        print(f"[ERROR] Failed to upload attachment: {str(e)}")
-        print(traceback.format_exc())
-        # Удаляем файл, если он был создан, но запись в БД не удалась
-        if 'file_path' in locals() and file_path.exists():
-            try:
-                file_path.unlink()
-            except:
-                pass
+        logger.exception("Failed to upload attachment")
+        session.rollback()
+        stored.discard()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload file: {str(e)}",
@@ -156,43 +140,50 @@ def list_attachments(
 )
 def download_attachment(
     attachment_id: UUID,
+    request: Request,
     session: SessionDep,
     current_user: User = Depends(get_current_user),
-) -> FileResponse:
-    """Скачать файл."""
-    attachment = session.get(EventAttachment, attachment_id)
-    if not attachment:
+) -> Response:
+    """Скачать файл (поддерживаются Range и условные запросы)."""
+    # Вложение, календарь события и роль пользователя в нём — одним запросом
+    row = session.exec(
+        select(EventAttachment, Calendar.owner_id, CalendarMember.role)
+        .join(Event, Event.id == EventAttachment.event_id)
+        .join(Calendar, Calendar.id == Event.calendar_id)
+        .outerjoin(
+            CalendarMember,
+            and_(
+                CalendarMember.calendar_id == Calendar.id,
+                CalendarMember.user_id == current_user.id,
+            ),
+        )
+        .where(EventAttachment.id == attachment_id)
+    ).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Attachment not found",
         )
+    attachment, owner_id, member_role = row
 
-    # Проверяем доступ к событию
-    event = session.get(Event, attachment.event_id)
-    if not event:
+    # Проверяем доступ к календарю события
+    if owner_id != current_user.id and member_role is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found",
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access to calendar denied"
         )
 
-    # Проверяем доступ к календарю события
-    ensure_calendar_access(session, event.calendar_id, current_user)
-
-    # Проверяем, что файл существует
     file_path = Path(attachment.file_path)
     # Если путь относительный, делаем его абсолютным
     if not file_path.is_absolute():
         file_path = BASE_DIR / file_path
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server",
-        )
 
-    return FileResponse(
-        path=str(file_path),
+    return download_response(
+        request,
+        str(file_path),
         filename=attachment.original_filename,
         media_type=attachment.content_type,
+        content_hash=attachment.blob_sha256,
+        last_modified=attachment.created_at,
     )
 
 
@@ -224,7 +215,6 @@ def delete_attachment(
         )
 
     # Проверяем доступ к календарю события (только владелец календаря может удалять файлы)
-    from app.models import Calendar
     calendar = session.get(Calendar, event.calendar_id)
     if not calendar or calendar.owner_id != current_user.id:
         raise HTTPException(
@@ -232,17 +222,16 @@ def delete_attachment(
             detail="Only calendar owner can delete attachments",
         )
 
-    # Удаляем файл с диска
-    file_path = Path(attachment.file_path)
-    # Если путь относительный, делаем его абсолютным
-    if not file_path.is_absolute():
-        file_path = BASE_DIR / file_path
-    if file_path.exists():
-        file_path.unlink()
+    # Снимаем ссылку на блоб (сам файл удалит GC) и освобождаем квоту события
+    if attachment.blob_sha256:
+        release_blobs(session, [attachment.blob_sha256])
+    else:
+        remove_legacy_file(attachment.file_path)
+    release_attachment_quota(session, Event, attachment.event_id, attachment.file_size)
 
     # Удаляем запись из БД
     session.delete(attachment)
     session.commit()
-    
+
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
-from calendar import monthrange
-from datetime import datetime, timedelta
-from typing import List, Literal, Optional
+import logging
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterable, List, Literal, NamedTuple, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import and_, delete, or_, select, update
 from sqlalchemy import func
+from sqlalchemy import select as sql_select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app.api.deps import get_current_user
-from app.db import SessionDep
+from app.api.deps import get_current_user, get_current_user_async
+from app.db import AsyncSessionDep, SessionDep
 from app.models import Calendar, Event, EventAttachment, EventComment, EventParticipant, Notification, User, UserAvailabilitySchedule, Department, Organization
 from app.schemas import (
     EventCreate,
@@ -22,15 +26,19 @@ from app.schemas import (
 )
 from app.schemas.event_attachment import EventAttachmentRead
 # from app.schemas.event_group_participant import EventGroupParticipantWithDetails  # TODO: Uncomment when feature is ready
+from app.services.blob_store import delete_event_attachments
+from app.services.conflicts import find_overlap
 from app.services.notifications import schedule_reminders_for_event
-from app.tasks.notifications import (
-    notify_event_cancelled_task,
-    notify_event_invited_task,
-    notify_event_updated_task,
-)
+from app.services.recurrence import generate_recurrence_starts
+from app.services.room_booking import RoomBooking, book_rooms, release_rooms
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 1000 строк по 4 параметра — в пределах лимитов SQLite и PostgreSQL
+PARTICIPANT_INSERT_BATCH = 1000
+
 
 def _build_range_filter(
     *,
@@ -51,7 +59,6 @@ def _build_range_filter(
 def _load_event_participants(
     session: SessionDep, event_id: UUID
 ) -> List[EventParticipantRead]:
-    from sqlalchemy import select as sql_select
     stmt = (
         sql_select(EventParticipant, User)
         .join(User, EventParticipant.user_id == User.id)
@@ -77,69 +84,42 @@ def _get_event_participant_ids(session: SessionDep, event_id: UUID) -> List[UUID
     ).all()
 
 
-MAX_RECURRENCE_OCCURRENCES = 180
-
-
-def _add_months(base: datetime, months: int) -> datetime:
-    month_index = base.month - 1 + months
-    year = base.year + month_index // 12
-    month = month_index % 12 + 1
-    day = min(base.day, monthrange(year, month)[1])
-    return base.replace(year=year, month=month, day=day)
-
-
-def _advance_recurrence(start: datetime, rule: RecurrenceRule) -> datetime:
-    if rule.frequency == "daily":
-        return start + timedelta(days=rule.interval)
-    elif rule.frequency == "weekly":
-        return start + timedelta(weeks=rule.interval)
-    elif rule.frequency == "monthly":
-        return _add_months(start, rule.interval)
-    elif rule.frequency == "yearly":
-        return _add_months(start, rule.interval * 12)
-    return start
-
-
-def _generate_recurrence_starts(
-    base_start: datetime, rule: RecurrenceRule
-) -> List[datetime]:
-    additional: List[datetime] = []
-    current = base_start
-    until = rule.until.replace(tzinfo=None) if rule.until else None
-
-    while len(additional) < MAX_RECURRENCE_OCCURRENCES:
-        current = _advance_recurrence(current, rule)
-        if until and current > until:
-            break
-        if rule.count and len(additional) >= rule.count - 1:
-            break
-        additional.append(current)
-        if not rule.count and until is None and len(additional) >= MAX_RECURRENCE_OCCURRENCES:
-            break
-
-    return additional
-
-
 def _attach_participants(
-    session: SessionDep, event_id: UUID, participant_ids: List[UUID]
+    session: SessionDep,
+    event_ids: Iterable[UUID],
+    participant_ids: Iterable[UUID],
+    *,
+    response_status: str = "needs_action",
 ) -> None:
     """
-    Добавляет участников к событию.
+    Добавляет участников ко всем событиям (например, ко всем вхождениям серии).
     Не требует проверки доступа к календарю - любой может пригласить любого.
+
+    Все пары (event_id, user_id) вставляются одним ``INSERT ... ON CONFLICT DO
+    NOTHING``: уже добавленные участники пропускаются, их статус ответа не
+    меняется. События должны быть уже сброшены в БД (``session.flush()``).
     """
-    for user_id in participant_ids:
-        # Проверяем, не добавлен ли уже этот участник
-        existing = session.exec(
-            select(EventParticipant).where(
-                EventParticipant.event_id == event_id,
-                EventParticipant.user_id == user_id,
-            )
-        ).one_or_none()
-        if not existing:
-            participant = EventParticipant(
-                event_id=event_id, user_id=user_id, response_status="needs_action"
-            )
-            session.add(participant)
+    event_ids = list(dict.fromkeys(event_ids))
+    participant_ids = list(dict.fromkeys(participant_ids))
+    added_at = datetime.utcnow()
+    rows = [
+        {"event_id": event_id, "user_id": user_id, "response_status": response_status, "added_at": added_at}
+        for event_id in event_ids
+        for user_id in participant_ids
+    ]
+    # Порциями, чтобы не упереться в лимит параметров одного запроса
+    for start in range(0, len(rows), PARTICIPANT_INSERT_BATCH):
+        session.execute(
+            _participant_insert(session).values(rows[start:start + PARTICIPANT_INSERT_BATCH])
+        )
+
+
+def _participant_insert(session: SessionDep):
+    if session.get_bind().dialect.name == "postgresql":
+        statement = postgresql_insert(EventParticipant)
+    else:
+        statement = sqlite_insert(EventParticipant)
+    return statement.on_conflict_do_nothing(index_elements=["event_id", "user_id"])
 
 
 # TODO: Uncomment when EventGroupParticipant feature is ready
@@ -514,45 +494,58 @@ def _check_availability_schedule(
     return True, ""
 
 
+class _Occurrence(NamedTuple):
+    """Interval of the event (or series occurrence) being checked."""
+
+    starts_at: datetime
+    ends_at: datetime
+
+
+_STARTS_AT = attrgetter("starts_at")
+_ENDS_AT = attrgetter("ends_at")
+
+
 def _ensure_no_conflicts(
     session: SessionDep,
     *,
-    calendar_id: UUID,
-    starts_at: datetime,
-    ends_at: datetime,
-    room_id: UUID | None,
+    slots: list[tuple[datetime, datetime]],
     participant_ids: list[UUID],
-    exclude_event_id: UUID | None = None,
+    exclude_event_ids: list[UUID] | None = None,
     skip_availability_check_for: list[UUID] | None = None,
     skip_all_availability_checks: bool = False,
     creator_id: UUID | None = None,
 ) -> None:
     """
-    Проверяет конфликты для события.
-    
+    Проверяет конфликты участников для события или всех вхождений серии сразу.
+
+    Занятость переговорок здесь не проверяется: её гарантирует вставка брони
+    (``book_rooms`` в app/services/room_booking.py).
+
+    Занятые интервалы выбираются одним запросом на весь охватывающий диапазон
+    ``slots``, пересечения ищутся заметающей прямой (app/services/conflicts.py) —
+    в том числе между самими вхождениями серии.
+
     Args:
+        slots: Интервалы (starts_at, ends_at) создаваемого/изменяемого события
+               или всех вхождений серии
+        exclude_event_ids: Изменяемые события (при переносе серии - все её
+                           вхождения), их текущие интервалы занятостью не считаются
         skip_all_availability_checks: Если True, полностью пропускает проверку занятости
                                       (для пользователей с can_override_availability)
         creator_id: ID создателя события - всегда исключается из проверки конфликтов
                     (создатель имеет право наслаивать свои события)
     """
+    if not slots:
+        return
+    occurrences = [_Occurrence(slot_start, slot_end) for slot_start, slot_end in slots]
+    range_start = min(occurrence.starts_at for occurrence in occurrences)
+    range_end = max(occurrence.ends_at for occurrence in occurrences)
     filters = [
-        Event.calendar_id == calendar_id,
-        Event.starts_at < ends_at,
-        Event.ends_at > starts_at,
+        Event.starts_at < range_end,
+        Event.ends_at > range_start,
     ]
-    if exclude_event_id:
-        filters.append(Event.id != exclude_event_id)
-
-    if room_id:
-        room_conflict = session.exec(
-            select(Event).where(Event.room_id == room_id, *filters)
-        ).first()
-        if room_conflict:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"Переговорка занята событием «{room_conflict.title}».",
-            )
+    if exclude_event_ids:
+        filters.append(Event.id.notin_(exclude_event_ids))
 
     # Если создатель имеет право игнорировать занятость, пропускаем все проверки
     if skip_all_availability_checks:
@@ -561,11 +554,11 @@ def _ensure_no_conflicts(
     if participant_ids:
         # Получаем список участников, которые уже подтвердили участие в событии (если это обновление)
         confirmed_participant_ids = set()
-        if exclude_event_id:
+        if exclude_event_ids:
             # Это обновление события - проверяем, кто уже подтвердил участие
             confirmed_participants = session.exec(
-                select(EventParticipant.user_id).where(
-                    EventParticipant.event_id == exclude_event_id,
+                select(EventParticipant.user_id).distinct().where(
+                    EventParticipant.event_id.in_(exclude_event_ids),
                     EventParticipant.response_status == "accepted"
                 )
             ).all()
@@ -595,20 +588,21 @@ def _ensure_no_conflicts(
         for user_id in participant_ids:
             if user_id in skip_check_ids or user_id in allow_overlap_ids:
                 continue
-                
-            is_available, error_message = _check_availability_schedule(
-                session,
-                user_id=user_id,
-                starts_at=starts_at,
-                ends_at=ends_at,
-            )
-            if not is_available:
-                user = session.get(User, user_id)
-                user_name = user.full_name if user and user.full_name else (user.email if user else "Пользователь")
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail=f"{user_name} недоступен в это время согласно расписанию доступности.",
+
+            for occurrence in occurrences:
+                is_available, error_message = _check_availability_schedule(
+                    session,
+                    user_id=user_id,
+                    starts_at=occurrence.starts_at,
+                    ends_at=occurrence.ends_at,
                 )
+                if not is_available:
+                    user = session.get(User, user_id)
+                    user_name = user.full_name if user and user.full_name else (user.email if user else "Пользователь")
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"{user_name} недоступен в это время согласно расписанию доступности.",
+                    )
         
         # Исключаем участников с allow_event_overlap=True из проверки конфликтов
         participants_to_check = [pid for pid in participant_ids if pid not in allow_overlap_ids]
@@ -617,104 +611,58 @@ def _ensure_no_conflicts(
         if not participants_to_check:
             return
         
-        # Проверяем конфликты участников во ВСЕХ календарях
-        # Учитываем:
+        # Занятость участников во ВСЕХ календарях:
         # 1. События, где участник является участником (через EventParticipant) и НЕ отклонил участие
-        # 2. События из личных календарей участника (где он владелец), если он не отклонил участие
-        # Это дает полную занятость независимо от календаря
+        # 2. События из личных календарей участника (где он владелец), если владелец не отклонил участие
         # Примечание: участники с allow_event_overlap=True исключены из проверки
-        
-        # События, где участники являются участниками и НЕ отклонили участие
-        # Исключаем события, где response_status == "declined"
-        participant_events_subquery = select(EventParticipant.event_id).where(
-            EventParticipant.user_id.in_(participants_to_check),
-            or_(
-                EventParticipant.response_status != "declined",
-                EventParticipant.response_status.is_(None),
-            )
+        not_declined = or_(
+            EventParticipant.response_status != "declined",
+            EventParticipant.response_status.is_(None),
         )
-        
-        # Личные календари участников
-        participant_calendars_subquery = select(Calendar.id).where(
-            Calendar.owner_id.in_(participants_to_check)
+        busy = list(
+            session.exec(
+                sql_select(Event.title, Event.starts_at, Event.ends_at, EventParticipant.user_id)
+                .join(EventParticipant, EventParticipant.event_id == Event.id)
+                .where(EventParticipant.user_id.in_(participants_to_check), not_declined, *filters)
+            ).all()
         )
-        
-        # Фильтры для проверки конфликтов
-        conflict_filters = [
-            or_(
-                Event.id.in_(participant_events_subquery),
-                Event.calendar_id.in_(participant_calendars_subquery),
-            ),
-            Event.starts_at < ends_at,
-            Event.ends_at > starts_at,
-        ]
-        if exclude_event_id:
-            conflict_filters.append(Event.id != exclude_event_id)
-        
-        # Проверяем конфликты
-        conflict_event = session.exec(
-            select(Event)
-            .where(*conflict_filters)
-        ).first()
-        
-        if conflict_event:
-            # Проверяем, не отклонил ли участник это событие
-            # Сначала проверяем через EventParticipant
-            conflict_participant = session.exec(
-                select(EventParticipant, User)
-                .join(User, User.id == EventParticipant.user_id)
-                .where(
-                    EventParticipant.event_id == conflict_event.id,
-                    EventParticipant.user_id.in_(participants_to_check),
-                    or_(
-                        EventParticipant.response_status != "declined",
-                        EventParticipant.response_status.is_(None),
-                    )
+        busy.extend(
+            session.exec(
+                sql_select(Event.title, Event.starts_at, Event.ends_at, Calendar.owner_id.label("user_id"))
+                .join(Calendar, Calendar.id == Event.calendar_id)
+                .outerjoin(
+                    EventParticipant,
+                    and_(
+                        EventParticipant.event_id == Event.id,
+                        EventParticipant.user_id == Calendar.owner_id,
+                    ),
                 )
-            ).first()
-            
-            if conflict_participant:
-                _, conflict_user = conflict_participant
+                .where(Calendar.owner_id.in_(participants_to_check), not_declined, *filters)
+            ).all()
+        )
+        # Вхождения создаваемой серии тоже конфликтуют между собой
+        overlap = find_overlap(occurrences, busy, start=_STARTS_AT, end=_ENDS_AT)
+        if overlap:
+            _, other = overlap
+            if isinstance(other, _Occurrence):
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
-                    detail=(
-                        f"Участник {conflict_user.full_name or conflict_user.email} "
-                        f"уже занят в событии «{conflict_event.title}»."
-                    ),
+                    detail="Вхождения серии пересекаются друг с другом.",
                 )
-            else:
-                # Конфликт в личном календаре участника
-                # Проверяем, не отклонил ли владелец событие в своем календаре
-                conflict_calendar = session.get(Calendar, conflict_event.calendar_id)
-                if conflict_calendar and conflict_calendar.owner_id in participants_to_check:
-                    # Проверяем, не отклонил ли владелец это событие
-                    owner_participant = session.exec(
-                        select(EventParticipant).where(
-                            EventParticipant.event_id == conflict_event.id,
-                            EventParticipant.user_id == conflict_calendar.owner_id,
-                        )
-                    ).first()
-                    
-                    # Если владелец отклонил событие, не считаем это конфликтом
-                    if owner_participant and owner_participant.response_status == "declined":
-                        # Пропускаем это событие - владелец отклонил его
-                        pass
-                    else:
-                        conflict_user = session.get(User, conflict_calendar.owner_id)
-                        if conflict_user:
-                            raise HTTPException(
-                                status_code=status.HTTP_409_CONFLICT,
-                                detail=(
-                                    f"Участник {conflict_user.full_name or conflict_user.email} "
-                                    f"уже занят в событии «{conflict_event.title}»."
-                                ),
-                            )
+            conflict_user = session.get(User, other.user_id)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"Участник {conflict_user.full_name or conflict_user.email} "
+                    f"уже занят в событии «{other.title}»."
+                ),
+            )
 
 
 @router.get("/", response_model=List[EventRead], summary="List events")
-def list_events(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+async def list_events(
+    session: AsyncSessionDep,
+    current_user: User = Depends(get_current_user_async),
     calendar_id: Optional[UUID] = None,
     starts_after: Optional[datetime] = Query(
         default=None, alias="from", description="ISO timestamp filter start"
@@ -727,7 +675,7 @@ def list_events(
     # и события, где пользователь является участником
     if calendar_id:
         # Проверяем, что календарь существует и принадлежит пользователю
-        calendar = session.get(Calendar, calendar_id)
+        calendar = await session.get(Calendar, calendar_id)
         if not calendar:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -765,7 +713,7 @@ def list_events(
     if filter_expr is not None:
         statement = statement.where(filter_expr)
     statement = statement.order_by(Event.starts_at)
-    events = session.exec(statement).all()
+    events = (await session.exec(statement)).all()
     
 
     # Предзагружаем календари для всех событий одним запросом
@@ -774,18 +722,18 @@ def list_events(
     if calendar_ids:
         calendars = {
             cal.id: cal
-            for cal in session.exec(select(Calendar).where(Calendar.id.in_(calendar_ids))).all()
+            for cal in (await session.exec(select(Calendar).where(Calendar.id.in_(calendar_ids)))).all()
         }
 
     # Предзагружаем участников для всех событий одним запросом
     event_ids = [event.id for event in events]
     participants_map = {}
     if event_ids:
-        participants = session.exec(
+        participants = (await session.exec(
             select(EventParticipant, User)
             .join(User, EventParticipant.user_id == User.id)
             .where(EventParticipant.event_id.in_(event_ids))
-        ).all()
+        )).all()
         for p, u in participants:
             if p.event_id not in participants_map:
                 participants_map[p.event_id] = []
@@ -802,9 +750,9 @@ def list_events(
     attachments_map = {}
     if event_ids:
         from app.models import EventAttachment
-        attachments = session.exec(
+        attachments = (await session.exec(
             select(EventAttachment).where(EventAttachment.event_id.in_(event_ids))
-        ).all()
+        )).all()
         for att in attachments:
             if att.event_id not in attachments_map:
                 attachments_map[att.event_id] = []
@@ -820,7 +768,7 @@ def list_events(
             EventComment.event_id.in_(event_ids),
             EventComment.is_deleted == False
         ).group_by(EventComment.event_id)
-        comment_counts_result = session.exec(comment_counts_stmt).all()
+        comment_counts_result = (await session.exec(comment_counts_stmt)).all()
         comments_count_map = {event_id: count for event_id, count in comment_counts_result}
 
     # Предзагружаем комнаты для всех событий одним запросом
@@ -828,7 +776,7 @@ def list_events(
     room_ids = {event.room_id for event in events if event.room_id}
     rooms_map = {}
     if room_ids:
-        rooms = session.exec(select(Room).where(Room.id.in_(room_ids))).all()
+        rooms = (await session.exec(select(Room).where(Room.id.in_(room_ids)))).all()
         rooms_map = {r.id: r for r in rooms}
 
     # Предзагружаем департаменты для участников и владельцев календарей
@@ -842,17 +790,17 @@ def list_events(
             user_ids.add(calendar.owner_id)
     
     departments_map = {}
+    user_dept_colors = {}
     if user_ids:
-        users_with_depts = session.exec(
+        users_with_depts = (await session.exec(
             select(User).where(User.id.in_(user_ids), User.department_id.isnot(None))
-        ).all()
+        )).all()
         dept_ids = {u.department_id for u in users_with_depts if u.department_id}
         if dept_ids:
-            depts = session.exec(select(Department).where(Department.id.in_(dept_ids))).all()
+            depts = (await session.exec(select(Department).where(Department.id.in_(dept_ids)))).all()
             departments_map = {d.id: d for d in depts}
         
         # Создаем маппинг user_id -> department_color
-        user_dept_colors = {}
         for u in users_with_depts:
             if u.department_id and u.department_id in departments_map:
                 dept = departments_map[u.department_id]
@@ -957,6 +905,9 @@ def create_event(
     session: SessionDep,
     current_user: User = Depends(get_current_user),
 ) -> EventRead:
+    # Задачи Celery импортируются при первом вызове, а не при старте приложения
+    from app.tasks.notifications import notify_event_invited_task
+
     # Упрощенная логика: проверяем только, что календарь существует
     # Пользователь может создавать события в любом календаре, где он является владельцем
     # Или приглашать участников в события без проверки доступа к календарю
@@ -994,14 +945,18 @@ def create_event(
     else:
         data.pop("recurrence_rule", None)
 
+    duration = data["ends_at"] - data["starts_at"]
+    additional_starts = (
+        generate_recurrence_starts(data["starts_at"], recurrence_rule) if recurrence_rule else []
+    )
+
     # Для групповых участников НЕ проверяем занятость (согласно спецификации)
-    # Проверяем занятость только для индивидуальных участников (если нет права override)
+    # Проверяем занятость только для индивидуальных участников (если нет права override).
+    # Все вхождения серии проверяются одним вызовом
     _ensure_no_conflicts(
         session,
-        calendar_id=payload.calendar_id,
-        starts_at=data["starts_at"],
-        ends_at=data["ends_at"],
-        room_id=data.get("room_id"),
+        slots=[(data["starts_at"], data["ends_at"])]
+        + [(occurrence_start, occurrence_start + duration) for occurrence_start in additional_starts],
         participant_ids=participant_ids,
         skip_all_availability_checks=skip_all_availability_checks,
         creator_id=current_user.id,
@@ -1009,70 +964,43 @@ def create_event(
 
     event = Event(**data)
     session.add(event)
+
+    bookings = [RoomBooking(event.id, event.room_id, event.starts_at, event.ends_at)]
+    # id событий задаются при создании объекта, поэтому серия сбрасывается в БД одним flush
+    for occurrence_start in additional_starts:
+        occurrence_end = occurrence_start + duration
+        child_event = Event(
+            calendar_id=event.calendar_id,
+            room_id=event.room_id,
+            title=event.title,
+            description=event.description,
+            location=event.location,
+            timezone=event.timezone,
+            starts_at=occurrence_start,
+            ends_at=occurrence_end,
+            all_day=event.all_day,
+            status=event.status,
+            recurrence_parent_id=event.id,
+        )
+        session.add(child_event)
+        bookings.append(RoomBooking(child_event.id, child_event.room_id, occurrence_start, occurrence_end))
     session.flush()
-    
-    # Добавляем создателя как участника со статусом "accepted"
-    creator_participant = EventParticipant(
-        event_id=event.id, 
-        user_id=current_user.id, 
-        response_status="accepted"
-    )
-    session.add(creator_participant)
-    
-    # Добавляем индивидуальных участников (кроме создателя)
+    series_ids = [booking.event_id for booking in bookings]
+
+    # Создатель — участник всех вхождений со статусом "accepted"
+    _attach_participants(session, series_ids, [current_user.id], response_status="accepted")
+
+    # Индивидуальные участники (кроме создателя) — одной вставкой на всю серию
     other_participant_ids = [pid for pid in participant_ids if pid != current_user.id]
-    if other_participant_ids:
-        _attach_participants(session, event.id, other_participant_ids)
-    
+    _attach_participants(session, series_ids, other_participant_ids)
+
     # Добавляем групповых участников
     if group_participants:
-        _attach_group_participants(session, event.id, group_participants, current_user.id)
+        for series_event_id in series_ids:
+            _attach_group_participants(session, series_event_id, group_participants, current_user.id)
 
-    duration = data["ends_at"] - data["starts_at"]
-
-    if recurrence_rule:
-        additional_starts = _generate_recurrence_starts(
-            event.starts_at, recurrence_rule
-        )
-        for occurrence_start in additional_starts:
-            occurrence_end = occurrence_start + duration
-            _ensure_no_conflicts(
-                session,
-                calendar_id=payload.calendar_id,
-                starts_at=occurrence_start,
-                ends_at=occurrence_end,
-                room_id=data.get("room_id"),
-                participant_ids=participant_ids,
-                skip_all_availability_checks=skip_all_availability_checks,
-                creator_id=current_user.id,
-            )
-            child_event = Event(
-                calendar_id=event.calendar_id,
-                room_id=event.room_id,
-                title=event.title,
-                description=event.description,
-                location=event.location,
-                timezone=event.timezone,
-                starts_at=occurrence_start,
-                ends_at=occurrence_end,
-                all_day=event.all_day,
-                status=event.status,
-                recurrence_parent_id=event.id,
-            )
-            session.add(child_event)
-            session.flush()
-            # Добавляем создателя как участника со статусом "accepted"
-            child_creator_participant = EventParticipant(
-                event_id=child_event.id, 
-                user_id=current_user.id, 
-                response_status="accepted"
-            )
-            session.add(child_creator_participant)
-            # Добавляем других участников
-            if other_participant_ids:
-                _attach_participants(session, child_event.id, other_participant_ids)
-            if group_participants:
-                _attach_group_participants(session, child_event.id, group_participants, current_user.id)
+    # Бронь переговорки на все вхождения одной вставкой (409 при пересечении)
+    book_rooms(session, bookings)
 
     # Уведомления индивидуальным участникам (асинхронно через Celery)
     if participant_ids:
@@ -1122,6 +1050,8 @@ def update_event(
         description="single — изменить только это событие, series — всю серию",
     ),
 ) -> EventRead:
+    from app.tasks.notifications import notify_event_invited_task, notify_event_updated_task
+
     event = session.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -1166,23 +1096,33 @@ def update_event(
             )
         ).all()
 
-        updated: List[tuple[Event, datetime, datetime]] = []
-        for target in series_events:
-            new_start = target.starts_at + delta
-            new_end = target.ends_at + delta
-            participant_ids = _get_event_participant_ids(session, target.id)
-            _ensure_no_conflicts(
-                session,
-                calendar_id=target.calendar_id,
-                starts_at=new_start,
-                ends_at=new_end,
-                room_id=target.room_id,
-                participant_ids=participant_ids,
-                exclude_event_id=target.id,
-                creator_id=current_user.id,
-            )
-            updated.append((target, new_start, new_end))
+        series_ids = [target.id for target in series_events]
+        updated: List[tuple[Event, datetime, datetime]] = [
+            (target, target.starts_at + delta, target.ends_at + delta)
+            for target in series_events
+        ]
+        # Одна проверка на всю серию: старые интервалы вхождений исключены,
+        # поэтому вхождения не конфликтуют с ещё не перенесёнными соседями
+        series_participant_ids = session.exec(
+            select(EventParticipant.user_id)
+            .distinct()
+            .where(EventParticipant.event_id.in_(series_ids))
+        ).all()
+        _ensure_no_conflicts(
+            session,
+            slots=[(new_start, new_end) for _, new_start, new_end in updated],
+            participant_ids=list(series_participant_ids),
+            exclude_event_ids=series_ids,
+            creator_id=current_user.id,
+        )
 
+        book_rooms(
+            session,
+            [
+                RoomBooking(target.id, target.room_id, new_start, new_end)
+                for target, new_start, new_end in updated
+            ],
+        )
         for target, new_start, new_end in updated:
             target.starts_at = new_start
             target.ends_at = new_end
@@ -1225,14 +1165,13 @@ def update_event(
 
     _ensure_no_conflicts(
         session,
-        calendar_id=event.calendar_id,
-        starts_at=new_starts_at,
-        ends_at=new_ends_at,
-        room_id=new_room_id,
+        slots=[(new_starts_at, new_ends_at)],
         participant_ids=new_participant_ids,
-        exclude_event_id=event_id,
+        exclude_event_ids=[event_id],
         creator_id=current_user.id,
     )
+    if data.keys() & {"starts_at", "ends_at", "room_id"}:
+        book_rooms(session, [RoomBooking(event_id, new_room_id, new_starts_at, new_ends_at)])
 
     for field, value in data.items():
         setattr(event, field, value)
@@ -1254,11 +1193,7 @@ def update_event(
     session.commit()
 
     if "participant_ids" in payload.model_dump(exclude_unset=True):
-        existing = session.exec(
-            select(EventParticipant).where(EventParticipant.event_id == event_id)
-        ).all()
-        existing_user_ids = {ep.user_id for ep in existing}
-        existing_participants_map = {ep.user_id: ep for ep in existing}
+        existing_user_ids = set(_get_event_participant_ids(session, event_id))
         new_participant_ids_set = set(new_participant_ids)
         
         # Удаляем участников, которых больше нет
@@ -1271,29 +1206,17 @@ def update_event(
                 )
             )
         
-        # Добавляем новых участников
+        # Добавляем новых участников; статусы ответов оставшихся не меняются
         to_add = new_participant_ids_set - existing_user_ids
+        _attach_participants(session, [event_id], to_add)
+        # Отправляем уведомление новым участникам (асинхронно через Celery)
         for user_id in to_add:
-            participant = EventParticipant(
-                event_id=event_id,
-                user_id=user_id,
-                response_status="needs_action",
-            )
-            session.add(participant)
-            # Отправляем уведомление новым участникам (асинхронно через Celery)
             if user_id != current_user.id:
                 notify_event_invited_task.delay(
                     user_id=str(user_id),
                     event_id=str(event_id),
                     inviter_name=updater_name,
                 )
-        
-        # Сохраняем статусы ответов существующих участников
-        for user_id in existing_user_ids & new_participant_ids_set:
-            existing_participant = existing_participants_map[user_id]
-            if existing_participant.response_status in ("accepted", "declined"):
-                # Сохраняем статус ответа при обновлении события
-                pass
 
     session.commit()
     session.refresh(event)
@@ -1353,10 +1276,7 @@ def update_participant_status(
         # Пробрасываем HTTPException как есть
         raise
     except Exception as e:
-        # Логируем неожиданные ошибки
-        import traceback
-        print(f"[ERROR] update_participant_status failed: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("update_participant_status failed for event %s", event_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update participant status: {str(e)}"
@@ -1479,6 +1399,9 @@ def delete_event(
                     EventParticipant.event_id.in_(series_ids)
                 )
             )
+            # Вложения (ссылки на блобы снимаются, файлы удалит GC)
+            delete_event_attachments(session, series_ids)
+            release_rooms(session, series_ids)
             # И наконец события
             session.exec(delete(Event).where(Event.id.in_(series_ids)))
         else:
@@ -1488,6 +1411,8 @@ def delete_event(
                 .where(Notification.event_id == event.id)
                 .values(event_id=None)
             )
+            delete_event_attachments(session, [event.id])
+            release_rooms(session, [event.id])
             session.delete(event)
     else:
         # Создаем уведомления об отмене СИНХРОННО (до удаления события)
@@ -1514,6 +1439,9 @@ def delete_event(
         session.exec(
             delete(EventParticipant).where(EventParticipant.event_id == event_id)
         )
+        # Вложения (ссылки на блобы снимаются, файлы удалит GC)
+        delete_event_attachments(session, [event_id])
+        release_rooms(session, [event_id])
         # И наконец само событие
         session.delete(event)
 
@@ -1,24 +1,28 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime
 from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlmodel import select
 
-from app.api.deps import get_current_user
-from app.db import SessionDep
+from app.api.deps import get_current_user, get_current_user_async
+from app.db import AsyncSessionDep, SessionDep
 from app.models import Notification, User
 from app.schemas import NotificationRead, NotificationUpdate
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
 @router.get("/", response_model=List[NotificationRead], summary="List notifications")
-def list_notifications(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+async def list_notifications(
+    session: AsyncSessionDep,
+    current_user: User = Depends(get_current_user_async),
     unread_only: bool = Query(default=False, description="Show only unread notifications"),
     limit: int = Query(default=50, ge=1, le=100, description="Maximum number of notifications"),
 ) -> List[NotificationRead]:
@@ -33,7 +37,7 @@ def list_notifications(
             statement = statement.where(Notification.is_read == False)
         
         statement = statement.order_by(Notification.created_at.desc()).limit(limit)
-        notifications = session.exec(statement).all()
+        notifications = (await session.exec(statement)).all()
         
         # Убеждаемся, что все поля присутствуют
         result = []
@@ -46,10 +50,8 @@ def list_notifications(
         
         return result
     except Exception as e:
-        import traceback
         error_msg = f"Error listing notifications: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        print(traceback.format_exc())
+        logger.exception("Error listing notifications")
         raise HTTPException(
             status_code=500,
             detail=error_msg
@@ -57,17 +59,17 @@ def list_notifications(
 
 
 @router.get("/unread-count", summary="Get unread notifications count")
-def get_unread_count(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+async def get_unread_count(
+    session: AsyncSessionDep,
+    current_user: User = Depends(get_current_user_async),
 ) -> dict:
     """Get count of unread notifications."""
-    statement = select(Notification).where(
+    statement = select(func.count()).select_from(Notification).where(
         Notification.user_id == current_user.id,
         Notification.is_read == False,
         Notification.is_deleted == False,  # Исключаем удаленные
     )
-    count = len(session.exec(statement).all())
+    count = (await session.exec(statement)).one()
     return {"count": count}
 
 
@@ -93,10 +95,8 @@ def mark_all_read(
         session.commit()
         return {"deleted": count}
     except Exception as e:
-        import traceback
         error_msg = f"Error marking/deleting all notifications: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        print(traceback.format_exc())
+        logger.exception("Error marking/deleting all notifications")
         raise HTTPException(
             status_code=500,
             detail=error_msg
@@ -187,10 +187,8 @@ def update_notification(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         error_msg = f"Error updating notification {notification_id}: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        print(traceback.format_exc())
+        logger.exception("Error updating notification %s", notification_id)
         raise HTTPException(
             status_code=500,
             detail=error_msg
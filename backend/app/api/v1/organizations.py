@@ -11,6 +11,7 @@ from app.api.deps import get_current_user, is_admin_or_it
 from app.db import SessionDep
 from app.models import Organization, Department, User
 from app.schemas.organization import OrganizationCreate, OrganizationRead, OrganizationUpdate
+from app.services.cache import DEPARTMENTS_VERSION, bump_cache_version
 
 router = APIRouter()
 
@@ -53,6 +54,7 @@ def sync_organizations_from_departments(session: SessionDep) -> None:
         session.add(dept)
     
     if root_depts_without_org:
+        bump_cache_version(session, DEPARTMENTS_VERSION)
         session.commit()
 
 
@@ -123,6 +125,7 @@ def create_organization(
         manager_id=None
     )
     session.add(root_department)
+    bump_cache_version(session, DEPARTMENTS_VERSION)
     
     session.commit()
     session.refresh(organization)
@@ -209,6 +212,7 @@ def delete_organization(
         session.delete(dept)
     
     session.delete(organization)
+    bump_cache_version(session, DEPARTMENTS_VERSION)
     session.commit()
     return {"message": "Organization deleted successfully"}
 
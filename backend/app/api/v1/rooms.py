@@ -1,23 +1,202 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query, status
-from sqlmodel import select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, union_all
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import aliased
+from sqlmodel import and_, exists, or_, select
 
-from app.db import SessionDep
-from app.models import Event, Room
-from app.schemas import EventRead, RoomCreate, RoomRead, RoomUpdate
+from app.api.deps import get_current_user_async, is_admin_or_it_async
+from app.db import AsyncSessionDep, SessionDep
+from app.models import Event, Room, RoomAccess, RoomReservation, User, UserDepartment
+from app.schemas import (
+    EventRead,
+    RoomBusyInterval,
+    RoomCreate,
+    RoomOccupancy,
+    RoomOccupancyResponse,
+    RoomRead,
+    RoomUpdate,
+)
 
 router = APIRouter()
 
+OCCUPANCY_SLOT_MINUTES = 15
+OCCUPANCY_MAX_DAYS = 31
+
 
 @router.get("/", response_model=List[RoomRead], summary="List rooms")
-def list_rooms(session: SessionDep) -> List[Room]:
+async def list_rooms(session: AsyncSessionDep) -> List[Room]:
     statement = select(Room).where(Room.is_active == True).order_by(Room.name)
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    # В БД время хранится без timezone (UTC)
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _merge_intervals(rows, window_start: datetime, window_end: datetime) -> list[tuple[datetime, datetime]]:
+    """Clip rows (ordered by starts_at) to the window and merge overlapping or touching ones."""
+    merged: list[list[datetime]] = []
+    for row in rows:
+        starts_at, ends_at = max(row.starts_at, window_start), min(row.ends_at, window_end)
+        if ends_at <= starts_at:
+            continue
+        if merged and starts_at <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], ends_at)
+        else:
+            merged.append([starts_at, ends_at])
+    return [(starts_at, ends_at) for starts_at, ends_at in merged]
+
+
+def _occupancy_bitmap(intervals, window_start: datetime, slots: int) -> str:
+    bits = bytearray(b"0" * slots)
+    step = timedelta(minutes=OCCUPANCY_SLOT_MINUTES)
+    for starts_at, ends_at in intervals:
+        first = int((starts_at - window_start) // step)
+        last = -int(-(ends_at - window_start) // step)  # округление вверх
+        bits[first:min(last, slots)] = b"1" * (min(last, slots) - first)
+    return bits.decode()
+
+
+@router.get(
+    "/occupancy",
+    response_model=RoomOccupancyResponse,
+    summary="Occupancy of all accessible rooms",
+)
+async def get_rooms_occupancy(
+    session: AsyncSessionDep,
+    current_user: User = Depends(get_current_user_async),
+    window_start: datetime = Query(..., alias="from", description="Window start (ISO format)"),
+    window_end: datetime = Query(..., alias="to", description="Window end (ISO format)"),
+    organization_id: Optional[UUID] = Query(default=None),
+    output: Literal["intervals", "bitmap"] = Query(
+        default="intervals",
+        alias="format",
+        description="Busy intervals or a bitmap with 15-minute slots",
+    ),
+    min_capacity: Optional[int] = Query(default=None, ge=1, description="Only rooms with at least this capacity"),
+    available_only: bool = Query(default=False, description="Only rooms free for the whole window"),
+) -> RoomOccupancyResponse:
+    """
+    Busy time of every active room the user may book, for the room picker.
+
+    Rooms without access grants are open to everyone; rooms with grants are
+    listed for the granted users and departments (admins and IT see all rooms).
+    Busy ranges are read from ``room_reservations`` with one query on
+    ``(room_id, starts_at)`` bounded on both sides of the window.
+    """
+    window_start = _to_naive_utc(window_start)
+    window_end = _to_naive_utc(window_end)
+    if window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be later than 'from'",
+        )
+    if window_end - window_start > timedelta(days=OCCUPANCY_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Window must not exceed {OCCUPANCY_MAX_DAYS} days",
+        )
+
+    rooms_stmt = select(Room).where(Room.is_active == True)
+    if organization_id:
+        rooms_stmt = rooms_stmt.where(Room.organization_id == organization_id)
+    if min_capacity:
+        rooms_stmt = rooms_stmt.where(Room.capacity >= min_capacity)
+    if not await is_admin_or_it_async(current_user, session):
+        user_department_ids = select(UserDepartment.department_id).where(
+            UserDepartment.user_id == current_user.id
+        )
+        rooms_stmt = rooms_stmt.where(
+            or_(
+                ~exists().where(RoomAccess.room_id == Room.id),
+                exists().where(
+                    RoomAccess.room_id == Room.id,
+                    or_(
+                        RoomAccess.user_id == current_user.id,
+                        RoomAccess.department_id.in_(user_department_ids),
+                    ),
+                ),
+            )
+        )
+    rooms = (await session.exec(rooms_stmt.order_by(Room.name))).all()
+    if not rooms:
+        return RoomOccupancyResponse(
+            window_start=window_start,
+            window_end=window_end,
+            slot_minutes=OCCUPANCY_SLOT_MINUTES,
+            rooms=[],
+        )
+
+    room_ids = [room.id for room in rooms]
+    reservation_columns = (RoomReservation.room_id, RoomReservation.starts_at, RoomReservation.ends_at)
+    # Брони одной переговорки не пересекаются, поэтому начало окна может
+    # перекрыть только последняя бронь, начавшаяся раньше него — она находится
+    # поиском по индексу, а не просмотром всей истории переговорки
+    previous = aliased(RoomReservation)
+    latest_before_window = (
+        sql_select(func.max(previous.starts_at))
+        .where(previous.room_id == Room.id, previous.starts_at < window_start)
+        .scalar_subquery()
+    )
+    straddling = (
+        sql_select(*reservation_columns)
+        .select_from(Room)
+        .join(
+            RoomReservation,
+            and_(RoomReservation.room_id == Room.id, RoomReservation.starts_at == latest_before_window),
+        )
+        .where(Room.id.in_(room_ids), RoomReservation.ends_at > window_start)
+    )
+    inside = sql_select(*reservation_columns).where(
+        RoomReservation.room_id.in_(room_ids),
+        RoomReservation.starts_at >= window_start,
+        RoomReservation.starts_at < window_end,
+    )
+    busy = union_all(straddling, inside).subquery()
+    busy_rows = (
+        await session.exec(sql_select(busy).order_by(busy.c.room_id, busy.c.starts_at))
+    ).all()
+    busy_by_room = {
+        room_id: _merge_intervals(rows, window_start, window_end)
+        for room_id, rows in groupby(busy_rows, key=lambda row: row.room_id)
+    }
+
+    slots = -int(-(window_end - window_start) // timedelta(minutes=OCCUPANCY_SLOT_MINUTES))
+    result: list[RoomOccupancy] = []
+    for room in rooms:
+        intervals = busy_by_room.get(room.id, [])
+        if available_only and intervals:
+            continue
+        occupancy = RoomOccupancy(
+            room_id=room.id,
+            name=room.name,
+            capacity=room.capacity,
+            location=room.location,
+        )
+        if output == "bitmap":
+            occupancy.bitmap = _occupancy_bitmap(intervals, window_start, slots)
+        else:
+            occupancy.busy = [
+                RoomBusyInterval(starts_at=starts_at, ends_at=ends_at) for starts_at, ends_at in intervals
+            ]
+        result.append(occupancy)
+
+    return RoomOccupancyResponse(
+        window_start=window_start,
+        window_end=window_end,
+        slot_minutes=OCCUPANCY_SLOT_MINUTES,
+        rooms=result,
+    )
 
 
 @router.post(
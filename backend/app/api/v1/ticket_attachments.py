@@ -1,16 +1,22 @@
 from __future__ import annotations
 
 from datetime import datetime
-from pathlib import Path
-from uuid import UUID, uuid4
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlmodel import select
 
 from app.api.deps import get_current_user
 from app.db import SessionDep
 from app.models import Ticket, TicketAttachment, User
+from app.services.blob_store import (
+    acquire_blob,
+    release_attachment_quota,
+    release_blobs,
+    reserve_attachment_quota,
+    stage_blob,
+)
+from app.services.downloads import download_response
 
 router = APIRouter()
 
@@ -19,23 +25,6 @@ MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 МБ в байтах
 # Максимальный размер всех файлов для тикета: 20 МБ
 MAX_TOTAL_SIZE = 20 * 1024 * 1024  # 20 МБ в байтах
 
-# Директория для хранения файлов
-BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
-UPLOAD_DIR = BASE_DIR / "uploads" / "ticket_attachments"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-
-def _get_total_attachment_size(session: SessionDep, ticket_id: UUID) -> int:
-    """Получить общий размер всех файлов тикета."""
-    attachments = session.exec(
-        select(TicketAttachment).where(
-            TicketAttachment.ticket_id == ticket_id,
-            TicketAttachment.is_deleted == False,
-        )
-    ).all()
-    return sum(att.file_size for att in attachments)
-
-
 @router.post(
     "/tickets/{ticket_id}/attachments",
     status_code=status.HTTP_201_CREATED,
@@ -55,43 +44,30 @@ async def upload_ticket_attachment(
             detail="Ticket not found",
         )
 
-    # Проверяем размер файла
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024 * 1024):.0f} MB",
-        )
-
-    # Проверяем общий размер всех файлов тикета
-    total_size = _get_total_attachment_size(session, ticket_id)
-    if total_size + file_size > MAX_TOTAL_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Total file size exceeds maximum allowed size of {MAX_TOTAL_SIZE / (1024 * 1024):.0f} MB",
-        )
+    # Копируем файл во временный файл потоково; лимит и SHA-256 считаются по ходу чтения
+    stored = await stage_blob(file, MAX_FILE_SIZE)
 
-    # Сохраняем файл
     try:
-        file_extension = Path(file.filename or "").suffix
-        filename = f"{ticket_id}_{uuid4().hex}{file_extension}"
-        file_path = UPLOAD_DIR / filename
-        
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        # Проверяем и резервируем общий размер файлов тикета одним условным UPDATE
+        if not reserve_attachment_quota(session, Ticket, ticket_id, stored.size, MAX_TOTAL_SIZE):
+            stored.discard()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Total file size exceeds maximum allowed size of {MAX_TOTAL_SIZE / (1024 * 1024):.0f} MB",
+            )
+
+        # Одинаковое содержимое хранится один раз — повторная загрузка только добавляет ссылку
+        blob, blob_file = acquire_blob(session, stored)
 
         # Создаем запись в БД
         attachment = TicketAttachment(
             ticket_id=ticket_id,
             uploaded_by=current_user.id,
             original_filename=file.filename or "unknown",
-            file_path=str(file_path.absolute()),
-            file_size=file_size,
+            file_path=str(blob_file.absolute()),
+            file_size=blob.size,
             content_type=file.content_type or "application/octet-stream",
+            blob_sha256=blob.sha256,
         )
 
         session.add(attachment)
@@ -106,9 +82,12 @@ async def upload_ticket_attachment(
             "content_type": attachment.content_type,
             "created_at": attachment.created_at.isoformat(),
         }
+    except HTTPException:
+        session.rollback()
+        raise
     except Exception as e:
-        if file_path.exists():
-            file_path.unlink()
+        session.rollback()
+        stored.discard()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {str(e)}",
@@ -159,35 +138,33 @@ def list_ticket_attachments(
 )
 def download_ticket_attachment(
     attachment_id: UUID,
+    request: Request,
     session: SessionDep,
     current_user: User = Depends(get_current_user),
 ):
-    """Скачать вложение тикета."""
-    attachment = session.get(TicketAttachment, attachment_id)
-    if not attachment or attachment.is_deleted:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Attachment not found",
-        )
-
-    ticket = session.get(Ticket, attachment.ticket_id)
-    if not ticket or ticket.is_deleted:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ticket not found",
+    """Скачать вложение тикета (поддерживаются Range и условные запросы)."""
+    attachment = session.exec(
+        select(TicketAttachment)
+        .join(Ticket, Ticket.id == TicketAttachment.ticket_id)
+        .where(
+            TicketAttachment.id == attachment_id,
+            TicketAttachment.is_deleted == False,
+            Ticket.is_deleted == False,
         )
-
-    file_path = Path(attachment.file_path)
-    if not file_path.exists():
+    ).first()
+    if not attachment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server",
+            detail="Attachment not found",
         )
 
-    return FileResponse(
-        path=str(file_path),
+    return download_response(
+        request,
+        attachment.file_path,
         filename=attachment.original_filename,
         media_type=attachment.content_type,
+        content_hash=attachment.blob_sha256,
+        last_modified=attachment.created_at,
     )
 
 
@@ -219,6 +196,9 @@ def delete_ticket_attachment(
     # Soft delete
     attachment.is_deleted = True
     attachment.deleted_at = datetime.utcnow()
+    # Снимаем ссылку на блоб (сам файл удалит GC) и освобождаем квоту тикета
+    release_blobs(session, [attachment.blob_sha256])
+    release_attachment_quota(session, Ticket, attachment.ticket_id, attachment.file_size)
 
     session.add(attachment)
     session.commit()
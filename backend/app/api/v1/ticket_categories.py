@@ -17,6 +17,7 @@ from app.schemas.ticket import (
     TicketStatistics, TicketStatusStats, TicketPriorityStats,
     TicketCategoryStats, TicketAssigneeStats
 )
+from app.services.ticket_sla import SLA_STOPPED_STATUSES, refresh_sla_deadlines
 
 router = APIRouter()
 
@@ -112,6 +113,8 @@ def create_category(
         icon=category_data.icon,
         parent_id=category_data.parent_id,
         sort_order=category_data.sort_order,
+        sla_response_hours=category_data.sla_response_hours,
+        sla_resolution_hours=category_data.sla_resolution_hours,
     )
 
     session.add(category)
@@ -192,8 +195,28 @@ def update_category(
     if category_update.is_active is not None:
         category.is_active = category_update.is_active
 
+    sla_changed = False
+    if category_update.sla_response_hours is not None and category_update.sla_response_hours != category.sla_response_hours:
+        category.sla_response_hours = category_update.sla_response_hours
+        sla_changed = True
+    if category_update.sla_resolution_hours is not None and category_update.sla_resolution_hours != category.sla_resolution_hours:
+        category.sla_resolution_hours = category_update.sla_resolution_hours
+        sla_changed = True
+
     category.touch()
     session.add(category)
+    if sla_changed:
+        session.flush()
+        # Recompute deadlines of tickets still tracked by the SLA engine
+        open_ticket_ids = session.exec(
+            select(Ticket.id).where(
+                Ticket.category_id == category.id,
+                Ticket.is_deleted == False,
+                Ticket.sla_breach == False,
+                Ticket.status.notin_(SLA_STOPPED_STATUSES),
+            )
+        ).all()
+        refresh_sla_deadlines(session, open_ticket_ids)
     session.commit()
     session.refresh(category)
 
@@ -5,18 +5,19 @@ from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, and_
+from sqlalchemy import and_, case, func, insert, update
 from sqlmodel import select
 
 from app.api.deps import get_current_user
 from app.db import SessionDep
-from app.models import Ticket, TicketCategory, User
+from app.models import Notification, Ticket, TicketCategory, User
 from app.models.ticket import TicketPriority, TicketStatus
 from app.schemas.ticket import (
     TicketStatistics, TicketStatusStats, TicketPriorityStats,
     TicketCategoryStats, TicketAssigneeStats, TicketBulkUpdate, TicketBulkResult
 )
 from app.models import TicketHistory, TicketHistoryAction
+from app.services.ticket_sla import refresh_sla_deadlines
 
 router = APIRouter()
 
@@ -52,29 +53,6 @@ def get_priority_label(pr: str) -> str:
     return labels.get(pr, pr)
 
 
-def add_ticket_history(
-    session,
-    ticket_id: UUID,
-    user_id: UUID,
-    action: str,
-    field_name: str = None,
-    old_value: str = None,
-    new_value: str = None,
-    details: str = None
-):
-    """Add history entry for ticket change."""
-    history = TicketHistory(
-        ticket_id=ticket_id,
-        user_id=user_id,
-        action=action,
-        field_name=field_name,
-        old_value=old_value,
-        new_value=new_value,
-        details=details
-    )
-    session.add(history)
-
-
 # === STATISTICS ===
 
 @router.get(
@@ -301,62 +279,144 @@ def bulk_update_tickets(
             detail="Only staff can perform bulk operations"
         )
 
-    updated_count = 0
-    failed_ids = []
-
-    for ticket_id in bulk_data.ticket_ids:
-        ticket = session.get(Ticket, ticket_id)
-        if not ticket or ticket.is_deleted:
-            failed_ids.append(ticket_id)
-            continue
-
-        try:
-            if bulk_data.status:
-                if ticket.status != bulk_data.status:
-                    add_ticket_history(
-                        session, ticket.id, current_user.id,
-                        TicketHistoryAction.STATUS_CHANGED,
-                        "status", get_status_label(ticket.status), get_status_label(bulk_data.status)
-                    )
-                    ticket.status = bulk_data.status
-                    if bulk_data.status == TicketStatus.RESOLVED and not ticket.resolved_at:
-                        ticket.resolved_at = datetime.utcnow()
-                    elif bulk_data.status == TicketStatus.CLOSED and not ticket.closed_at:
-                        ticket.closed_at = datetime.utcnow()
-
-            if bulk_data.priority:
-                if ticket.priority != bulk_data.priority:
-                    add_ticket_history(
-                        session, ticket.id, current_user.id,
-                        TicketHistoryAction.PRIORITY_CHANGED,
-                        "priority", get_priority_label(ticket.priority), get_priority_label(bulk_data.priority)
-                    )
-                    ticket.priority = bulk_data.priority
-
-            if bulk_data.assigned_to is not None:
-                if ticket.assigned_to != bulk_data.assigned_to:
-                    new_user = session.get(User, bulk_data.assigned_to) if bulk_data.assigned_to else None
-                    add_ticket_history(
-                        session, ticket.id, current_user.id,
-                        TicketHistoryAction.ASSIGNED if bulk_data.assigned_to else TicketHistoryAction.UNASSIGNED,
-                        "assigned_to", "предыдущий", new_user.full_name if new_user else "Не назначен"
-                    )
-                    ticket.assigned_to = bulk_data.assigned_to
-
-            if bulk_data.category_id is not None:
-                ticket.category_id = bulk_data.category_id
-
-            ticket.touch()
-            session.add(ticket)
-            updated_count += 1
-        except Exception:
-            failed_ids.append(ticket_id)
+    ticket_ids = list(dict.fromkeys(bulk_data.ticket_ids))
+    if not ticket_ids:
+        return TicketBulkResult(updated_count=0, failed_count=0, failed_ids=[])
+
+    # Snapshot of previous values in one query (for history and notifications)
+    previous = session.exec(
+        select(
+            Ticket.id, Ticket.title, Ticket.status, Ticket.priority,
+            Ticket.assigned_to, Ticket.created_by,
+        )
+        .where(Ticket.id.in_(ticket_ids), Ticket.is_deleted == False)
+        .with_for_update()
+    ).all()
+    previous_by_id = {row.id: row for row in previous}
+    failed_ids = [ticket_id for ticket_id in ticket_ids if ticket_id not in previous_by_id]
+    if not previous_by_id:
+        return TicketBulkResult(updated_count=0, failed_count=len(failed_ids), failed_ids=failed_ids)
+
+    now = datetime.utcnow()
+    values = {"updated_at": now}
+    if bulk_data.status:
+        values["status"] = bulk_data.status
+        if bulk_data.status == TicketStatus.RESOLVED:
+            values["resolved_at"] = func.coalesce(Ticket.resolved_at, now)
+        elif bulk_data.status == TicketStatus.CLOSED:
+            values["closed_at"] = func.coalesce(Ticket.closed_at, now)
+    if bulk_data.priority:
+        values["priority"] = bulk_data.priority
+    if bulk_data.assigned_to is not None:
+        values["assigned_to"] = bulk_data.assigned_to
+        # Track first response time (bulk operations are staff-only) — only for tickets
+        # whose assignee actually changes, as in update_ticket; SET sees the old assigned_to
+        values["first_response_at"] = case(
+            (
+                Ticket.assigned_to.is_distinct_from(bulk_data.assigned_to),
+                func.coalesce(Ticket.first_response_at, now),
+            ),
+            else_=Ticket.first_response_at,
+        )
+    if bulk_data.category_id is not None:
+        values["category_id"] = bulk_data.category_id
+
+    updated_ids = set(session.execute(
+        update(Ticket)
+        .where(Ticket.id.in_(list(previous_by_id)), Ticket.is_deleted == False)
+        .values(**values)
+        .returning(Ticket.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all())
+    # Rows deleted concurrently between the snapshot and the update
+    failed_ids.extend(ticket_id for ticket_id in previous_by_id if ticket_id not in updated_ids)
+
+    # Assignee names for history, fetched once for the whole batch
+    user_names = {}
+    if bulk_data.assigned_to is not None:
+        name_ids = {bulk_data.assigned_to} | {
+            previous_by_id[ticket_id].assigned_to
+            for ticket_id in updated_ids
+            if previous_by_id[ticket_id].assigned_to
+        }
+        user_names = {
+            row.id: row.full_name or row.email
+            for row in session.exec(
+                select(User.id, User.full_name, User.email).where(User.id.in_(name_ids))
+            ).all()
+        }
+
+    changer_name = current_user.full_name or current_user.email
+    history_rows = []
+    notification_rows = []
+    for ticket_id in updated_ids:
+        old = previous_by_id[ticket_id]
+
+        if bulk_data.status and old.status != bulk_data.status:
+            history_rows.append(TicketHistory(
+                ticket_id=ticket_id,
+                user_id=current_user.id,
+                action=TicketHistoryAction.STATUS_CHANGED,
+                field_name="status",
+                old_value=get_status_label(old.status),
+                new_value=get_status_label(bulk_data.status),
+                created_at=now,
+            ))
+            if old.created_by and old.created_by != current_user.id:
+                notification_rows.append(Notification(
+                    user_id=old.created_by,
+                    ticket_id=ticket_id,
+                    type="ticket_status_changed",
+                    title="Статус изменён",
+                    message=f"{changer_name} изменил статус тикета «{old.title}» на «{get_status_label(bulk_data.status)}»",
+                    created_at=now,
+                ))
+
+        if bulk_data.priority and old.priority != bulk_data.priority:
+            history_rows.append(TicketHistory(
+                ticket_id=ticket_id,
+                user_id=current_user.id,
+                action=TicketHistoryAction.PRIORITY_CHANGED,
+                field_name="priority",
+                old_value=get_priority_label(old.priority),
+                new_value=get_priority_label(bulk_data.priority),
+                created_at=now,
+            ))
+
+        if bulk_data.assigned_to is not None and old.assigned_to != bulk_data.assigned_to:
+            action = TicketHistoryAction.ASSIGNED if old.assigned_to is None else TicketHistoryAction.REASSIGNED
+            history_rows.append(TicketHistory(
+                ticket_id=ticket_id,
+                user_id=current_user.id,
+                action=action,
+                field_name="assigned_to",
+                old_value=user_names.get(old.assigned_to, "Не назначен") if old.assigned_to else "Не назначен",
+                new_value=user_names.get(bulk_data.assigned_to, str(bulk_data.assigned_to)),
+                created_at=now,
+            ))
+            if bulk_data.assigned_to != current_user.id:
+                notification_rows.append(Notification(
+                    user_id=bulk_data.assigned_to,
+                    ticket_id=ticket_id,
+                    type="ticket_assigned" if action == TicketHistoryAction.ASSIGNED else "ticket_reassigned",
+                    title="Назначен тикет" if action == TicketHistoryAction.ASSIGNED else "Переназначен тикет",
+                    message=f"{changer_name} назначил вам тикет: {old.title}",
+                    created_at=now,
+                ))
+
+    # SLA deadlines depend on status/priority/category/first response
+    refresh_sla_deadlines(session, updated_ids)
+
+    # One multi-row INSERT per table
+    if history_rows:
+        session.execute(insert(TicketHistory), [row.model_dump() for row in history_rows])
+    if notification_rows:
+        session.execute(insert(Notification), [row.model_dump() for row in notification_rows])
 
     session.commit()
 
     return TicketBulkResult(
-        updated_count=updated_count,
+        updated_count=len(updated_ids),
         failed_count=len(failed_ids),
         failed_ids=failed_ids
     )
-
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import func, or_, and_
 from sqlmodel import select
 
@@ -20,6 +20,10 @@ from app.schemas.ticket import (
     TicketHistoryRead, TicketInternalNoteCreate, TicketInternalNoteRead,
     TicketInternalNoteUpdate
 )
+from app.services.pagination import (
+    decode_cursor, encode_cursor, estimate_row_count, keyset_condition, keyset_order_by
+)
+from app.services.ticket_sla import refresh_ticket_sla
 
 router = APIRouter()
 
@@ -161,47 +165,25 @@ def populate_ticket_data(
     return ticket_data
 
 
-# === TICKETS CRUD ===
-
-@router.get(
-    "/",
-    response_model=List[TicketRead],
-    status_code=status.HTTP_200_OK,
-)
-def list_tickets(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
-    # Basic filters
-    status_filter: Optional[str] = Query(None, alias="status"),
-    priority_filter: Optional[str] = Query(None, alias="priority"),
-    category_id: Optional[UUID] = Query(None),
-    assigned_to_me: bool = Query(False),
-    created_by_me: bool = Query(False),
-    unassigned: bool = Query(False),
-    # Search
-    search: Optional[str] = Query(None, min_length=2, max_length=100),
-    # Date filters
-    created_from: Optional[datetime] = Query(None),
-    created_to: Optional[datetime] = Query(None),
-    due_before: Optional[datetime] = Query(None),
-    # Special filters
-    sla_breach: Optional[bool] = Query(None),
-    has_attachments: Optional[bool] = Query(None),
-    # Pagination
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=200),
-    # Sorting
-    sort_by: str = Query("created_at", pattern="^(created_at|updated_at|priority|status|due_date)$"),
-    sort_order: str = Query("desc", pattern="^(asc|desc)$"),
-) -> List[TicketRead]:
-    """Get all tickets with advanced filters."""
-    # Check access
-    if not current_user.access_tickets and not is_staff(current_user):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Tickets access denied"
-        )
-
-    statement = select(Ticket).where(Ticket.is_deleted == False)
+def apply_ticket_filters(
+    statement,
+    current_user: User,
+    *,
+    status_filter: Optional[str] = None,
+    priority_filter: Optional[str] = None,
+    category_id: Optional[UUID] = None,
+    assigned_to_me: bool = False,
+    created_by_me: bool = False,
+    unassigned: bool = False,
+    search: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    sla_breach: Optional[bool] = None,
+    has_attachments: Optional[bool] = None,
+):
+    """Apply visibility rules and list filters shared by list and count endpoints."""
+    statement = statement.where(Ticket.is_deleted == False)
 
     # Regular users can only see their own tickets
     if not is_staff(current_user):
@@ -236,7 +218,7 @@ def list_tickets(
             or_(
                 Ticket.title.ilike(search_pattern),
                 Ticket.description.ilike(search_pattern),
-                Ticket.tags.ilike(search_pattern) if Ticket.tags else False,
+                Ticket.tags.ilike(search_pattern),
             )
         )
 
@@ -252,29 +234,139 @@ def list_tickets(
     if sla_breach is not None:
         statement = statement.where(Ticket.sla_breach == sla_breach)
     if has_attachments is not None:
+        # Subquery for tickets with attachments
+        subquery = select(TicketAttachment.ticket_id).where(
+            TicketAttachment.is_deleted == False
+        ).distinct()
         if has_attachments:
-            # Subquery for tickets with attachments
-            subquery = select(TicketAttachment.ticket_id).where(
-                TicketAttachment.is_deleted == False
-            ).distinct()
             statement = statement.where(Ticket.id.in_(subquery))
         else:
-            subquery = select(TicketAttachment.ticket_id).where(
-                TicketAttachment.is_deleted == False
-            ).distinct()
             statement = statement.where(Ticket.id.notin_(subquery))
 
+    return statement
+
+
+# === TICKETS CRUD ===
+
+@router.get(
+    "/",
+    response_model=List[TicketRead],
+    status_code=status.HTTP_200_OK,
+)
+def list_tickets(
+    session: SessionDep,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    # Basic filters
+    status_filter: Optional[str] = Query(None, alias="status"),
+    priority_filter: Optional[str] = Query(None, alias="priority"),
+    category_id: Optional[UUID] = Query(None),
+    assigned_to_me: bool = Query(False),
+    created_by_me: bool = Query(False),
+    unassigned: bool = Query(False),
+    # Search
+    search: Optional[str] = Query(None, min_length=2, max_length=100),
+    # Date filters
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    due_before: Optional[datetime] = Query(None),
+    # Special filters
+    sla_breach: Optional[bool] = Query(None),
+    has_attachments: Optional[bool] = Query(None),
+    # Pagination: cursor (keyset) is preferred, skip is kept for old clients
+    cursor: Optional[str] = Query(None, max_length=512),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    # Total count in X-Total-Count header: exact (window count) or estimate (planner)
+    total: Optional[str] = Query(None, pattern="^(exact|estimate)$"),
     # Sorting
+    sort_by: str = Query("created_at", pattern="^(created_at|updated_at|priority|status|due_date)$"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+) -> List[TicketRead]:
+    """
+    Get all tickets with advanced filters.
+
+    Pagination is keyset-based on (sort_by, id): pass the X-Next-Cursor header value
+    of the previous page as `cursor`. With `total` set, the total number of matching
+    tickets is returned in X-Total-Count without a separate /count request.
+    """
+    # Check access
+    if not current_user.access_tickets and not is_staff(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Tickets access denied"
+        )
+
+    filters = dict(
+        status_filter=status_filter,
+        priority_filter=priority_filter,
+        category_id=category_id,
+        assigned_to_me=assigned_to_me,
+        created_by_me=created_by_me,
+        unassigned=unassigned,
+        search=search,
+        created_from=created_from,
+        created_to=created_to,
+        due_before=due_before,
+        sla_breach=sla_breach,
+        has_attachments=has_attachments,
+    )
+
     sort_column = getattr(Ticket, sort_by)
-    if sort_order == "desc":
-        statement = statement.order_by(sort_column.desc())
+    descending = sort_order == "desc"
+
+    total_count: Optional[int] = None
+    total_estimated = False
+    if total == "estimate":
+        total_count = estimate_row_count(
+            session, apply_ticket_filters(select(Ticket.id), current_user, **filters)
+        )
+        total_estimated = total_count is not None
+
+    if total == "exact" or (total == "estimate" and total_count is None):
+        # Window count over the filtered set, computed in the same query as the page
+        matched = apply_ticket_filters(
+            select(Ticket.id, func.count().over().label("total_count")),
+            current_user,
+            **filters,
+        ).subquery()
+        statement = select(Ticket, matched.c.total_count).join(
+            matched, Ticket.id == matched.c.id
+        )
     else:
-        statement = statement.order_by(sort_column.asc())
+        statement = apply_ticket_filters(select(Ticket), current_user, **filters)
 
-    # Pagination
-    statement = statement.offset(skip).limit(limit)
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_column)
+        statement = statement.where(
+            keyset_condition(sort_column, Ticket.id, last_value, last_id, descending)
+        )
+    elif skip:
+        statement = statement.offset(skip)
 
-    tickets = session.exec(statement).all()
+    statement = statement.order_by(
+        *keyset_order_by(sort_column, Ticket.id, descending)
+    ).limit(limit)
+
+    if total_count is None and total is not None:
+        rows = session.exec(statement).all()
+        tickets = [row[0] for row in rows]
+        if rows:
+            total_count = rows[0][1]
+        else:
+            # Empty page (past the end): window count is unavailable, count directly
+            total_count = session.exec(
+                apply_ticket_filters(select(func.count(Ticket.id)), current_user, **filters)
+            ).one()
+    else:
+        tickets = session.exec(statement).all()
+
+    if len(tickets) == limit:
+        last = tickets[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort_by), last.id)
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(total_count)
+        if total_estimated:
+            response.headers["X-Total-Count-Estimated"] = "true"
 
     # Populate ticket data
     return [populate_ticket_data(session, ticket, current_user) for ticket in tickets]
@@ -300,36 +392,16 @@ def count_tickets(
             status_code=status.HTTP_403_FORBIDDEN, detail="Tickets access denied"
         )
 
-    statement = select(func.count(Ticket.id)).where(Ticket.is_deleted == False)
-
-    if not is_staff(current_user):
-        statement = statement.where(
-            or_(
-                Ticket.created_by == current_user.id,
-                Ticket.assigned_to == current_user.id,
-            )
-        )
-
-    if status_filter:
-        statuses = status_filter.split(",")
-        statement = statement.where(Ticket.status.in_(statuses))
-    if priority_filter:
-        priorities = priority_filter.split(",")
-        statement = statement.where(Ticket.priority.in_(priorities))
-    if category_id:
-        statement = statement.where(Ticket.category_id == category_id)
-    if assigned_to_me:
-        statement = statement.where(Ticket.assigned_to == current_user.id)
-    if unassigned:
-        statement = statement.where(Ticket.assigned_to == None)
-    if search:
-        search_pattern = f"%{search}%"
-        statement = statement.where(
-            or_(
-                Ticket.title.ilike(search_pattern),
-                Ticket.description.ilike(search_pattern),
-            )
-        )
+    statement = apply_ticket_filters(
+        select(func.count(Ticket.id)),
+        current_user,
+        status_filter=status_filter,
+        priority_filter=priority_filter,
+        category_id=category_id,
+        assigned_to_me=assigned_to_me,
+        unassigned=unassigned,
+        search=search,
+    )
 
     count = session.exec(statement).one()
     return {"count": count}
@@ -399,6 +471,7 @@ def create_ticket(
         TicketHistoryAction.CREATED,
         details=f"Тикет создан с приоритетом {get_priority_label(ticket.priority)}"
     )
+    refresh_ticket_sla(session, ticket)
     session.commit()
 
     return populate_ticket_data(session, ticket, current_user)
@@ -550,7 +623,11 @@ def update_ticket(
         ticket.category_id = ticket_update.category_id
 
     if ticket_update.due_date is not None:
-        ticket.due_date = ticket_update.due_date
+        due_date = ticket_update.due_date
+        # В БД время хранится без timezone (UTC)
+        if due_date.tzinfo is not None:
+            due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+        ticket.due_date = due_date
 
     if ticket_update.tags is not None:
         ticket.tags = ticket_update.tags
@@ -558,6 +635,7 @@ def update_ticket(
     if ticket_update.sla_breach is not None:
         ticket.sla_breach = ticket_update.sla_breach
 
+    refresh_ticket_sla(session, ticket)
     ticket.touch()
     session.add(ticket)
     session.commit()
@@ -596,6 +674,7 @@ def delete_ticket(
 
     ticket.is_deleted = True
     ticket.deleted_at = datetime.utcnow()
+    ticket.sla_due_at = None
 
     session.add(ticket)
     session.commit()
@@ -1,12 +1,18 @@
 """API endpoints for user avatar uploads."""
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from uuid import UUID, uuid4
-import os
+import logging
 
 from app.api.deps import get_current_user
 from app.db import SessionDep
 from app.models import User
+from app.services.avatars import remove_all_avatar_files, url_to_path
+from app.services.cache import USERS_VERSION, bump_cache_version
+from app.services.storage import save_upload
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -30,16 +36,6 @@ async def upload_avatar(
     file: UploadFile = File(...),
 ) -> dict:
     """Upload avatar for current user."""
-    # Validate file size
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / 1024 / 1024}MB",
-        )
-    
     # Validate file extension
     file_extension = Path(file.filename or "").suffix.lower()
     if file_extension not in ALLOWED_EXTENSIONS:
@@ -47,37 +43,46 @@ async def upload_avatar(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}",
         )
-    
+
     # Generate unique filename
     filename = f"{current_user.id}_{uuid4().hex}{file_extension}"
     file_path = UPLOAD_DIR / filename
-    
-    # Delete old avatar if exists
-    if current_user.avatar_url:
-        old_path = Path(current_user.avatar_url)
-        if old_path.is_absolute() and old_path.exists():
-            try:
-                old_path.unlink()
-            except Exception:
-                pass  # Ignore errors when deleting old file
-    
-    # Save new file
+
+    # Save new file (streamed, size limit enforced while copying)
     try:
-        with open(file_path, "wb") as f:
-            f.write(file_content)
-    except IOError as e:
+        await save_upload(file, file_path, MAX_FILE_SIZE)
+    except OSError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {e}",
         )
-    
-    # Update user record with relative URL
+
+    # Delete old unprocessed original if exists
+    # (old thumbnails are removed by the worker once the new ones are ready)
+    old_path = url_to_path(current_user.avatar_url)
+    if old_path is not None and old_path.parent == UPLOAD_DIR.resolve():
+        old_path.unlink(missing_ok=True)
+
+    # Update user record with relative URL; the original is served until thumbnails are ready
     avatar_url = f"/uploads/user_avatars/{filename}"
     current_user.avatar_url = avatar_url
+    current_user.avatar_variants = None
     session.add(current_user)
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
     session.refresh(current_user)
-    
+
+    # Миниатюры строит воркер, вне запроса; публикация в брокер — в пуле потоков,
+    # чтобы недоступный брокер не держал event loop
+    from app.tasks.avatars import process_avatar
+
+    try:
+        await run_in_threadpool(
+            process_avatar.apply_async, args=(str(current_user.id), avatar_url), retry=False
+        )
+    except Exception:
+        logger.warning("Failed to enqueue avatar processing for user %s", current_user.id, exc_info=True)
+
     return {"avatar_url": avatar_url}
 
 
@@ -92,16 +97,11 @@ def delete_avatar(
 ) -> None:
     """Delete avatar for current user."""
     if current_user.avatar_url:
-        file_path = Path(current_user.avatar_url)
-        if not file_path.is_absolute():
-            file_path = BASE_DIR / file_path
-        if file_path.exists():
-            try:
-                file_path.unlink()
-            except Exception:
-                pass  # Ignore errors when deleting file
-        
+        remove_all_avatar_files(current_user.id, current_user.avatar_url)
+
         current_user.avatar_url = None
+        current_user.avatar_variants = None
         session.add(current_user)
+        bump_cache_version(session, USERS_VERSION)
         session.commit()
 
@@ -1,60 +1,193 @@
 from __future__ import annotations
 
+import logging
+from collections import defaultdict
 from datetime import date, datetime
-from typing import List
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, extract, func, or_
+from sqlalchemy import select as sql_select
 from sqlmodel import select
 from app.core.security import get_password_hash
 
 from app.api.deps import get_current_user, is_admin_or_it
 from app.db import SessionDep
-from app.models import User, UserDepartment, UserOrganization
-from app.schemas import UserBase, UserRead, UserUpdate, UserCreate
+from app.models import Event, EventParticipant, User, UserDepartment, UserOrganization
+from app.schemas import UserBase, UserPickerRead, UserRead, UserUpdate, UserCreate
+from app.services.cache import (
+    USERS_VERSION,
+    VersionedCache,
+    bump_cache_version,
+    etag_matches,
+    get_cache_version,
+)
+from app.services.ical import ICAL_MEDIA_TYPE, export_etag, series_order, stream_ics
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[UserRead], summary="List users")
-def list_users(
+# Сериализованный JSON полного справочника пользователей, ключ версии — USERS_VERSION
+_directory_cache = VersionedCache(maxsize=2)
+_user_list_adapter = TypeAdapter(List[UserRead])
+
+
+def _load_memberships(
     session: SessionDep,
-    current_user: User = Depends(get_current_user),
+    user_ids: Optional[List[UUID]] = None,
+) -> tuple[Dict[UUID, List[UUID]], Dict[UUID, List[UUID]]]:
+    """Load department and organization memberships with two queries (for all users if user_ids is None)."""
+    dept_statement = select(UserDepartment.user_id, UserDepartment.department_id)
+    org_statement = select(UserOrganization.user_id, UserOrganization.organization_id)
+    if user_ids is not None:
+        dept_statement = dept_statement.where(UserDepartment.user_id.in_(user_ids))
+        org_statement = org_statement.where(UserOrganization.user_id.in_(user_ids))
+
+    department_ids: Dict[UUID, List[UUID]] = defaultdict(list)
+    for user_id, department_id in session.exec(dept_statement).all():
+        department_ids[user_id].append(department_id)
+    organization_ids: Dict[UUID, List[UUID]] = defaultdict(list)
+    for user_id, organization_id in session.exec(org_statement).all():
+        organization_ids[user_id].append(organization_id)
+    return department_ids, organization_ids
+
+
+def _serialize_users(
+    session: SessionDep,
+    users: List[User],
+    *,
+    all_users: bool = False,
 ) -> List[UserRead]:
-    statement = select(User).order_by(User.created_at.asc())
-    users = session.exec(statement).all()
-    
-    # Load many-to-many relationships
+    """Serialize users with many-to-many relationships (two membership queries in total)."""
+    if not users:
+        return []
+    department_ids, organization_ids = _load_memberships(
+        session, None if all_users else [user.id for user in users]
+    )
     result = []
     for user in users:
-        user_dict = UserRead.model_validate(user).model_dump()
-        # Get all departments
-        dept_statement = select(UserDepartment.department_id).where(UserDepartment.user_id == user.id)
-        user_dict["department_ids"] = [str(did) for did in session.exec(dept_statement).all()]
-        # Get all organizations
-        org_statement = select(UserOrganization.organization_id).where(UserOrganization.user_id == user.id)
-        user_dict["organization_ids"] = [str(oid) for oid in session.exec(org_statement).all()]
-        result.append(UserRead(**user_dict))
-    
+        user_read = UserRead.model_validate(user)
+        user_read.department_ids = department_ids.get(user.id, [])
+        user_read.organization_ids = organization_ids.get(user.id, [])
+        result.append(user_read)
     return result
 
 
+@router.get("/", response_model=List[UserRead], summary="List users")
+def list_users(
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+    search: Optional[str] = Query(None, min_length=1, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+) -> List[UserRead]:
+    """
+    List users. Without search/pagination the full directory is returned from a
+    version-stamped cache with an ETag, so clients can revalidate with If-None-Match.
+    """
+    if search is None and not skip and limit is None:
+        version = get_cache_version(session, USERS_VERSION)
+        headers = {"ETag": f'W/"users-{version}"', "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        content = _directory_cache.get("directory", version)
+        if content is None:
+            users = session.exec(select(User).order_by(User.created_at.asc(), User.id)).all()
+            content = _user_list_adapter.dump_json(_serialize_users(session, users, all_users=True))
+            _directory_cache.set("directory", version, content)
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    statement = select(User)
+    if search:
+        pattern = f"%{search}%"
+        statement = statement.where(
+            or_(
+                User.full_name.ilike(pattern),
+                User.email.ilike(pattern),
+                User.position.ilike(pattern),
+            )
+        )
+    statement = statement.order_by(User.created_at.asc(), User.id).offset(skip)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return _serialize_users(session, session.exec(statement).all())
+
+
+@router.get("/picker", response_model=List[UserPickerRead], summary="Search users for pickers")
+def search_users_for_picker(
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+    search: Optional[str] = Query(None, min_length=1, max_length=100),
+    department_id: Optional[UUID] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+) -> List[UserPickerRead]:
+    """Lightweight projection of active users for the invite/assignee UI (no membership lookups)."""
+    statement = select(
+        User.id, User.email, User.full_name, User.position, User.department_id, User.avatar_url,
+        User.avatar_variants,
+    ).where(User.is_active == True)
+    if search:
+        pattern = f"%{search}%"
+        statement = statement.where(
+            or_(User.full_name.ilike(pattern), User.email.ilike(pattern))
+        )
+    if department_id:
+        statement = statement.where(User.department_id == department_id)
+    statement = statement.order_by(User.full_name, User.email).offset(skip).limit(limit)
+    return [UserPickerRead.model_validate(row) for row in session.exec(statement).all()]
+
+
 @router.get("/me", response_model=UserRead, summary="Get current user profile")
 def get_current_user_profile(
     session: SessionDep,
     current_user: User = Depends(get_current_user),
 ) -> UserRead:
     """Get current authenticated user profile."""
-    user_dict = UserRead.model_validate(current_user).model_dump()
-    # Get all departments
-    dept_statement = select(UserDepartment.department_id).where(UserDepartment.user_id == current_user.id)
-    dept_ids = session.exec(dept_statement).all()
-    user_dict["department_ids"] = [str(did) for did in dept_ids] if dept_ids else []
-    # Get all organizations
-    org_statement = select(UserOrganization.organization_id).where(UserOrganization.user_id == current_user.id)
-    org_ids = session.exec(org_statement).all()
-    user_dict["organization_ids"] = [str(oid) for oid in org_ids] if org_ids else []
-    return UserRead(**user_dict)
+    return _serialize_users(session, [current_user])[0]
+
+
+@router.get(
+    "/me/feed.ics",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/calendar": {}}}, 304: {"description": "Not modified"}},
+    summary="Personal iCalendar feed",
+)
+def get_current_user_feed(
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """Events the current user takes part in (not declined), streamed as RFC 5545."""
+    participates = and_(
+        EventParticipant.event_id == Event.id,
+        EventParticipant.user_id == current_user.id,
+        EventParticipant.response_status != "declined",
+    )
+    count, last_updated, last_added = session.exec(
+        sql_select(func.count(Event.id), func.max(Event.updated_at), func.max(EventParticipant.added_at))
+        .join(EventParticipant, participates)
+    ).one()
+    headers = {
+        "ETag": export_etag(current_user.id, count, last_updated, last_added),
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    statement = series_order(select(Event).join(EventParticipant, participates))
+    return StreamingResponse(
+        stream_ics(statement, name=current_user.full_name or current_user.email),
+        media_type=ICAL_MEDIA_TYPE,
+        headers=headers,
+    )
 
 
 @router.put("/me", response_model=UserRead, summary="Update current user profile")
@@ -85,6 +218,7 @@ def update_current_user_profile(
         current_user.organization_id = payload_dict["organization_id"]
     if "avatar_url" in payload_dict and payload_dict["avatar_url"] is not None:
         current_user.avatar_url = payload_dict["avatar_url"]
+        current_user.avatar_variants = None
     if "show_local_time" in payload_dict:
         current_user.show_local_time = payload_dict["show_local_time"]
     if "show_moscow_time" in payload_dict:
@@ -109,7 +243,7 @@ def update_current_user_profile(
                         user_dept = UserDepartment(user_id=current_user.id, department_id=dept_uuid)
                         session.add(user_dept)
                     except (ValueError, TypeError) as e:
-                        print(f"Invalid department_id: {dept_id}, error: {e}")
+                        logger.warning("Invalid department_id %s: %s", dept_id, e)
     
     if "organization_ids" in payload_dict and payload_dict["organization_ids"] is not None:
         # Remove old relationships
@@ -125,21 +259,15 @@ def update_current_user_profile(
                         user_org = UserOrganization(user_id=current_user.id, organization_id=org_uuid)
                         session.add(user_org)
                     except (ValueError, TypeError) as e:
-                        print(f"Invalid organization_id: {org_id}, error: {e}")
+                        logger.warning("Invalid organization_id %s: %s", org_id, e)
     
     session.add(current_user)
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
     session.refresh(current_user)
     
     # Return with many-to-many relationships
-    user_dict = UserRead.model_validate(current_user).model_dump()
-    dept_statement = select(UserDepartment.department_id).where(UserDepartment.user_id == current_user.id)
-    dept_ids = session.exec(dept_statement).all()
-    user_dict["department_ids"] = [str(did) for did in dept_ids] if dept_ids else []
-    org_statement = select(UserOrganization.organization_id).where(UserOrganization.user_id == current_user.id)
-    org_ids = session.exec(org_statement).all()
-    user_dict["organization_ids"] = [str(oid) for oid in org_ids] if org_ids else []
-    return UserRead(**user_dict)
+    return _serialize_users(session, [current_user])[0]
 
 
 @router.put("/{user_id}", response_model=UserRead, summary="Update user by id")
@@ -178,6 +306,7 @@ def update_user(
         user.organization_id = payload_dict["organization_id"]
     if "avatar_url" in payload_dict and payload_dict["avatar_url"] is not None:
         user.avatar_url = payload_dict["avatar_url"]
+        user.avatar_variants = None
     if "role" in payload_dict and payload_dict["role"] is not None:
         user.role = payload_dict["role"]
     if "access_org_structure" in payload_dict and payload_dict["access_org_structure"] is not None:
@@ -218,7 +347,7 @@ def update_user(
                         user_dept = UserDepartment(user_id=user_id, department_id=dept_uuid)
                         session.add(user_dept)
                     except (ValueError, TypeError) as e:
-                        print(f"Invalid department_id: {dept_id}, error: {e}")
+                        logger.warning("Invalid department_id %s: %s", dept_id, e)
     
     if "organization_ids" in payload_dict and payload_dict["organization_ids"] is not None:
         # Remove old relationships
@@ -234,21 +363,15 @@ def update_user(
                         user_org = UserOrganization(user_id=user_id, organization_id=org_uuid)
                         session.add(user_org)
                     except (ValueError, TypeError) as e:
-                        print(f"Invalid organization_id: {org_id}, error: {e}")
+                        logger.warning("Invalid organization_id %s: %s", org_id, e)
     
     session.add(user)
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
     session.refresh(user)
     
     # Return with many-to-many relationships
-    user_dict = UserRead.model_validate(user).model_dump()
-    dept_statement = select(UserDepartment.department_id).where(UserDepartment.user_id == user_id)
-    dept_ids = session.exec(dept_statement).all()
-    user_dict["department_ids"] = [str(did) for did in dept_ids] if dept_ids else []
-    org_statement = select(UserOrganization.organization_id).where(UserOrganization.user_id == user_id)
-    org_ids = session.exec(org_statement).all()
-    user_dict["organization_ids"] = [str(oid) for oid in org_ids] if org_ids else []
-    return UserRead(**user_dict)
+    return _serialize_users(session, [user])[0]
 
 
 @router.get("/birthdays", response_model=List[UserRead], summary="Get users with birthdays today")
@@ -258,29 +381,14 @@ def get_today_birthdays(
 ) -> List[UserRead]:
     """Get all users who have birthdays today."""
     today = date.today()
+    # Compare month and day, ignore year
     statement = select(User).where(
         User.birthday.isnot(None),
-        User.is_active == True
+        User.is_active == True,
+        extract("month", User.birthday) == today.month,
+        extract("day", User.birthday) == today.day,
     )
-    users = session.exec(statement).all()
-    
-    # Filter users with birthdays today
-    today_birthdays = []
-    for user in users:
-        if user.birthday:
-            # Compare month and day, ignore year
-            if user.birthday.month == today.month and user.birthday.day == today.day:
-                user_dict = UserRead.model_validate(user).model_dump()
-                # Load many-to-many relationships
-                dept_statement = select(UserDepartment.department_id).where(UserDepartment.user_id == user.id)
-                dept_ids = session.exec(dept_statement).all()
-                user_dict["department_ids"] = [str(did) for did in dept_ids] if dept_ids else []
-                org_statement = select(UserOrganization.organization_id).where(UserOrganization.user_id == user.id)
-                org_ids = session.exec(org_statement).all()
-                user_dict["organization_ids"] = [str(oid) for oid in org_ids] if org_ids else []
-                today_birthdays.append(UserRead(**user_dict))
-    
-    return today_birthdays
+    return _serialize_users(session, session.exec(statement).all())
 
 
 @router.post(
@@ -344,6 +452,7 @@ def bootstrap_admin(
         for org_id in payload.organization_ids:
             if org_id:
                 session.add(UserOrganization(user_id=user.id, organization_id=org_id))
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
 
     # Создаем личный календарь для нового пользователя
@@ -352,9 +461,7 @@ def bootstrap_admin(
         ensure_personal_calendar(session, user.id)
     except Exception as e:
         # Логируем ошибку, но не прерываем создание пользователя
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Не удалось создать личный календарь для пользователя {user.id}: {e}")
+        logger.warning("Не удалось создать личный календарь для пользователя %s: %s", user.id, e)
 
     user_dict = UserRead.model_validate(user).model_dump()
     user_dict["department_ids"] = [str(did) for did in payload.department_ids] if payload.department_ids else []
@@ -421,6 +528,7 @@ def admin_create_user(
         for org_id in payload.organization_ids:
             if org_id:
                 session.add(UserOrganization(user_id=user.id, organization_id=org_id))
+    bump_cache_version(session, USERS_VERSION)
     session.commit()
 
     # Создаем личный календарь для нового пользователя
@@ -429,9 +537,7 @@ def admin_create_user(
         ensure_personal_calendar(session, user.id)
     except Exception as e:
         # Логируем ошибку, но не прерываем создание пользователя
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Не удалось создать личный календарь для пользователя {user.id}: {e}")
+        logger.warning("Не удалось создать личный календарь для пользователя %s: %s", user.id, e)
 
     # Return with relationships
     user_dict = UserRead.model_validate(user).model_dump()
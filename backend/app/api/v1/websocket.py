@@ -29,7 +29,7 @@ async def get_current_user_ws(token: str = Query(...)) -> UUID:
             raise ValueError("Invalid token: no user_id")
         return UUID(user_id)
     except (JWTError, ValueError) as e:
-        logger.error(f"WebSocket auth error: {e}")
+        logger.error("WebSocket auth error: %s", e)
         raise
 
 
@@ -66,7 +66,7 @@ async def websocket_notifications(
             "user_id": str(user_id)
         })
         
-        logger.info(f"WebSocket connection established for user {user_id}")
+        logger.info("WebSocket connection established for user %s", user_id)
         
         # Keep connection alive and handle incoming messages
         while True:
@@ -79,16 +79,16 @@ async def websocket_notifications(
                     await websocket.send_json({"type": "pong"})
                 
             except WebSocketDisconnect:
-                logger.info(f"WebSocket disconnected gracefully for user {user_id}")
+                logger.info("WebSocket disconnected gracefully for user %s", user_id)
                 break
             except Exception as e:
-                logger.error(f"Error in WebSocket receive loop for user {user_id}: {e}")
+                logger.error("Error in WebSocket receive loop for user %s: %s", user_id, e)
                 break
     
     except Exception as e:
-        logger.error(f"WebSocket error for user {user_id}: {e}", exc_info=True)
+        logger.error("WebSocket error for user %s: %s", user_id, e, exc_info=True)
     
     finally:
         await manager.disconnect(websocket, user_id)
-        logger.info(f"WebSocket connection closed for user {user_id}")
+        logger.info("WebSocket connection closed for user %s", user_id)
 
@@ -6,8 +6,11 @@ import logging
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import setup_logging, worker_process_shutdown
 
 from app.core.config import settings
+from app.core.logging_config import configure_logging, stop_logging
+from app.core.metrics import install_celery_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +19,11 @@ celery_app = Celery(
     "planner",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.notifications", "app.tasks.reminders"],
+    include=["app.tasks.notifications", "app.tasks.reminders", "app.tasks.sla", "app.tasks.storage", "app.tasks.avatars", "app.tasks.imports"],
 )
 
+install_celery_metrics()
+
 # Celery configuration
 celery_app.conf.update(
     task_serializer="json",
@@ -48,6 +53,16 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.reminders.send_event_reminders",
         "schedule": 60.0,  # Каждые 60 секунд (1 минута)
     },
+    # Проверка нарушений SLA по тикетам (каждую минуту)
+    "check-ticket-sla": {
+        "task": "app.tasks.sla.check_ticket_sla",
+        "schedule": 60.0,
+    },
+    # Удаление блобов вложений без ссылок (каждый час)
+    "collect-blob-garbage": {
+        "task": "app.tasks.storage.collect_blob_garbage",
+        "schedule": crontab(minute=15),
+    },
     # Example: Cleanup old notifications daily at 3 AM
     # "cleanup-old-notifications": {
     #     "task": "app.tasks.notifications.cleanup_old_notifications",
@@ -55,5 +70,19 @@ celery_app.conf.beat_schedule = {
     # },
 }
 
-logger.info(f"Celery app configured with broker: {settings.CELERY_BROKER_URL}")
+
+@setup_logging.connect
+def _setup_logging(**kwargs) -> None:
+    # Воркеры пишут логи тем же JSON-форматом через очередь, что и API;
+    # в процессах prefork-пула слушатель очереди перезапускается после fork
+    configure_logging()
+
+
+@worker_process_shutdown.connect
+def _flush_logs(**kwargs) -> None:
+    # Процесс пула завершается через os._exit, atexit не срабатывает
+    stop_logging()
+
+
+logger.info("Celery app configured with broker: %s", settings.CELERY_BROKER_URL)
 
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -19,15 +19,61 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "local"
     # Храним БД в корне проекта, чтобы при запуске из любого каталога использовать один файл
     DATABASE_URL: str = "sqlite:///../calendar.db"
+    # URL для асинхронного движка (async-эндпоинты); по умолчанию выводится из DATABASE_URL:
+    # sqlite -> sqlite+aiosqlite, postgresql -> postgresql+psycopg (async-режим psycopg 3)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Создавать недостающие таблицы (create_all) при старте приложения.
+    # По умолчанию схему ведёт только Alembic: alembic upgrade head
+    DB_CREATE_ALL_ON_STARTUP: bool = False
     SECRET_KEY: str = "changeme"  # Должен быть установлен через переменную окружения в .env
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     JWT_ALGORITHM: str = "HS256"
+    # Стоимость bcrypt; хеши с другой стоимостью пересчитываются при входе
+    BCRYPT_ROUNDS: int = 12
+    # Потоки пула хеширования паролей (пусто — min(4, число CPU)) и длина очереди сверх них
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_QUEUE: int = 200
     BACKEND_CORS_ORIGINS: str = "https://calendar.corestone.ru,http://localhost:3000,http://localhost:3001,http://127.0.0.1:3000,http://127.0.0.1:3001"
     
     # Redis configuration
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_CACHE_URL: str = "redis://localhost:6379/1"  # Separate DB for cache
+
+    # Ограничение частоты запросов (app/core/rate_limit.py): token bucket на
+    # пользователя (анонимные — по IP) в отдельной БД Redis
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/2"
+    # Группа -> лимит "<число>/<second|minute|hour|day>"; "default" — для остальных маршрутов
+    RATE_LIMITS: Dict[str, str] = {
+        "default": "300/minute",
+        "polling": "600/minute",
+        "auth": "10/minute",
+        # Все попытки входа с одного IP (любые email); мягче "auth" — офис за общим NAT
+        "auth_ip": "100/minute",
+        # Обновление токена — по пользователю, неудача разлогинивает, поэтому лимит мягче
+        "auth_refresh": "60/minute",
+        "upload": "30/minute",
+    }
+    # fnmatch-шаблон шаблона маршрута (можно с методом: "POST /api/v1/...") -> группа;
+    # побеждает первый подходящий
+    RATE_LIMIT_ROUTES: Dict[str, str] = {
+        "POST /api/v1/auth/refresh": "auth_refresh",
+        "/api/v1/auth/*": "auth",
+        "/api/v1/health*": "polling",
+        "GET /api/v1/notifications*": "polling",
+        "GET /api/v1/admin-notifications*": "polling",
+        "GET /api/v1/users/online*": "polling",
+        "POST /api/v1/users/me/avatar": "upload",
+        "POST /api/v1/*/attachments*": "upload",
+        "POST /api/v1/calendars/*/import": "upload",
+    }
+    # Сколько токенов списывает запрос (по умолчанию 1) — для тяжёлых отчётов
+    RATE_LIMIT_COSTS: Dict[str, int] = {
+        "GET /api/v1/statistics*": 5,
+        "GET /api/v1/ticket-statistics*": 5,
+        "GET /api/v1/calendars/*/conflicts": 5,
+    }
     
     # Celery configuration
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
@@ -38,6 +84,42 @@ class Settings(BaseSettings):
     VAPID_PUBLIC_KEY: str = ""
     VAPID_CLAIMS_EMAIL: str = "mailto:admin@corestone.ru"
 
+    # Ticket SLA (часы по приоритету; категория может переопределить)
+    TICKET_SLA_RESPONSE_HOURS: Dict[str, float] = {
+        "low": 24, "medium": 8, "high": 4, "urgent": 2, "critical": 1,
+    }
+    TICKET_SLA_RESOLUTION_HOURS: Dict[str, float] = {
+        "low": 120, "medium": 72, "high": 24, "urgent": 8, "critical": 4,
+    }
+    TICKET_SLA_BATCH_SIZE: int = 500
+
+    # Хранилище блобов вложений: блоб без ссылок удаляется через grace-период
+    BLOB_GC_GRACE_HOURS: float = 1.0
+    # Префикс internal-location nginx, указывающего на каталог uploads
+    # (например "/protected-uploads"); пусто — файлы отдаёт само приложение
+    DOWNLOAD_ACCEL_REDIRECT_PREFIX: str = ""
+
+    # Импорт событий из ICS/CSV (app/services/event_import.py)
+    EVENT_IMPORT_MAX_SIZE: int = 100 * 1024 * 1024
+    # Файлы больше этого размера импортируются фоновой задачей Celery
+    EVENT_IMPORT_SYNC_MAX_SIZE: int = 1024 * 1024
+
+    # Логирование (app/core/logging_config.py): json — одна JSON-строка на запись, text — для консоли
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    # Доля успешных быстрых запросов, попадающих в access-лог (ошибки и медленные — всегда)
+    ACCESS_LOG_SAMPLE_RATE: float = 0.1
+
+    # Инструментирование запросов (Server-Timing, лог медленных запросов)
+    REQUEST_INSTRUMENTATION_ENABLED: bool = True
+    SLOW_REQUEST_MS: float = 1000.0
+    SLOW_REQUEST_QUERY_COUNT: int = 50
+    # Доля медленных запросов, для которых логируется разбивка по SQL-отпечаткам
+    SLOW_REQUEST_LOG_SAMPLE_RATE: float = 1.0
+    # fnmatch-шаблоны путей, запросы к которым профилируются (pyinstrument или cProfile)
+    PROFILE_ROUTES: List[str] = []
+    PROFILE_OUTPUT_DIR: str = "profiles"
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins string into a list."""
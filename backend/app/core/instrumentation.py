@@ -0,0 +1,203 @@
+"""
+Инструментирование HTTP-запросов.
+
+Слушатели ``before_cursor_execute``/``after_cursor_execute`` на движке из
+``app/db.py`` считают SQL-запросы и время в БД для текущего HTTP-запроса
+(через ContextVar, поэтому синхронные эндпоинты в пуле потоков тоже учитываются).
+Middleware ``instrument_request`` добавляет заголовок ``Server-Timing``, а для
+запросов дольше ``SLOW_REQUEST_MS`` или с числом SQL больше
+``SLOW_REQUEST_QUERY_COUNT`` логирует разбивку по отпечаткам запросов —
+так видны N+1. Для путей из ``PROFILE_ROUTES`` запрос профилируется.
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger("performance")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Списки плейсхолдеров в IN (...) разной длины дают один отпечаток
+_PLACEHOLDER_LIST_RE = re.compile(
+    r"\(\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+|\$\d+))*\s*\)"
+)
+_POSTCOMPILE_RE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+
+FINGERPRINT_MAX_LENGTH = 300
+SLOW_LOG_TOP_FINGERPRINTS = 10
+
+
+@dataclass
+class RequestStats:
+    """SQL statistics collected while a request is being handled."""
+
+    started: float = field(default_factory=time.perf_counter)
+    query_count: int = 0
+    db_time: float = 0.0
+    # отпечаток -> [количество, суммарное время]
+    fingerprints: dict[str, list] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.query_count += 1
+        self.db_time += elapsed
+        entry = self.fingerprints.setdefault(fingerprint(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize SQL so that queries differing only in literals or IN-list length match."""
+    normalized = _STRING_RE.sub("?", statement)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _POSTCOMPILE_RE.sub("(?)", normalized)
+    normalized = _PLACEHOLDER_LIST_RE.sub("(?)", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    return normalized[:FINGERPRINT_MAX_LENGTH]
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach query counting listeners to the engine (no-op outside of HTTP requests)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    return (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", '
+        f"app;dur={(total - stats.db_time) * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+def _route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+def _log_slow_request(request: Request, status_code: int, stats: RequestStats, total: float) -> None:
+    top = sorted(stats.fingerprints.items(), key=lambda item: item[1][1], reverse=True)
+    breakdown = "\n".join(
+        f"  {count:>4}x {elapsed * 1000:8.1f} ms  {sql}"
+        for sql, (count, elapsed) in top[:SLOW_LOG_TOP_FINGERPRINTS]
+    )
+    logger.warning(
+        "[SLOW] %s %s -> %s in %.1f ms, %s queries (%.1f ms in DB, %s distinct)\n%s",
+        request.method,
+        _route_template(request),
+        status_code,
+        total * 1000,
+        stats.query_count,
+        stats.db_time * 1000,
+        len(stats.fingerprints),
+        breakdown,
+    )
+
+
+def _should_profile(path: str) -> bool:
+    return any(fnmatch(path, pattern) for pattern in settings.PROFILE_ROUTES)
+
+
+class _RequestProfiler:
+    """
+    pyinstrument (если установлен) или cProfile вокруг обработки запроса.
+
+    Профилируется поток event loop: синхронные эндпоинты, выполняемые в пуле
+    потоков, pyinstrument показывает как ожидание, cProfile — не видит.
+    """
+
+    def __init__(self) -> None:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self._pyinstrument = None
+            self._cprofile = cProfile.Profile()
+        else:
+            self._pyinstrument = Profiler(async_mode="enabled")
+            self._cprofile = None
+
+    def start(self) -> None:
+        if self._pyinstrument is not None:
+            self._pyinstrument.start()
+        else:
+            self._cprofile.enable()
+
+    def stop_and_save(self, request: Request) -> None:
+        output_dir = Path(settings.PROFILE_OUTPUT_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+        stem = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{request.method}_{slug}"
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+            path = output_dir / f"{stem}.html"
+            path.write_text(self._pyinstrument.output_html(), encoding="utf-8")
+        else:
+            self._cprofile.disable()
+            path = output_dir / f"{stem}.prof"
+            self._cprofile.dump_stats(str(path))
+        logger.info("[PROFILE] %s %s -> %s", request.method, request.url.path, path)
+
+
+async def instrument_request(request: Request, call_next):
+    """HTTP middleware: Server-Timing header, slow request log and opt-in profiling."""
+    if not settings.REQUEST_INSTRUMENTATION_ENABLED:
+        return await call_next(request)
+
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    profiler = _RequestProfiler() if _should_profile(request.url.path) else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+        if profiler is not None:
+            profiler.stop_and_save(request)
+
+    total = time.perf_counter() - stats.started
+    response.headers["Server-Timing"] = _server_timing(stats, total)
+
+    is_slow = (
+        total * 1000 >= settings.SLOW_REQUEST_MS
+        or stats.query_count >= settings.SLOW_REQUEST_QUERY_COUNT
+    )
+    if is_slow and random.random() < settings.SLOW_REQUEST_LOG_SAMPLE_RATE:
+        _log_slow_request(request, response.status_code, stats, total)
+    return response
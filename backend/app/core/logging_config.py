@@ -0,0 +1,199 @@
+"""
+Структурированное логирование.
+
+Все записи уходят через ``QueueHandler`` в очередь, а форматирование в JSON
+и запись в поток выполняет ``QueueListener`` в отдельном потоке — обработчик
+запроса не ждёт ввода-вывода. Каждая запись получает ``request_id`` текущего
+запроса (ContextVar), поля из ``extra=...`` попадают в JSON как есть.
+
+Middleware ``log_request`` присваивает запросу идентификатор (берёт входящий
+``X-Request-ID`` или создаёт новый, возвращает его в ответе) и пишет строку
+access-лога с методом, шаблоном маршрута, статусом и длительностью. Успешные
+быстрые запросы логируются с вероятностью ``ACCESS_LOG_SAMPLE_RATE``; ответы
+4xx/5xx, медленные запросы и события безопасности (неудачный вход, 422) — всегда.
+
+Поток ``QueueListener`` не переживает ``fork``: в дочернем процессе (prefork-пул
+Celery, воркеры gunicorn) очередь и слушатель создаются заново.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from starlette.requests import Request
+
+from app.core.config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+access_logger = logging.getLogger("access")
+security_logger = logging.getLogger("security")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra=...
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Formats the message in the caller (args may change later), leaves JSON and I/O to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id, extras, exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    """Route the root logger through a queue to a JSON (or plain text) stderr handler. Idempotent."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s")
+        )
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _NonBlockingQueueHandler(log_queue)
+    handler.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _queue_handler = handler
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork() -> None:
+    # Поток слушателя в дочерний процесс не копируется: без нового записи
+    # копились бы в очереди и терялись. Очередь тоже новая — записи, которые
+    # родитель не успел вывести, выведет он сам
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def _route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+async def log_request(request: Request, call_next):
+    """HTTP middleware: request id, sampled access log with latency, security events."""
+    incoming = request.headers.get(REQUEST_ID_HEADER, "")
+    request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+    token = _request_id.set(request_id)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        route = _route_template(request)
+        client_ip = request.client.host if request.client else None
+        fields = {
+            "method": request.method,
+            "route": route,
+            "path": request.url.path,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 1),
+            "client_ip": client_ip,
+        }
+
+        if route.endswith("/auth/login") and status_code in (400, 401, 403):
+            security_logger.warning("Failed login attempt from %s", client_ip, extra=fields)
+        elif status_code == 422:
+            security_logger.warning("Validation error from %s for %s", client_ip, route, extra=fields)
+
+        if status_code >= 500:
+            level = logging.ERROR
+        elif duration_ms >= settings.SLOW_REQUEST_MS:
+            level = logging.WARNING
+        elif status_code >= 400 or random.random() < settings.ACCESS_LOG_SAMPLE_RATE:
+            level = logging.INFO
+        else:
+            level = None
+        if level is not None and access_logger.isEnabledFor(level):
+            access_logger.log(
+                level, "%s %s -> %s in %.1f ms", request.method, route, status_code, duration_ms, extra=fields
+            )
+        _request_id.reset(token)
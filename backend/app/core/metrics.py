@@ -0,0 +1,219 @@
+"""
+Prometheus-метрики.
+
+Экспорт — ``GET /metrics``. При запуске нескольких воркеров (uvicorn
+``--workers``, prefork-воркеры Celery) задайте переменную окружения
+``PROMETHEUS_MULTIPROC_DIR`` — общий каталог, куда каждый процесс пишет свои
+значения; ``/metrics`` агрегирует их через ``MultiProcessCollector``.
+Каталог нужно очищать перед стартом сервиса.
+
+Метрики:
+- HTTP: гистограмма длительности и число запросов в обработке по шаблону маршрута;
+- пул соединений БД: размер и выданные соединения;
+- Celery (задачи ``app.tasks.*``): длительность, задержка в очереди, итоги напоминаний;
+- пул хеширования паролей: очередь, ожидание, длительность bcrypt, отказы;
+- ограничение частоты: отказы 429 по группам маршрутов, ошибки хранилища лимитов;
+- активные WebSocket-соединения и сообщения Redis Pub/Sub.
+"""
+from __future__ import annotations
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+TASK_PREFIX = "app.tasks."
+PUBLISHED_AT_HEADER = "published_at"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured size of the database connection pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+CELERY_TASK_QUEUE_LAG = Histogram(
+    "celery_task_queue_lag_seconds",
+    "Time between publishing a Celery task and a worker starting it",
+    ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+REMINDER_TASK_ITEMS = Counter(
+    "reminder_task_items",
+    "Totals reported by send_event_reminders",
+    ["result"],
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hashing jobs queued or running in the bcrypt pool",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password hashing job waited for a free bcrypt worker",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt run time",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected",
+    "Password hashing jobs rejected because the queue was full",
+)
+RATE_LIMIT_REJECTED = Counter(
+    "rate_limit_rejected",
+    "Requests rejected with 429 by route group",
+    ["group"],
+)
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "rate_limit_backend_errors",
+    "Rate limit storage errors (requests fell back to in-memory limits)",
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Active WebSocket connections",
+    multiprocess_mode="livesum",
+)
+REDIS_PUBSUB_MESSAGES = Counter(
+    "redis_pubsub_messages",
+    "Redis Pub/Sub messages",
+    ["channel", "direction"],
+)
+
+
+def _route_template(request: Request) -> str:
+    # Шаблон маршрута (а не фактический путь), чтобы не плодить серии с id в пути
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+async def track_request_metrics(request: Request, call_next):
+    """HTTP middleware: latency histogram and in-flight gauge per route template."""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    method = request.method
+    route = _route_template(request)
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+    in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(
+            time.perf_counter() - started
+        )
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Prometheus exposition (aggregated over processes in multiprocess mode)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop live gauges of the current process (multiprocess mode, on shutdown)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Track pool size and checked-out connections of the engine (sync or ``AsyncEngine.sync_engine``)."""
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        # Пулы синхронного и асинхронного движков суммируются
+        DB_POOL_SIZE.inc(size())
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def install_celery_metrics() -> None:
+    """Connect Celery signal handlers for ``app.tasks.*`` task metrics."""
+    from celery.signals import before_task_publish, task_postrun, task_prerun, worker_process_shutdown
+
+    started: dict[str, float] = {}
+
+    @before_task_publish.connect(weak=False)
+    def _stamp_published_at(sender=None, headers=None, **kwargs):
+        if headers is not None and str(sender).startswith(TASK_PREFIX):
+            headers[PUBLISHED_AT_HEADER] = time.time()
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, task=None, **kwargs):
+        if not task.name.startswith(TASK_PREFIX):
+            return
+        started[task_id] = time.perf_counter()
+        published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+        if published_at:
+            CELERY_TASK_QUEUE_LAG.labels(task.name).observe(max(time.time() - float(published_at), 0.0))
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, retval=None, state=None, **kwargs):
+        if not task.name.startswith(TASK_PREFIX):
+            return
+        start = started.pop(task_id, None)
+        if start is not None:
+            CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+        if task.name == "app.tasks.reminders.send_event_reminders" and isinstance(retval, dict):
+            for key, value in retval.items():
+                if isinstance(value, (int, float)):
+                    REMINDER_TASK_ITEMS.labels(key).inc(value)
+
+    @worker_process_shutdown.connect(weak=False)
+    def _worker_process_shutdown(**kwargs):
+        mark_process_dead()
@@ -0,0 +1,318 @@
+"""
+Ограничение частоты запросов.
+
+Ключ — id пользователя из access-токена (без обращения к БД), для анонимных
+запросов — IP клиента, поэтому сотрудники за общим корпоративным NAT не делят
+один лимит. Вход и обновление токена идут без access-токена, для них ключ
+берётся из тела запроса (``_BODY_KEYS``): email + IP для входа и пользователь
+из refresh-токена для обновления. Такой ключ выбирает сам клиент, поэтому вход
+дополнительно списывается с бакета по IP (``_IP_GROUPS``, более мягкий лимит
+на случай NAT) — перебор email с одного адреса не получает новый лимит на
+каждый адрес. Запрос отклоняется, если исчерпан любой из бакетов. Маршруты разбиты на группы (``RATE_LIMIT_ROUTES``: fnmatch-шаблон
+пути или ``"МЕТОД путь"`` -> группа), у каждой группы свой лимит
+(``RATE_LIMITS``), запрос списывает ``RATE_LIMIT_COSTS`` токенов (по умолчанию 1).
+
+Лимит — token bucket: ``"100/minute"`` означает ёмкость 100 токенов и
+пополнение 100 токенов в минуту. Состояние хранится в отдельной БД Redis
+(``RATE_LIMIT_REDIS_URL``) и меняется атомарно Lua-скриптом. Если Redis
+недоступен, лимиты временно считаются в памяти процесса скользящим окном
+(на воркер), а Redis опрашивается снова через ``REDIS_RETRY_SECONDS``.
+
+Проверка подключена как зависимость роутера API (app/main.py): 429 уходит через
+общий обработчик HTTPException с CORS-заголовками, заголовок ``Retry-After``
+подсказывает, когда повторить.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Response, status
+from starlette.requests import HTTPConnection, Request
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_BACKEND_ERRORS, RATE_LIMIT_REJECTED
+from app.core.security import verify_token
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP = "default"
+REDIS_KEY_PREFIX = "rl"
+REDIS_TIMEOUT_SECONDS = 0.25
+# Сколько секунд не обращаться к Redis после ошибки (работает запасной лимитер)
+REDIS_RETRY_SECONDS = 5.0
+# Порог числа ключей, после которого запасной лимитер чистит устаревшие окна
+MEMORY_PRUNE_THRESHOLD = 10_000
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS[1] — ключ бакета; ARGV: ёмкость, пополнение (токенов в мс), стоимость.
+# Возвращает {разрешено, остаток токенов, через сколько мс повторить}
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {allowed, math.floor(tokens), retry_after}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """``limit`` tokens per ``period`` seconds (bucket capacity is ``limit``)."""
+
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> RateLimit:
+        """Parse ``"<count>/<second|minute|hour|day>"``."""
+        count, _, unit = value.partition("/")
+        period = _PERIODS.get(unit.strip().lower().rstrip("s"))
+        if not count.strip().isdigit() or period is None:
+            raise ValueError(f"Invalid rate limit {value!r}, expected e.g. '100/minute'")
+        return cls(int(count), float(period))
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+class _SlidingWindowLimiter:
+    """
+    In-process fallback: sliding window counter (the previous window is weighted
+    by how much of it still overlaps the window ending now).
+    """
+
+    def __init__(self) -> None:
+        # ключ -> [номер окна, счётчик предыдущего окна, счётчик текущего, период]
+        self._windows: dict[str, list] = {}
+
+    def hit(self, key: str, rate: RateLimit, cost: int) -> Decision:
+        now = time.time()
+        window = int(now // rate.period)
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < window - 1:
+            entry = [window, 0, 0, rate.period]
+        elif entry[0] == window - 1:
+            entry = [window, entry[2], 0, rate.period]
+        self._windows[key] = entry
+
+        elapsed = now - window * rate.period
+        weight = 1 - elapsed / rate.period
+        used = entry[1] * weight + entry[2]
+        if used + cost <= rate.limit:
+            entry[2] += cost
+            self._prune()
+            return Decision(True, int(rate.limit - used - cost), 0.0)
+
+        # Когда вклад предыдущего окна уменьшится настолько, чтобы запрос поместился
+        needed_weight = (rate.limit - entry[2] - cost) / entry[1] if entry[1] else -1
+        if needed_weight >= 0:
+            retry_after = (weight - needed_weight) * rate.period
+        else:
+            # Не раньше следующего окна, где нынешний счётчик станет предыдущим
+            retry_after = rate.period - elapsed + max(0.0, 1 - (rate.limit - cost) / entry[2]) * rate.period
+        return Decision(False, max(int(rate.limit - used), 0), retry_after)
+
+    def _prune(self) -> None:
+        if len(self._windows) < MEMORY_PRUNE_THRESHOLD:
+            return
+        now = time.time()
+        self._windows = {
+            key: entry
+            for key, entry in self._windows.items()
+            if entry[0] >= int(now // entry[3]) - 1
+        }
+
+
+class _RateLimiter:
+    def __init__(self) -> None:
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._memory = _SlidingWindowLimiter()
+
+    def _redis_script(self):
+        if self._script is None:
+            # redis.asyncio импортируется при первом запросе, а не при старте воркера
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(
+                settings.RATE_LIMIT_REDIS_URL,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+            )
+            self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        return self._script
+
+    async def hit(self, key: str, rate: RateLimit, cost: int) -> Decision:
+        cost = min(cost, rate.limit)
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, remaining, retry_after_ms = await self._redis_script()(
+                    keys=[f"{REDIS_KEY_PREFIX}:{key}"],
+                    args=[rate.limit, rate.limit / (rate.period * 1000), cost],
+                )
+                return Decision(bool(allowed), int(remaining), int(retry_after_ms) / 1000)
+            except Exception as exc:
+                RATE_LIMIT_BACKEND_ERRORS.inc()
+                logger.warning(
+                    "Rate limit storage unavailable, using in-memory limits for %.0f s: %s",
+                    REDIS_RETRY_SECONDS,
+                    exc,
+                )
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self._memory.hit(key, rate, cost)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._redis = self._script = None
+
+
+_limiter = _RateLimiter()
+
+
+@lru_cache(maxsize=1024)
+def _route_policy(method: str, path: str) -> tuple[str, RateLimit, int]:
+    def matches(pattern: str) -> bool:
+        pattern_method, _, pattern_path = pattern.rpartition(" ")
+        if pattern_method and pattern_method.upper() != method:
+            return False
+        return fnmatch(path, pattern_path)
+
+    group = next(
+        (group for pattern, group in settings.RATE_LIMIT_ROUTES.items() if matches(pattern)),
+        DEFAULT_GROUP,
+    )
+    cost = next((cost for pattern, cost in settings.RATE_LIMIT_COSTS.items() if matches(pattern)), 1)
+    return group, _group_rate(group), cost
+
+
+@lru_cache(maxsize=64)
+def _group_rate(group: str) -> RateLimit:
+    return RateLimit.parse(settings.RATE_LIMITS.get(group) or settings.RATE_LIMITS[DEFAULT_GROUP])
+
+
+def get_client_ip(connection: HTTPConnection) -> str:
+    """Address of the client (or 127.0.0.1 when unknown)."""
+    if not connection.client or not connection.client.host:
+        return "127.0.0.1"
+    return connection.client.host
+
+
+def _login_key(body: dict[str, Any], client_ip: str) -> Optional[str]:
+    email = body.get("email")
+    if isinstance(email, str) and email.strip():
+        return f"login:{email.strip().lower()}:{client_ip}"
+    return None
+
+
+def _refresh_key(body: dict[str, Any], client_ip: str) -> Optional[str]:
+    token = body.get("refresh_token")
+    if not isinstance(token, str) or not token:
+        return None
+    try:
+        subject = verify_token(token, token_type="refresh").get("sub")
+    except ValueError:
+        return None
+    return f"user:{subject}" if subject else None
+
+
+# Анонимные маршруты, клиента которых видно по телу запроса (шаблон маршрута -> ключ)
+_BODY_KEYS: dict[str, Callable[[dict[str, Any], str], Optional[str]]] = {
+    "/api/v1/auth/login": _login_key,
+    "/api/v1/auth/refresh": _refresh_key,
+}
+# Маршрут -> группа, с бакета которой по IP списывается каждый запрос в дополнение к основному
+_IP_GROUPS = {
+    "/api/v1/auth/login": "auth_ip",
+}
+
+
+async def _client_key(connection: HTTPConnection, path: str) -> str:
+    authorization = connection.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = verify_token(token).get("sub")
+        except ValueError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+
+    client_ip = get_client_ip(connection)
+    body_key = _BODY_KEYS.get(path)
+    if body_key is not None and isinstance(connection, Request):
+        # FastAPI уже прочитал тело для эндпоинта, повторное чтение берёт его из кэша
+        try:
+            body = json.loads(await connection.body() or b"null")
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            key = body_key(body, client_ip)
+            if key:
+                return key
+    return f"ip:{client_ip}"
+
+
+async def enforce_rate_limit(connection: HTTPConnection, response: Response) -> None:
+    """Router dependency: charge the route's cost to the caller's bucket or raise 429."""
+    if not settings.RATE_LIMIT_ENABLED or connection.scope["type"] != "http":
+        return
+
+    route = connection.scope.get("route")
+    path = getattr(route, "path", None) or connection.url.path
+    method = connection.scope["method"]
+    group, rate, cost = _route_policy(method, path)
+    client_key = await _client_key(connection, path)
+    checks = [(group, rate, await _limiter.hit(f"{group}:{client_key}", rate, cost))]
+    ip_group = _IP_GROUPS.get(path)
+    if ip_group is not None:
+        ip_rate = _group_rate(ip_group)
+        ip_key = f"{ip_group}:ip:{get_client_ip(connection)}"
+        checks.append((ip_group, ip_rate, await _limiter.hit(ip_key, ip_rate, cost)))
+    # В заголовках — отказавший бакет, иначе тот, где осталось меньше всего
+    group, rate, decision = min(checks, key=lambda check: (check[2].allowed, check[2].remaining))
+
+    headers = {
+        "X-RateLimit-Limit": str(rate.limit),
+        "X-RateLimit-Remaining": str(decision.remaining),
+    }
+    if not decision.allowed:
+        RATE_LIMIT_REJECTED.labels(group).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много запросов, повторите попытку позже",
+            headers={**headers, "Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+        )
+    response.headers.update(headers)
+
+
+async def close_rate_limiter() -> None:
+    await _limiter.close()
@@ -1,93 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
-
-os.environ.setdefault("PASSLIB_BCRYPT_STRICT", "0")
-
-# Патчим passlib ДО импорта CryptContext для обхода проверки бага обертки bcrypt
-# которая использует длинный тестовый пароль (>72 байт)
-try:
-    # Импортируем модуль passlib.handlers.bcrypt
-    import passlib.handlers.bcrypt as bcrypt_module
-    
-    # Патчим функцию detect_wrap_bug - это статический метод класса
-    def _patched_detect_wrap_bug(ident):
-        # Всегда возвращаем False, чтобы пропустить проверку с длинным паролем
-        return False
-    
-    # Применяем патч на всех возможных уровнях
-    # 1. Патчим функцию в модуле
-    bcrypt_module.detect_wrap_bug = _patched_detect_wrap_bug
-    
-    # 2. Патчим через __dict__ модуля
-    if hasattr(bcrypt_module, '__dict__'):
-        bcrypt_module.__dict__['detect_wrap_bug'] = _patched_detect_wrap_bug
-    
-    # 3. Патчим все классы bcrypt в модуле
-    for name in dir(bcrypt_module):
-        try:
-            obj = getattr(bcrypt_module, name, None)
-            if obj is None:
-                continue
-                
-            # Если это класс
-            if isinstance(obj, type):
-                # Патчим через __dict__ класса
-                if hasattr(obj, '__dict__'):
-                    obj.__dict__['detect_wrap_bug'] = staticmethod(_patched_detect_wrap_bug)
-                # Также патчим через setattr
-                setattr(obj, 'detect_wrap_bug', staticmethod(_patched_detect_wrap_bug))
-                
-                # Патчим все классы в MRO (Method Resolution Order)
-                for cls in obj.__mro__:
-                    if hasattr(cls, '__dict__'):
-                        cls.__dict__['detect_wrap_bug'] = staticmethod(_patched_detect_wrap_bug)
-                    setattr(cls, 'detect_wrap_bug', staticmethod(_patched_detect_wrap_bug))
-        except Exception:
-            # Игнорируем ошибки при патчинге отдельных атрибутов
-            pass
-    
-    # 4. Патчим _bcrypt.hashpw напрямую для обрезки паролей
-    try:
-        import bcrypt as _bcrypt_module
-        _original_hashpw = _bcrypt_module.hashpw
-        
-        def _patched_hashpw(secret, salt):
-            # Обрезаем пароль до 72 байт перед передачей в bcrypt
-            if isinstance(secret, bytes):
-                if len(secret) > 72:
-                    secret = secret[:72]
-            elif isinstance(secret, str):
-                secret_bytes = secret.encode('utf-8')
-                if len(secret_bytes) > 72:
-                    truncated = secret_bytes[:72]
-                    while truncated and (truncated[-1] & 0b11000000) == 0b10000000:
-                        truncated = truncated[:-1]
-                    secret = truncated if truncated else secret_bytes[:72]
-            return _original_hashpw(secret, salt)
-        
-        _bcrypt_module.hashpw = _patched_hashpw
-        # Также патчим в passlib.handlers.bcrypt, если он использует свой импорт
-        if hasattr(bcrypt_module, '_bcrypt'):
-            bcrypt_module._bcrypt.hashpw = _patched_hashpw
-    except Exception:
-        # Если не удалось патчить _bcrypt, продолжаем без этого
-        pass
-        
-except Exception as e:
-    # Если патч не удался, логируем и продолжаем
-    import logging
-    logging.warning(f"Failed to patch bcrypt detect_wrap_bug: {e}")
+from typing import Any, Callable, Dict, TypeVar
 
+import bcrypt
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import (
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_PENDING,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_WAIT,
+)
+
+BCRYPT_MAX_PASSWORD_BYTES = 72
 
-# Инициализируем CryptContext после патча
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
 
 
 def create_token(
@@ -177,67 +111,113 @@ def _truncate_password(password: str) -> str:
     return password
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # bcrypt имеет ограничение на длину пароля в 72 байта
-    # Обрезаем пароль до 72 байт, если он длиннее
-    plain_password = _truncate_password(plain_password)
-    
-    # Финальная проверка - гарантируем, что пароль не длиннее 72 байт
-    password_bytes = plain_password.encode('utf-8')
-    if len(password_bytes) > 72:
-        # Агрессивная обрезка до 72 байт
-        truncated = password_bytes[:72]
-        # Удаляем неполные UTF-8 последовательности
-        while truncated and (truncated[-1] & 0b11000000) == 0b10000000:
-            truncated = truncated[:-1]
-        if truncated:
-            plain_password = truncated.decode('utf-8', errors='replace')
-        else:
-            # Если после обрезки ничего не осталось, возвращаем False
-            return False
-    
-    # Еще одна финальная проверка перед вызовом bcrypt
-    final_check = plain_password.encode('utf-8')
-    if len(final_check) > 72:
-        # Если все еще длиннее, обрезаем до 72 байт напрямую
-        plain_password = final_check[:72].decode('utf-8', errors='replace')
-    
-    # Множественные попытки с разными вариантами обрезки
-    max_attempts = 3
-    for attempt in range(max_attempts):
+class PasswordHashingBusy(RuntimeError):
+    """The password hashing queue is full; the caller should retry later."""
+
+
+class _PasswordHasher:
+    """
+    Отдельный ограниченный пул потоков для bcrypt.
+
+    bcrypt отпускает GIL, поэтому потоков достаточно (процессы не нужны), но
+    хеширование не занимает общий пул AnyIO, в котором выполняются синхронные
+    эндпоинты. Если в очереди больше ``PASSWORD_HASH_MAX_QUEUE`` задач, новые
+    сразу отклоняются ``PasswordHashingBusy`` вместо бесконечного ожидания.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def workers(self) -> int:
+        return settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Future[T]:
+        with self._lock:
+            if self._pending >= self.workers + settings.PASSWORD_HASH_MAX_QUEUE:
+                PASSWORD_HASH_REJECTED.inc()
+                raise PasswordHashingBusy("Password hashing queue is full")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            self._pending += 1
+        PASSWORD_HASH_PENDING.inc()
         try:
-            return pwd_context.verify(plain_password, hashed_password)
-        except (ValueError, Exception) as e:
-            error_str = str(e).lower()
-            # Если ошибка связана с длиной пароля
-            if "72" in error_str or "bytes" in error_str or "truncate" in error_str or "longer" in error_str:
-                if attempt < max_attempts - 1:
-                    # Пробуем еще более агрессивную обрезку
-                    password_bytes = plain_password.encode('utf-8')
-                    if len(password_bytes) > 72:
-                        # Обрезаем до 72 байт
-                        truncated = password_bytes[:72]
-                        # Удаляем все байты продолжения UTF-8
-                        while truncated and (truncated[-1] & 0b11000000) == 0b10000000:
-                            truncated = truncated[:-1]
-                        if truncated:
-                            plain_password = truncated.decode('utf-8', errors='replace')
-                            # Проверяем еще раз длину
-                            if len(plain_password.encode('utf-8')) <= 72:
-                                continue
-                    # Если не удалось обрезать, возвращаем False
-                    return False
-                else:
-                    # Последняя попытка - возвращаем False
-                    return False
-            else:
-                # Если ошибка не связана с длиной пароля, пробрасываем дальше
-                raise
+            return self._executor.submit(self._run, time.perf_counter(), fn, *args)
+        except BaseException:
+            self._done()
+            raise
+
+    def _run(self, queued_at: float, fn: Callable[..., T], *args: Any) -> T:
+        started = time.perf_counter()
+        PASSWORD_HASH_WAIT.observe(started - queued_at)
+        try:
+            return fn(*args)
+        finally:
+            PASSWORD_HASH_DURATION.labels(fn.__name__.strip("_")).observe(time.perf_counter() - started)
+            self._done()
+
+    def _done(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        PASSWORD_HASH_PENDING.dec()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = _PasswordHasher()
+
+
+def _password_bytes(password: str) -> bytes:
+    # Та же обрезка, что и при создании существующих хешей, иначе длинные пароли перестанут подходить
+    return _truncate_password(password).encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def _hash(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode("ascii")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode("ascii"))
+    except (ValueError, UnicodeEncodeError):
+        # Пустой или повреждённый хеш
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with another bcrypt variant or cost than configured."""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or parts[1] != "2b" or not parts[2].isdigit():
+        return True
+    return int(parts[2]) != settings.BCRYPT_ROUNDS
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Check the password in the hashing pool (blocks the calling thread)."""
+    return _hasher.submit(_verify, plain_password, hashed_password).result()
 
 
 def get_password_hash(password: str) -> str:
-    # bcrypt имеет ограничение на длину пароля в 72 байта
-    # Обрезаем пароль до 72 байт, если он длиннее
-    password = _truncate_password(password)
-    return pwd_context.hash(password)
+    """Hash the password in the hashing pool (blocks the calling thread)."""
+    return _hasher.submit(_hash, password).result()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_hasher.submit(_verify, plain_password, hashed_password))
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_hasher.submit(_hash, password))
+
 
+def shutdown_password_hashing() -> None:
+    _hasher.shutdown()
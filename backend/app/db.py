@@ -1,28 +1,39 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 from fastapi import Depends
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
+from app.core.metrics import instrument_pool
 
 # Импортируем все модели, чтобы они попали в метаданные SQLModel
 from app.models import (  # noqa: F401
     AdminNotification,
     AdminNotificationDismissal,
+    AdminNotificationTarget,
+    CacheVersion,
     Calendar,
     CalendarMember,
     Department,
     Event,
     EventAttachment,
     EventComment,
+    EventImportJob,
     EventParticipant,
     Notification,
     Organization,
     Room,
+    RoomLock,
+    RoomReservation,
+    StoredBlob,
     Ticket,
     TicketAttachment,
     TicketCategory,
@@ -56,7 +67,39 @@ def _build_engine():
     return create_engine(settings.DATABASE_URL, connect_args=connect_args)
 
 
+def _async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if url.get_backend_name() == "postgresql":
+        return url.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    return settings.DATABASE_URL
+
+
+def _build_async_engine():
+    url = _async_database_url()
+    if url.startswith("sqlite"):
+        async_engine = create_async_engine(url, connect_args={"timeout": 20.0})
+
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def set_sqlite_pragma(dbapi_conn, connection_record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.close()
+        return async_engine
+    return create_async_engine(url)
+
+
 engine = _build_engine()
+instrument_engine(engine)
+instrument_pool(engine)
+
+# Асинхронный движок для async-эндпоинтов на чтение: ожидание БД не занимает поток пула
+async_engine = _build_async_engine()
+instrument_engine(async_engine.sync_engine)
+instrument_pool(async_engine.sync_engine)
 
 
 def init_db() -> None:
@@ -73,3 +116,11 @@ def get_session() -> Generator[Session, None, None]:
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
@@ -1,44 +1,38 @@
-from fastapi import FastAPI, Request, status
+import logging
+
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pathlib import Path
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 from app.api.router import api_router
 from app.core.config import settings
-from app.db import init_db
+from app.core.instrumentation import instrument_request
+from app.core.logging_config import configure_logging, log_request
+from app.core.metrics import mark_process_dead, metrics_endpoint, track_request_metrics
+from app.core.rate_limit import close_rate_limiter, enforce_rate_limit
+from app.core.security import PasswordHashingBusy, shutdown_password_hashing
+from app.db import async_engine, init_db
+
+logger = logging.getLogger(__name__)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files with content-hashed names, cached by browsers without revalidation."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
 
 
 def create_application() -> FastAPI:
+    configure_logging()
     app = FastAPI(title=settings.PROJECT_NAME, version="0.1.0")
     
-    # Rate limiting - для локальной разработки используем память, для продакшена Redis
-    try:
-        import redis
-        # Пытаемся подключиться к Redis
-        redis_client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=1)
-        redis_client.ping()
-        # Если подключение успешно, используем Redis
-        limiter = Limiter(
-            key_func=get_remote_address,
-            storage_uri=settings.REDIS_URL,
-            default_limits=["100/minute"],
-        )
-    except Exception:
-        # Если Redis недоступен, используем память (для локальной разработки)
-        limiter = Limiter(
-            key_func=get_remote_address,
-            default_limits=["100/minute"],
-        )
-    
-    app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
     # CORS middleware - настроен для безопасности
     app.add_middleware(
         CORSMiddleware,
@@ -64,37 +58,12 @@ def create_application() -> FastAPI:
         response.headers["Content-Security-Policy"] = "default-src 'self'"
         return response
     
-    # Middleware для логирования всех запросов и безопасности
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        import logging
-        logger = logging.getLogger("security")
-        
-        client_ip = get_remote_address(request)
-        method = request.method
-        path = request.url.path
-        
-        # Логируем запрос
-        logger.info(f"[REQUEST] {method} {path} from {client_ip}")
-        
-        try:
-            response = await call_next(request)
-            status_code = response.status_code
-            
-            # Логируем неудачные попытки входа (401, 403)
-            if path.startswith("/api/v1/auth/login") and status_code in [401, 403]:
-                logger.warning(f"[SECURITY] Failed login attempt from {client_ip} for {path}")
-            
-            # Логируем ошибки валидации (возможные атаки)
-            if status_code == 422:
-                logger.warning(f"[SECURITY] Validation error from {client_ip} for {path}")
-            
-            return response
-        except Exception as e:
-            logger.error(f"[ERROR] Exception in {path} from {client_ip}: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            raise
+    # Счётчик SQL и время в БД на запрос, Server-Timing, лог медленных запросов
+    app.middleware("http")(instrument_request)
+    # Prometheus: латентность и запросы в обработке по маршрутам
+    app.middleware("http")(track_request_metrics)
+    # Request id, access-лог с длительностью, события безопасности (внешний слой)
+    app.middleware("http")(log_request)
 
     # Helper function to add CORS headers - всегда добавляем для всех origins
     def get_cors_headers(request: Request) -> dict:
@@ -112,6 +81,9 @@ def create_application() -> FastAPI:
     @app.exception_handler(StarletteHTTPException)
     async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         headers = get_cors_headers(request)
+        # Заголовки исключения (WWW-Authenticate, Content-Range для 416 и т.п.)
+        if exc.headers:
+            headers = {**exc.headers, **headers}
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail},
@@ -127,11 +99,19 @@ def create_application() -> FastAPI:
             headers=headers,
         )
 
+    @app.exception_handler(PasswordHashingBusy)
+    async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+        # Очередь bcrypt переполнена (всплеск входов) — просим клиента повторить позже
+        headers = {**get_cors_headers(request), "Retry-After": "1"}
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Сервис перегружен, повторите попытку позже"},
+            headers=headers,
+        )
+
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
-        import traceback
-        print(f"[ERROR] Unhandled exception: {str(exc)}")
-        print(traceback.format_exc())
+        logger.error("Unhandled exception in %s %s", request.method, request.url.path, exc_info=exc)
         headers = get_cors_headers(request)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -139,7 +119,13 @@ def create_application() -> FastAPI:
             headers=headers,
         )
 
-    app.include_router(api_router, prefix=settings.API_V1_STR)
+    # Ограничение частоты по пользователю/IP и группе маршрутов (app/core/rate_limit.py)
+    app.include_router(
+        api_router,
+        prefix=settings.API_V1_STR,
+        dependencies=[Depends(enforce_rate_limit)],
+    )
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
     # Serve uploaded files
     BASE_DIR = Path(__file__).resolve().parent.parent
@@ -149,30 +135,46 @@ def create_application() -> FastAPI:
     (uploads_dir / "user_avatars").mkdir(parents=True, exist_ok=True)
     (uploads_dir / "event_attachments").mkdir(parents=True, exist_ok=True)
     (uploads_dir / "ticket_attachments").mkdir(parents=True, exist_ok=True)
-    print(f"[INFO] Static files directory: {uploads_dir.resolve()}")
+    (uploads_dir / "avatars").mkdir(parents=True, exist_ok=True)
+    logger.debug("Static files directory: %s", uploads_dir.resolve())
+    # Миниатюры аватаров имеют content-hashed имена — браузер кэширует их навсегда.
+    # Монтируется раньше /uploads, чтобы перехватить этот префикс.
+    app.mount(
+        "/uploads/avatars",
+        ImmutableStaticFiles(directory=str(uploads_dir / "avatars")),
+        name="avatars",
+    )
     app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
 
     @app.on_event("startup")
     async def _startup() -> None:
-        init_db()
+        # Схемой управляет Alembic (alembic upgrade head при деплое); create_all в
+        # каждом воркере замедляет старт и гоняет DDL наперегонки — только по флагу
+        if settings.DB_CREATE_ALL_ON_STARTUP:
+            init_db()
         # Start Redis Pub/Sub listener for WebSocket real-time notifications
         try:
             from app.services.redis_pubsub import redis_pubsub
             await redis_pubsub.connect()
-            print("[INFO] Redis Pub/Sub listener started for WebSocket notifications")
+            logger.info("Redis Pub/Sub listener started for WebSocket notifications")
         except Exception as e:
-            print(f"[WARNING] Failed to start Redis Pub/Sub listener: {e}")
-            print("[WARNING] WebSocket real-time notifications will not work")
+            logger.warning(
+                "Failed to start Redis Pub/Sub listener, WebSocket real-time notifications will not work: %s", e
+            )
     
     @app.on_event("shutdown")
     async def _shutdown() -> None:
+        mark_process_dead()
+        shutdown_password_hashing()
+        await close_rate_limiter()
+        await async_engine.dispose()
         # Stop Redis Pub/Sub listener
         try:
             from app.services.redis_pubsub import redis_pubsub
             await redis_pubsub.disconnect()
-            print("[INFO] Redis Pub/Sub listener stopped")
+            logger.info("Redis Pub/Sub listener stopped")
         except Exception as e:
-            print(f"[WARNING] Error stopping Redis Pub/Sub listener: {e}")
+            logger.warning("Error stopping Redis Pub/Sub listener: %s", e)
 
     return app
 
@@ -1,16 +1,25 @@
-from .admin_notification import AdminNotification, AdminNotificationDismissal
+from .admin_notification import (
+    AdminNotification,
+    AdminNotificationDismissal,
+    AdminNotificationTarget,
+    AdminNotificationTargetType,
+)
+from .cache_version import CacheVersion
 from .calendar import Calendar
 from .calendar_member import CalendarMember
 from .department import Department
 from .event import Event
 from .event_attachment import EventAttachment
 from .event_comment import EventComment
+from .event_import_job import EventImportJob
 from .event_participant import EventParticipant
 from .event_group_participant import EventGroupParticipant
 from .notification import Notification
 from .organization import Organization
 from .room import Room
 from .room_access import RoomAccess
+from .room_reservation import RoomLock, RoomReservation
+from .stored_blob import StoredBlob
 from .ticket import Ticket
 from .ticket_attachment import TicketAttachment
 from .ticket_category import TicketCategory
@@ -26,19 +35,26 @@ from .availability_slot import AvailabilitySlot
 __all__ = [
     "AdminNotification",
     "AdminNotificationDismissal",
+    "AdminNotificationTarget",
+    "AdminNotificationTargetType",
     "AvailabilitySlot",
+    "CacheVersion",
     "Calendar",
     "CalendarMember",
     "Department",
     "Event",
     "EventAttachment",
     "EventComment",
+    "EventImportJob",
     "EventParticipant",
     "EventGroupParticipant",
     "Notification",
     "Organization",
     "Room",
     "RoomAccess",
+    "RoomLock",
+    "RoomReservation",
+    "StoredBlob",
     "Ticket",
     "TicketAttachment",
     "TicketCategory",
@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Column, JSON
 
 
@@ -30,6 +31,29 @@ class AdminNotification(SQLModel, table=True):
     # Активно ли уведомление
     is_active: bool = Field(default=True, index=True)
 
+    # Для всех пользователей (нет получателей в admin_notification_targets)
+    is_broadcast: bool = Field(default=False, nullable=False, index=True)
+
+
+class AdminNotificationTargetType:
+    USER = "user"
+    DEPARTMENT = "department"
+
+
+class AdminNotificationTarget(SQLModel, table=True):
+    """Normalized recipient of an admin notification (user or department)."""
+
+    __tablename__ = "admin_notification_targets"
+    __table_args__ = (
+        Index("ix_admin_notification_targets_lookup", "target_type", "target_id"),
+    )
+
+    notification_id: UUID = Field(
+        foreign_key="admin_notifications.id", primary_key=True, nullable=False
+    )
+    target_type: str = Field(primary_key=True, max_length=20)
+    target_id: UUID = Field(primary_key=True, nullable=False)
+
 
 class AdminNotificationDismissal(SQLModel, table=True):
     """User dismissals of admin notifications."""
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class CacheVersion(SQLModel, table=True):
+    """Monotonic version stamp of a cached data set (bumped on every write)."""
+
+    __tablename__ = "cache_versions"
+
+    name: str = Field(primary_key=True, max_length=50)
+    version: int = Field(default=0, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
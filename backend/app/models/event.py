@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON
 from sqlmodel import Field, SQLModel
 
 
@@ -12,6 +12,11 @@ class Event(SQLModel, table=True):
     """Calendar event."""
 
     __tablename__ = "events"
+    # Занятость переговорок: диапазонный поиск по времени в пределах переговорки
+    # (ends_at включён, чтобы запрос занятости читал только индекс)
+    __table_args__ = (
+        Index("ix_events_room_id_starts_at", "room_id", "starts_at", "ends_at"),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
     calendar_id: UUID = Field(foreign_key="calendars.id", nullable=False, index=True)
@@ -32,6 +37,8 @@ class Event(SQLModel, table=True):
     recurrence_parent_id: Optional[UUID] = Field(
         default=None, foreign_key="events.id", index=True, nullable=True
     )
+    # Суммарный размер вложений в байтах (поддерживается при загрузке/удалении)
+    attachments_size: int = Field(default=0, nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
@@ -19,6 +19,10 @@ class EventAttachment(SQLModel, table=True):
     file_size: int = Field(ge=0)  # Размер файла в байтах
     content_type: str = Field(max_length=100)  # MIME type
     file_path: str = Field(max_length=500)  # Путь к файлу на сервере
+    # SHA-256 содержимого в хранилище блобов (NULL у файлов, загруженных до его появления)
+    blob_sha256: Optional[str] = Field(
+        default=None, foreign_key="stored_blobs.sha256", max_length=64, nullable=True, index=True
+    )
     uploaded_by: UUID = Field(foreign_key="users.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
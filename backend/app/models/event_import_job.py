@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import Column, JSON
+from sqlmodel import Field, SQLModel
+
+
+class EventImportJob(SQLModel, table=True):
+    """Bulk import of events from an ICS/CSV file into a calendar, with progress."""
+
+    __tablename__ = "event_import_jobs"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
+    calendar_id: UUID = Field(foreign_key="calendars.id", nullable=False, index=True, ondelete="CASCADE")
+    user_id: UUID = Field(foreign_key="users.id", nullable=False)
+    format: str = Field(max_length=8)  # ics, csv
+    timezone: str = Field(default="UTC", max_length=64)
+    status: str = Field(default="pending", max_length=16)  # pending, running, completed, failed
+    file_name: Optional[str] = Field(default=None, max_length=255)
+    file_path: Optional[str] = Field(default=None, max_length=500)
+    size: int = Field(default=0, nullable=False)
+    bytes_processed: int = Field(default=0, nullable=False)
+    records_processed: int = Field(default=0, nullable=False)
+    records_failed: int = Field(default=0, nullable=False)
+    events_created: int = Field(default=0, nullable=False)
+    # Первые ошибки по записям: [{"line": ..., "message": ...}]
+    errors: list = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    error: Optional[str] = Field(default=None, max_length=1000)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DDL, Index, event
+from sqlmodel import Field, SQLModel
+
+
+class RoomReservation(SQLModel, table=True):
+    """Time range of a room held by an event; overlaps are rejected by the database."""
+
+    __tablename__ = "room_reservations"
+    __table_args__ = (
+        Index("ix_room_reservations_room_id_starts_at", "room_id", "starts_at", "ends_at"),
+    )
+
+    event_id: UUID = Field(foreign_key="events.id", primary_key=True, ondelete="CASCADE")
+    room_id: UUID = Field(foreign_key="rooms.id", nullable=False)
+    starts_at: datetime = Field(nullable=False)
+    ends_at: datetime = Field(nullable=False)
+
+
+class RoomLock(SQLModel, table=True):
+    """Per-room lock row: bookings of a room are serialized by updating it (SQLite)."""
+
+    __tablename__ = "room_locks"
+
+    room_id: UUID = Field(foreign_key="rooms.id", primary_key=True)
+    version: int = Field(default=0, nullable=False)
+
+
+# PostgreSQL: пересечение бронирований одной переговорки запрещено ограничением
+# исключения (время хранится как naive UTC, поэтому tsrange, а не tstzrange)
+ROOM_RESERVATION_EXCLUSION = "room_reservations_no_overlap"
+
+event.listen(
+    RoomReservation.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    RoomReservation.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE room_reservations ADD CONSTRAINT {ROOM_RESERVATION_EXCLUSION} "
+        "EXCLUDE USING gist (room_id WITH =, tsrange(starts_at, ends_at, '[)') WITH &&)"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class StoredBlob(SQLModel, table=True):
+    """Content-addressed file in the blob store, shared by attachments with equal content."""
+
+    __tablename__ = "stored_blobs"
+
+    sha256: str = Field(primary_key=True, max_length=64)
+    size: int = Field(ge=0)  # Размер файла в байтах
+    storage_path: str = Field(max_length=500)  # Путь относительно каталога uploads
+    ref_count: int = Field(default=0, nullable=False, index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    # Момент, когда ref_count упал до нуля; GC удаляет блоб после grace-периода
+    released_at: Optional[datetime] = Field(default=None, nullable=True)
@@ -42,7 +42,11 @@ class Ticket(SQLModel, table=True):
     due_date: Optional[datetime] = Field(default=None, nullable=True)  # Крайний срок
     first_response_at: Optional[datetime] = Field(default=None, nullable=True)  # Время первого ответа
     sla_breach: bool = Field(default=False)  # Нарушение SLA
+    # Ближайший дедлайн SLA (первый ответ или решение); NULL для закрытых и уже нарушенных
+    sla_due_at: Optional[datetime] = Field(default=None, nullable=True, index=True)
     tags: Optional[str] = Field(default=None, max_length=500)  # Теги через запятую
+    # Суммарный размер неудалённых вложений в байтах (поддерживается при загрузке/удалении)
+    attachments_size: int = Field(default=0, nullable=False)
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -17,6 +17,10 @@ class TicketAttachment(SQLModel, table=True):
     uploaded_by: UUID = Field(foreign_key="users.id", index=True)
     original_filename: str = Field(max_length=255)
     file_path: str = Field(max_length=500)
+    # SHA-256 содержимого в хранилище блобов (NULL у файлов, загруженных до его появления)
+    blob_sha256: Optional[str] = Field(
+        default=None, foreign_key="stored_blobs.sha256", max_length=64, nullable=True, index=True
+    )
     file_size: int = Field(ge=0)
     content_type: str = Field(max_length=100, default="application/octet-stream")
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
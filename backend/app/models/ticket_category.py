@@ -19,6 +19,9 @@ class TicketCategory(SQLModel, table=True):
     icon: Optional[str] = Field(default=None, max_length=50)  # Иконка (emoji или имя)
     parent_id: Optional[UUID] = Field(default=None, foreign_key="ticket_categories.id", nullable=True)
     sort_order: int = Field(default=0)
+    # SLA категории в часах (если не задано — берётся SLA по приоритету)
+    sla_response_hours: Optional[float] = Field(default=None, nullable=True)
+    sla_resolution_hours: Optional[float] = Field(default=None, nullable=True)
     is_active: bool = Field(default=True, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
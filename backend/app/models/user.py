@@ -4,6 +4,7 @@ from datetime import date, datetime
 from typing import Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import Column, JSON
 from sqlmodel import Field, SQLModel
 
 
@@ -25,6 +26,10 @@ class User(SQLModel, table=True):
         default=None, foreign_key="users.id", nullable=True, index=True
     )
     avatar_url: Optional[str] = Field(default=None, max_length=500)
+    # Миниатюры аватара: {"32": {"webp": url, "jpeg": url}, ...}
+    avatar_variants: Optional[dict] = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
+    )
     hashed_password: str = Field(max_length=255)
     is_active: bool = Field(default=True)
     role: str = Field(default="employee", max_length=50)
@@ -24,13 +24,21 @@ from .event import (
     RecurrenceRule,
 )
 from .event_attachment import EventAttachmentRead
+from .event_import import EventImportError, EventImportJobRead
 from .notification import (
     NotificationCreate,
     NotificationRead,
     NotificationUpdate,
 )
 from .organization import OrganizationCreate, OrganizationRead
-from .room import RoomCreate, RoomRead, RoomUpdate
+from .room import (
+    RoomBusyInterval,
+    RoomCreate,
+    RoomOccupancy,
+    RoomOccupancyResponse,
+    RoomRead,
+    RoomUpdate,
+)
 from .ticket import TicketCreate, TicketRead, TicketUpdate
 from .ticket_comment import (
     TicketCommentCreate,
@@ -43,6 +51,7 @@ from .user import (
     UserBase,
     UserCreate,
     UserLogin,
+    UserPickerRead,
     UserRead,
     UserUpdate,
 )
@@ -62,6 +71,8 @@ __all__ = [
     "DepartmentReadWithChildren",
     "DepartmentUpdate",
     "EventAttachmentRead",
+    "EventImportError",
+    "EventImportJobRead",
     "EventCreate",
     "EventRead",
     "EventParticipantRead",
@@ -73,7 +84,10 @@ __all__ = [
     "RecurrenceRule",
     "OrganizationCreate",
     "OrganizationRead",
+    "RoomBusyInterval",
     "RoomCreate",
+    "RoomOccupancy",
+    "RoomOccupancyResponse",
     "RoomRead",
     "RoomUpdate",
     "TicketCreate",
@@ -87,6 +101,7 @@ __all__ = [
     "UserBase",
     "UserCreate",
     "UserLogin",
+    "UserPickerRead",
     "UserRead",
     "UserUpdate",
 ]
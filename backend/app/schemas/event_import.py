@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, computed_field
+
+
+class EventImportError(BaseModel):
+    line: int
+    message: str
+
+
+class EventImportJobRead(BaseModel):
+    """Import job state with progress over the uploaded file."""
+
+    id: UUID
+    calendar_id: UUID
+    format: str
+    status: str
+    file_name: Optional[str] = None
+    size: int
+    bytes_processed: int
+    records_processed: int
+    records_failed: int
+    events_created: int
+    errors: List[EventImportError] = []
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Share of the file processed, 0..1."""
+        if self.status == "completed":
+            return 1.0
+        return round(min(self.bytes_processed / self.size, 1.0), 3) if self.size else 0.0
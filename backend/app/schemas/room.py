@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -40,3 +40,26 @@ class RoomRead(RoomBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+
+class RoomBusyInterval(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+
+
+class RoomOccupancy(BaseModel):
+    room_id: UUID
+    name: str
+    capacity: int
+    location: Optional[str] = None
+    # Объединённые интервалы занятости, обрезанные по запрошенному окну
+    busy: Optional[List[RoomBusyInterval]] = None
+    # Битовая карта: символ на слот от window_start, "1" — занято
+    bitmap: Optional[str] = None
+
+
+class RoomOccupancyResponse(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    slot_minutes: int
+    rooms: List[RoomOccupancy]
@@ -42,6 +42,7 @@ class TicketRead(TicketBase):
     due_date: Optional[datetime] = None
     first_response_at: Optional[datetime] = None
     sla_breach: bool = False
+    sla_due_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     resolved_at: Optional[datetime] = None
@@ -71,6 +72,8 @@ class TicketCategoryBase(BaseModel):
     icon: Optional[str] = Field(None, max_length=50)
     parent_id: Optional[UUID] = None
     sort_order: int = 0
+    sla_response_hours: Optional[float] = Field(None, gt=0)
+    sla_resolution_hours: Optional[float] = Field(None, gt=0)
 
 
 class TicketCategoryCreate(TicketCategoryBase):
@@ -85,6 +88,8 @@ class TicketCategoryUpdate(BaseModel):
     parent_id: Optional[UUID] = None
     sort_order: Optional[int] = None
     is_active: Optional[bool] = None
+    sla_response_hours: Optional[float] = Field(None, gt=0)
+    sla_resolution_hours: Optional[float] = Field(None, gt=0)
 
 
 class TicketCategoryRead(TicketCategoryBase):
@@ -78,6 +78,21 @@ class UserRead(UserBase):
     # Many-to-many relationships
     department_ids: list[UUID] = []  # All departments user belongs to
     organization_ids: list[UUID] = []  # All organizations user belongs to
+    # Миниатюры аватара: {"32": {"webp": url, "jpeg": url}, ...}
+    avatar_variants: Optional[dict[str, dict[str, str]]] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserPickerRead(BaseModel):
+    """Lightweight user projection for participant/assignee pickers."""
+    id: UUID
+    email: str
+    full_name: Optional[str] = None
+    position: Optional[str] = None
+    department_id: Optional[UUID] = None
+    avatar_url: Optional[str] = None
+    avatar_variants: Optional[dict[str, dict[str, str]]] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,105 @@
+"""
+Обработка аватаров пользователей.
+
+Оригинал сохраняется при загрузке как есть, а миниатюры фиксированных размеров
+(WebP + JPEG) строит Celery-задача ``app.tasks.avatars.process_avatar``.
+Имена миниатюр содержат хэш содержимого, поэтому они раздаются с
+``Cache-Control: immutable`` (см. монтирование ``/uploads/avatars`` в main.py):
+новый аватар всегда получает новый URL.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import shutil
+from pathlib import Path
+from typing import Optional
+from uuid import UUID
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+AVATARS_DIR = UPLOADS_DIR / "avatars"
+AVATARS_URL = "/uploads/avatars"
+
+AVATAR_SIZES = (32, 64, 128)
+# Размер, URL которого записывается в User.avatar_url
+AVATAR_DEFAULT_SIZE = 128
+AVATAR_FORMATS = {
+    "webp": ("WEBP", {"quality": 85, "method": 6}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def url_to_path(url: Optional[str]) -> Optional[Path]:
+    """Map an ``/uploads/...`` URL to a file path inside the uploads directory."""
+    if not url or not url.startswith("/uploads/"):
+        return None
+    path = (UPLOADS_DIR / url[len("/uploads/"):]).resolve()
+    if UPLOADS_DIR.resolve() not in path.parents:
+        return None
+    return path
+
+
+def user_avatar_dir(user_id: UUID) -> Path:
+    return AVATARS_DIR / str(user_id)
+
+
+def render_thumbnails(source: Path, user_id: UUID) -> dict[str, dict[str, str]]:
+    """
+    Build square thumbnails of every size and format from ``source``.
+
+    Returns ``{"<size>": {"webp": url, "jpeg": url}}``. Files are named by the
+    hash of their content and written atomically into the user's avatar directory.
+    """
+    from PIL import Image, ImageOps
+
+    target_dir = user_avatar_dir(user_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA")
+
+        variants: dict[str, dict[str, str]] = {}
+        for size in AVATAR_SIZES:
+            thumb = ImageOps.fit(original, (size, size), Image.Resampling.LANCZOS)
+            variants[str(size)] = {}
+            for ext, (pil_format, options) in AVATAR_FORMATS.items():
+                image = thumb
+                if pil_format == "JPEG" and image.mode == "RGBA":
+                    # JPEG без альфа-канала: подкладываем белый фон
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                buffer = io.BytesIO()
+                image.save(buffer, pil_format, **options)
+                data = buffer.getvalue()
+
+                filename = f"{hashlib.sha256(data).hexdigest()[:20]}-{size}.{ext}"
+                path = target_dir / filename
+                if not path.exists():
+                    temp_path = target_dir / f".{filename}.tmp"
+                    temp_path.write_bytes(data)
+                    temp_path.replace(path)
+                variants[str(size)][ext] = f"{AVATARS_URL}/{user_id}/{filename}"
+    return variants
+
+
+def remove_stale_thumbnails(user_id: UUID, keep: dict[str, dict[str, str]]) -> None:
+    """Delete thumbnails of previous avatars of the user."""
+    target_dir = user_avatar_dir(user_id)
+    if not target_dir.exists():
+        return
+    keep_names = {url.rsplit("/", 1)[-1] for formats in keep.values() for url in formats.values()}
+    for path in target_dir.iterdir():
+        if path.name not in keep_names:
+            path.unlink(missing_ok=True)
+
+
+def remove_all_avatar_files(user_id: UUID, avatar_url: Optional[str]) -> None:
+    """Delete the stored original (if ``avatar_url`` points to one) and all thumbnails of the user."""
+    path = url_to_path(avatar_url)
+    if path is not None:
+        path.unlink(missing_ok=True)
+    shutil.rmtree(user_avatar_dir(user_id), ignore_errors=True)
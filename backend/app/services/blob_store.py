@@ -0,0 +1,292 @@
+"""
+Content-addressed хранилище вложений.
+
+Файл хранится один раз под своим SHA-256 (``uploads/blobs/ab/cd/<sha256>``),
+вложения событий и тикетов ссылаются на него через ``blob_sha256``.
+В ``stored_blobs.ref_count`` поддерживается число ссылок: повторная загрузка
+того же содержимого — это только вставка метаданных и инкремент счётчика.
+Блобы без ссылок удаляет периодическая задача ``collect_blob_garbage``
+после grace-периода; она же убирает файлы без строки в ``stored_blobs``
+(загрузка положила файл, но её транзакция откатилась).
+
+Квоты на суммарный размер вложений берутся из счётчиков
+``Event.attachments_size`` / ``Ticket.attachments_size``, которые меняются
+условным UPDATE в той же транзакции, что и вставка/удаление вложения.
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Type, Union
+from uuid import UUID
+
+from fastapi import UploadFile
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Event, EventAttachment, StoredBlob, Ticket
+from app.services.storage import TEMP_PREFIX, StoredFile, stage_upload
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+BLOB_DIR = UPLOADS_DIR / "blobs"
+STAGING_DIR = BLOB_DIR / "tmp"
+# Сколько sha256 проверять одним запросом при поиске файлов без строки в БД
+ORPHAN_SWEEP_BATCH = 500
+
+
+def blob_path(sha256: str) -> Path:
+    """Absolute path of a blob on disk."""
+    return BLOB_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+async def stage_blob(file: UploadFile, max_size: Optional[int] = None) -> StoredFile:
+    """Stream an upload into the blob staging area (size limit and SHA-256 computed on the fly)."""
+    return await stage_upload(file, STAGING_DIR, max_size)
+
+
+def _place_file(stored: StoredFile) -> Path:
+    path = blob_path(stored.sha256)
+    try:
+        # Содержимое уже на диске — копия не нужна. Обновляем mtime, чтобы
+        # уборка файлов без строки в БД не удалила его до нашего коммита
+        os.utime(path)
+    except FileNotFoundError:
+        stored.commit(path)
+    else:
+        stored.discard()
+    return path
+
+
+def _increment(session: Session, sha256: str) -> bool:
+    result = session.execute(
+        update(StoredBlob)
+        .where(StoredBlob.sha256 == sha256)
+        .values(ref_count=StoredBlob.ref_count + 1, released_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def acquire_blob(session: Session, stored: StoredFile) -> Tuple[StoredBlob, Path]:
+    """
+    Take a reference on the blob with the staged content, creating it if needed.
+
+    The staged file is moved into the store or discarded if the content is
+    already there. The caller commits; if it rolls back instead, the placed
+    file is left without a row and removed later by :func:`collect_garbage`.
+    """
+    if not _increment(session, stored.sha256):
+        path = blob_path(stored.sha256)
+        blob = StoredBlob(
+            sha256=stored.sha256,
+            size=stored.size,
+            storage_path=path.relative_to(UPLOADS_DIR).as_posix(),
+            ref_count=1,
+        )
+        try:
+            with session.begin_nested():
+                session.add(blob)
+        except IntegrityError:
+            # Параллельная загрузка того же содержимого успела создать строку
+            _increment(session, stored.sha256)
+
+    path = _place_file(stored)
+    blob = session.get(StoredBlob, stored.sha256, populate_existing=True)
+    return blob, path
+
+
+def release_blobs(session: Session, sha256s: Iterable[Optional[str]]) -> None:
+    """Drop one reference per occurrence in ``sha256s`` (None entries are ignored). The caller commits."""
+    counts = Counter(sha for sha in sha256s if sha)
+    if not counts:
+        return
+
+    by_count: dict[int, list[str]] = {}
+    for sha, count in counts.items():
+        by_count.setdefault(count, []).append(sha)
+    for count, shas in by_count.items():
+        session.execute(
+            update(StoredBlob)
+            .where(StoredBlob.sha256.in_(shas))
+            .values(ref_count=StoredBlob.ref_count - count)
+            .execution_options(synchronize_session=False)
+        )
+    session.execute(
+        update(StoredBlob)
+        .where(
+            StoredBlob.sha256.in_(list(counts)),
+            StoredBlob.ref_count <= 0,
+            StoredBlob.released_at.is_(None),
+        )
+        .values(released_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reserve_attachment_quota(
+    session: Session,
+    model: Union[Type[Event], Type[Ticket]],
+    owner_id: UUID,
+    size: int,
+    limit: int,
+) -> bool:
+    """
+    Atomically add ``size`` to the owner's attachment counter if it stays within ``limit``.
+    Returns False when the quota would be exceeded. The caller commits.
+    """
+    result = session.execute(
+        update(model)
+        .where(model.id == owner_id, model.attachments_size + size <= limit)
+        .values(attachments_size=model.attachments_size + size)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_attachment_quota(
+    session: Session,
+    model: Union[Type[Event], Type[Ticket]],
+    owner_id: UUID,
+    size: int,
+) -> None:
+    """Subtract ``size`` from the owner's attachment counter. The caller commits."""
+    session.execute(
+        update(model)
+        .where(model.id == owner_id)
+        .values(attachments_size=model.attachments_size - size)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def remove_legacy_file(file_path: str) -> None:
+    """Delete a file stored before the blob store existed (attachment without ``blob_sha256``)."""
+    path = Path(file_path)
+    if not path.is_absolute():
+        path = BASE_DIR / path
+    path.unlink(missing_ok=True)
+
+
+def delete_event_attachments(session: Session, event_ids: Iterable[UUID]) -> None:
+    """Delete all attachments of the given events and release their blobs. The caller commits."""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    rows = session.exec(
+        select(EventAttachment.blob_sha256, EventAttachment.file_path).where(
+            EventAttachment.event_id.in_(event_ids)
+        )
+    ).all()
+    if not rows:
+        return
+    session.execute(
+        delete(EventAttachment)
+        .where(EventAttachment.event_id.in_(event_ids))
+        .execution_options(synchronize_session=False)
+    )
+    release_blobs(session, (sha for sha, _ in rows))
+    for sha, file_path in rows:
+        if not sha:
+            remove_legacy_file(file_path)
+
+
+def collect_garbage(
+    session: Session,
+    now: Optional[datetime] = None,
+    grace: Optional[timedelta] = None,
+) -> dict[str, int]:
+    """
+    Delete blobs that have had no references for longer than ``grace``,
+    blob files without a row (uploads that rolled back) and stale staging
+    files left by interrupted uploads.
+    """
+    now = now or datetime.utcnow()
+    if grace is None:
+        grace = timedelta(hours=settings.BLOB_GC_GRACE_HOURS)
+    cutoff = now - grace
+
+    # Строки удаляются под блокировкой, а файлы до коммита только отодвигаются
+    # в staging: параллельная загрузка того же содержимого дождётся коммита и
+    # положит файл заново, а при неудачном коммите файлы возвращаются на место
+    deleted = session.execute(
+        delete(StoredBlob)
+        .where(StoredBlob.ref_count <= 0, StoredBlob.released_at <= cutoff)
+        .returning(StoredBlob.storage_path, StoredBlob.size)
+        .execution_options(synchronize_session=False)
+    ).all()
+    moved: list[tuple[Path, Path]] = []
+    if deleted:
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        for storage_path, _ in deleted:
+            path = UPLOADS_DIR / storage_path
+            trash = STAGING_DIR / f"{TEMP_PREFIX}gc-{path.name}"
+            try:
+                os.replace(path, trash)
+            except FileNotFoundError:
+                continue
+            moved.append((path, trash))
+        session.commit()
+    except BaseException:
+        session.rollback()
+        for path, trash in moved:
+            if not path.exists():
+                os.replace(trash, path)
+        raise
+    for _, trash in moved:
+        trash.unlink(missing_ok=True)
+    freed = sum(size for _, size in deleted)
+
+    cutoff_ts = time.time() - grace.total_seconds()
+    orphans = _sweep_orphan_files(session, cutoff_ts)
+
+    stale = 0
+    if STAGING_DIR.exists():
+        for temp_path in STAGING_DIR.glob(f"{TEMP_PREFIX}*"):
+            try:
+                if temp_path.stat().st_mtime < cutoff_ts:
+                    temp_path.unlink()
+                    stale += 1
+            except FileNotFoundError:
+                pass
+
+    return {
+        "blobs_deleted": len(deleted),
+        "bytes_freed": freed,
+        "orphan_files_deleted": orphans,
+        "staging_files_deleted": stale,
+    }
+
+
+def _sweep_orphan_files(session: Session, cutoff_ts: float) -> int:
+    """Delete blob files older than ``cutoff_ts`` that have no ``stored_blobs`` row."""
+    if not BLOB_DIR.exists():
+        return 0
+    candidates = []
+    # Блобы лежат в ab/cd/<sha256>; staging (tmp/) под шаблон не попадает
+    for path in BLOB_DIR.glob("??/??/*"):
+        try:
+            if path.stat().st_mtime < cutoff_ts:
+                candidates.append(path)
+        except FileNotFoundError:
+            pass
+
+    removed = 0
+    for start in range(0, len(candidates), ORPHAN_SWEEP_BATCH):
+        batch = candidates[start:start + ORPHAN_SWEEP_BATCH]
+        known = set(
+            session.exec(
+                select(StoredBlob.sha256).where(StoredBlob.sha256.in_([path.name for path in batch]))
+            ).all()
+        )
+        for path in batch:
+            if path.name not in known:
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
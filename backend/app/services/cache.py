@@ -0,0 +1,101 @@
+"""
+Кэш с версионированием.
+
+Версия набора данных хранится в таблице ``cache_versions`` и увеличивается
+в той же транзакции, что и изменение данных. Читатели берут текущую версию
+одним запросом по первичному ключу и используют её как часть ключа кэша,
+поэтому кэш в памяти каждого воркера корректен без межпроцессной инвалидации.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import CacheVersion
+
+# Имена версионируемых наборов данных
+ADMIN_NOTIFICATIONS_VERSION = "admin_notifications"
+DEPARTMENTS_VERSION = "departments"
+USERS_VERSION = "users"
+
+
+def get_cache_version(session: Session, name: str) -> int:
+    """Return the current version of a data set (0 if it was never bumped)."""
+    version = session.exec(
+        select(CacheVersion.version).where(CacheVersion.name == name)
+    ).first()
+    return version or 0
+
+
+async def get_cache_version_async(session: AsyncSession, name: str) -> int:
+    """Async variant of :func:`get_cache_version`."""
+    version = (
+        await session.exec(select(CacheVersion.version).where(CacheVersion.name == name))
+    ).first()
+    return version or 0
+
+
+def bump_cache_version(session: Session, *names: str) -> None:
+    """Invalidate caches of the given data sets. The caller commits."""
+    if not names:
+        return
+    now = datetime.utcnow()
+    # Один upsert: первое увеличение версии из двух запросов сразу не падает на первичном ключе
+    if session.get_bind().dialect.name == "postgresql":
+        statement = postgresql_insert(CacheVersion)
+    else:
+        statement = sqlite_insert(CacheVersion)
+    statement = statement.values(
+        [{"name": name, "version": 1, "updated_at": now} for name in dict.fromkeys(names)]
+    ).on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1, "updated_at": now},
+    )
+    session.execute(statement)
+
+
+class VersionedCache:
+    """Small thread-safe LRU keyed by (key, version)."""
+
+    def __init__(self, maxsize: int = 32) -> None:
+        self._maxsize = maxsize
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get((key, version))
+            if value is not None:
+                self._items.move_to_end((key, version))
+            return value
+
+    def set(self, key: Hashable, version: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[(key, version)] = value
+            self._items.move_to_end((key, version))
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    normalized = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == normalized
+        for candidate in if_none_match.split(",")
+    )
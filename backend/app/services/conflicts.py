@@ -0,0 +1,122 @@
+"""
+Поиск пересечений интервалов методом заметающей прямой.
+
+Интервалы обрабатываются в порядке начала, активные хранятся в куче по концу,
+поэтому стоимость — O(n log n) плюс размер результата, а не O(n²) по парам.
+Касающиеся интервалы (конец одного равен началу другого) не пересекаются.
+
+``sweep_conflicts`` объединяет пересечения в максимальные слоты конфликта
+(непрерывные отрезки, где заняты хотя бы два интервала) со списком всех
+затронутых элементов; ``find_overlap`` ищет первое пересечение новых
+интервалов с уже занятыми — для проверок при создании и изменении событий.
+"""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+C = TypeVar("C")
+
+
+@dataclass(frozen=True)
+class ConflictSlot(Generic[T]):
+    """Maximal time range where at least two items overlap, with every item involved."""
+
+    slot_start: datetime
+    slot_end: datetime
+    items: list[T]
+
+
+def sweep_conflicts(
+    items: Iterable[T],
+    *,
+    start: Callable[[T], datetime],
+    end: Callable[[T], datetime],
+    presorted: bool = False,
+) -> Iterator[ConflictSlot[T]]:
+    """
+    Yield conflict slots of ``items`` in time order.
+
+    With ``presorted=True`` the items must already be ordered by start (e.g. by
+    ``ORDER BY starts_at`` in SQL) and are consumed lazily, so only the active
+    intervals and the current slot are kept in memory.
+    """
+    if not presorted:
+        items = sorted(items, key=start)
+
+    active: list[tuple[datetime, int, T]] = []
+    slot_start: Optional[datetime] = None
+    # Конец слота, пока он может продолжиться пересечением, начинающимся ровно в этот момент
+    slot_end: Optional[datetime] = None
+    slot_items: list[T] = []
+    slot_last_seq = -1
+
+    def release_until(moment: Optional[datetime]) -> Iterator[ConflictSlot[T]]:
+        nonlocal slot_start, slot_end, slot_items
+        while active and (moment is None or active[0][0] <= moment):
+            ended_at = heapq.heappop(active)[0]
+            if slot_start is not None and slot_end is None and len(active) < 2:
+                slot_end = ended_at
+        if slot_end is not None and (moment is None or slot_end < moment):
+            yield ConflictSlot(slot_start, slot_end, slot_items)
+            slot_start, slot_end, slot_items = None, None, []
+
+    for seq, item in enumerate(items):
+        item_start, item_end = start(item), end(item)
+        if item_end <= item_start:
+            continue
+        yield from release_until(item_start)
+        heapq.heappush(active, (item_end, seq, item))
+        if slot_start is not None and slot_end is None:
+            slot_items.append(item)
+            slot_last_seq = seq
+        elif len(active) >= 2:
+            new_items = sorted(
+                (entry for entry in active if entry[1] > slot_last_seq), key=lambda entry: entry[1]
+            )
+            if slot_start is None:
+                slot_start = item_start
+                slot_items = [entry[2] for entry in sorted(active, key=lambda entry: entry[1])]
+            else:
+                # Пересечение вплотную к закончившемуся — тот же непрерывный слот
+                slot_end = None
+                slot_items.extend(entry[2] for entry in new_items)
+            slot_last_seq = seq
+    yield from release_until(None)
+
+
+def find_overlap(
+    candidates: Iterable[C],
+    busy: Iterable[T],
+    *,
+    start: Callable[[C | T], datetime],
+    end: Callable[[C | T], datetime],
+) -> Optional[tuple[C, C | T]]:
+    """
+    Return the earliest ``(candidate, other)`` pair where a candidate overlaps a busy
+    interval or another candidate (e.g. occurrences of a series being created).
+    """
+    tagged = [(start(item), True, item) for item in candidates]
+    tagged.extend((start(item), False, item) for item in busy)
+    tagged.sort(key=lambda entry: entry[0])
+
+    active: list[tuple[datetime, int, bool, object]] = []
+    for seq, (item_start, is_candidate, item) in enumerate(tagged):
+        item_end = end(item)
+        if item_end <= item_start:
+            continue
+        while active and active[0][0] <= item_start:
+            heapq.heappop(active)
+        if is_candidate and active:
+            # Предпочитаем уже существующее событие пересечению внутри серии
+            other = next((entry for entry in active if not entry[2]), active[0])
+            return item, other[3]
+        if not is_candidate:
+            candidate = next((entry for entry in active if entry[2]), None)
+            if candidate is not None:
+                return candidate[3], item
+        heapq.heappush(active, (item_end, seq, is_candidate, item))
+    return None
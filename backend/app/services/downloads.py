@@ -0,0 +1,187 @@
+"""
+Отдача вложений.
+
+Общий код для download-эндпоинтов: условные запросы (If-None-Match /
+If-Modified-Since -> 304), докачка (Range -> 206) и, если настроен
+``DOWNLOAD_ACCEL_REDIRECT_PREFIX``, передача самих байтов reverse proxy через
+``X-Accel-Redirect`` — приложение только проверяет доступ и отдаёт заголовки.
+
+ETag для файлов из хранилища блобов — SHA-256 содержимого (сильный), для
+старых файлов — слабый, из размера и mtime.
+"""
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.core.config import settings
+from app.services.blob_store import UPLOADS_DIR
+from app.services.cache import etag_matches
+from app.services.storage import CHUNK_SIZE
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP-даты с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None when the header should be ignored (multiple ranges or
+    unsupported syntax — the full file is sent). Raises HTTP 416 when the
+    range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # bytes=-N — последние N байт
+        length = int(end_str)
+        if length == 0:
+            start, end = size, size
+        else:
+            start, end = max(size - length, 0), size - 1
+    else:
+        start = int(start_str)
+        end = min(int(end_str), size - 1) if end_str else size - 1
+        if end_str and int(end_str) < start:
+            return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _accel_redirect_uri(path: Path) -> Optional[str]:
+    prefix = settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return None
+    try:
+        relative = path.resolve().relative_to(UPLOADS_DIR.resolve())
+    except ValueError:
+        return None
+    return f"{prefix.rstrip('/')}/{quote(relative.as_posix())}"
+
+
+def download_response(
+    request: Request,
+    file_path: str,
+    *,
+    filename: str,
+    media_type: str,
+    content_hash: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """Build the response for an already authorized attachment download."""
+    path = Path(file_path)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on server",
+        )
+    size = stat_result.st_size
+
+    if content_hash:
+        etag = f'"{content_hash}"'
+    else:
+        etag = f'W/"{size:x}-{int(stat_result.st_mtime):x}"'
+    if last_modified is None:
+        last_modified = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+    elif last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        # Файл за авторизацией: кэшировать можно только в браузере и с ревалидацией
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = _not_modified_since(request.headers.get("if-modified-since"), last_modified)
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = _content_disposition(filename)
+
+    accel_uri = _accel_redirect_uri(path)
+    if accel_uri:
+        # Байты (и Range) отдаёт nginx из internal location
+        headers["X-Accel-Redirect"] = accel_uri
+        return Response(media_type=media_type, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range сравнивается строго: со слабым ETag докачка не разрешается
+    if range_header and (not if_range or (if_range.strip() == etag and not etag.startswith("W/"))):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_file_range(path, start, end),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(
+        path=str(path),
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
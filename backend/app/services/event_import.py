@@ -0,0 +1,714 @@
+"""
+Массовый импорт событий из ICS (RFC 5545) и CSV.
+
+Файл читается построчно (в памяти — только текущая пачка записей) и
+обрабатывается пачками по ``IMPORT_BATCH_SIZE`` записей. На пачку:
+
+- участники (по email) и переговорки (по id или названию) ищутся одним
+  запросом каждый, найденные кэшируются до конца импорта;
+- занятость переговорок проверяется для всей пачки сразу
+  (:func:`~app.services.room_booking.partition_room_bookings`): запись,
+  которой переговорка занята, отклоняется с ошибкой, остальные импортируются;
+- события, участники и брони вставляются по одному ``INSERT`` на таблицу,
+  после пачки — commit и обновление прогресса задачи.
+
+Повторяющиеся события (``RRULE``: DAILY/WEEKLY/MONTHLY с INTERVAL, COUNT,
+UNTIL) разворачиваются в серию так же, как при создании через API, но шаг
+повторения отсчитывается в часовом поясе ``DTSTART`` (встреча в 10:00 по
+Берлину остаётся в 10:00 и после перехода на летнее время); ``EXDATE``
+убирает вхождения, ``VEVENT`` с ``RECURRENCE-ID`` заменяет вхождение, если
+идёт в файле вслед за своей серией (так пишут Outlook, Google и экспорт
+этого приложения). Изменённое вхождение, не совпавшее ни с одним
+вхождением серии, попадает в ошибки. Уведомления участникам при импорте не
+отправляются, проверка занятости участников не выполняется — импортируются
+уже существующие договорённости.
+
+CSV: первая строка — заголовок. Колонки ``title``, ``starts_at`` обязательны;
+``ends_at``, ``all_day``, ``description``, ``location``, ``status``, ``room``
+(id или название переговорки), ``attendees`` (email через ``;`` или ``,``),
+``rrule`` (например ``FREQ=WEEKLY;COUNT=10``) — по желанию. Даты — ISO 8601;
+время без смещения, как и «плавающее» время в ICS, считается в часовом поясе
+импорта.
+"""
+from __future__ import annotations
+
+import csv
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Union
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_
+from sqlalchemy import select as sql_select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import Event, EventImportJob, EventParticipant, Room, RoomReservation, User
+from app.schemas import RecurrenceRule
+from app.services.recurrence import generate_recurrence_starts
+from app.services.room_booking import RoomBooking, partition_room_bookings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+IMPORTS_DIR = BASE_DIR / "uploads" / "imports"
+
+IMPORT_FORMATS = ("ics", "csv")
+IMPORT_BATCH_SIZE = 500
+# Сколько ошибок по записям сохраняется в задаче (остальные только считаются)
+MAX_REPORTED_ERRORS = 100
+# Повторы пачки, если бронь переговорки перехватили между проверкой и вставкой (PostgreSQL)
+IMPORT_CONFLICT_RETRIES = 3
+
+_TITLE_MAX = 255
+_DESCRIPTION_MAX = 2000
+_LOCATION_MAX = 255
+_STATUSES = {"confirmed", "tentative", "cancelled"}
+_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+_TRUE_VALUES = {"1", "true", "yes", "y", "да"}
+_ICS_UNESCAPE = re.compile(r"\\([\\;,nN])")
+
+
+class RecordError(NamedTuple):
+    """A record of the file that was not imported."""
+
+    line: int
+    message: str
+
+
+@dataclass
+class ImportRecord:
+    """One event (or a whole series) parsed from the file; times are naive UTC."""
+
+    line: int
+    title: str
+    starts_at: datetime
+    ends_at: datetime
+    # Начало в часовом поясе, в котором оно записано в файле (для повторений)
+    local_start: Optional[datetime] = None
+    zone: tzinfo = timezone.utc
+    all_day: bool = False
+    description: Optional[str] = None
+    location: Optional[str] = None
+    status: str = "confirmed"
+    room: Optional[str] = None
+    attendees: list[str] = field(default_factory=list)
+    rule: Optional[RecurrenceRule] = None
+    exdates: set[datetime] = field(default_factory=set)
+    uid: Optional[str] = None
+    recurrence_id: Optional[datetime] = None
+    overrides: dict[datetime, ImportRecord] = field(default_factory=dict)
+
+
+ParsedItem = Union[ImportRecord, RecordError]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """``ics``/``csv`` by file extension or content type, ``None`` if unknown."""
+    suffix = Path(filename or "").suffix.lower().lstrip(".")
+    if suffix in ("ics", "ical", "ifb"):
+        return "ics"
+    if suffix == "csv":
+        return "csv"
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type == "text/calendar":
+        return "ics"
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+
+def process_import_job(job_id: UUID) -> None:
+    """Run an import job to completion with its own session (request or Celery worker)."""
+    with Session(engine) as session:
+        job = session.get(EventImportJob, job_id)
+        # Уже начатую задачу не повторяем: часть пачек могла быть сохранена
+        if job is None or job.status != "pending":
+            return
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+        path = Path(job.file_path) if job.file_path else None
+        try:
+            if path is None or not path.exists():
+                raise FileNotFoundError("Файл импорта не найден")
+            run_import(session, job, path)
+            job.status = "completed"
+        except Exception as exc:
+            session.rollback()
+            logger.exception("Event import %s failed", job_id)
+            job = session.get(EventImportJob, job_id)
+            job.status = "failed"
+            job.error = str(exc)[:1000]
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        if path is not None:
+            path.unlink(missing_ok=True)
+        logger.info(
+            "Event import %s %s: %s records, %s events created, %s failed",
+            job_id,
+            job.status,
+            job.records_processed,
+            job.events_created,
+            job.records_failed,
+        )
+
+
+def run_import(session: Session, job: EventImportJob, path: Path) -> None:
+    """Import the file batch by batch, committing progress after each batch."""
+    zone = ZoneInfo(job.timezone)
+    importer = _BatchImporter(session, job)
+    with path.open("rb") as raw:
+        reader = _LineReader(raw)
+        items = parse_ics(reader, zone) if job.format == "ics" else parse_csv(reader, zone)
+        for batch in _batches(items):
+            importer.import_batch(batch)
+            job.bytes_processed = reader.bytes_read
+            session.add(job)
+            session.commit()
+
+
+class _LineReader:
+    """Decoded lines of a binary file, counting bytes read for progress."""
+
+    def __init__(self, raw: BinaryIO) -> None:
+        self._raw = raw
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        encoding = "utf-8-sig"
+        for line in self._raw:
+            self.bytes_read += len(line)
+            yield line.decode(encoding, errors="replace")
+            encoding = "utf-8"
+
+
+def _batches(items: Iterable[ParsedItem]) -> Iterator[list[ParsedItem]]:
+    batch: list[ParsedItem] = []
+    for item in items:
+        # Изменённые вхождения остаются в одной пачке со своей серией
+        is_override = isinstance(item, ImportRecord) and item.recurrence_id is not None
+        if len(batch) >= IMPORT_BATCH_SIZE and not is_override:
+            yield batch
+            batch = []
+        batch.append(item)
+    if batch:
+        yield batch
+
+
+class _Moment(NamedTuple):
+    """A parsed date or date-time: naive UTC, as written, and the zone it was written in."""
+
+    utc: datetime
+    local: datetime
+    is_date: bool
+    zone: tzinfo
+
+
+class _Unit(NamedTuple):
+    record: ImportRecord
+    rows: list[dict]
+    bookings: list[RoomBooking]
+
+
+class _BatchImporter:
+    def __init__(self, session: Session, job: EventImportJob) -> None:
+        self.session = session
+        self.job = job
+        self.users: dict[str, UUID] = {}
+        self.missing_users: set[str] = set()
+        self.rooms: dict[str, UUID] = {}
+        self.is_postgres = session.get_bind().dialect.name == "postgresql"
+
+    def import_batch(self, batch: list[ParsedItem]) -> None:
+        errors = [item for item in batch if isinstance(item, RecordError)]
+        records = self._attach_overrides([item for item in batch if isinstance(item, ImportRecord)], errors)
+        self._resolve_users(records)
+        self._resolve_rooms(records)
+
+        units = []
+        for record in records:
+            try:
+                units.append(self._expand(record, errors))
+            except ValueError as exc:
+                errors.append(RecordError(record.line, str(exc)))
+
+        for attempt in range(IMPORT_CONFLICT_RETRIES):
+            try:
+                if self.is_postgres:
+                    with self.session.begin_nested():
+                        created, rejected = self._write(units)
+                else:
+                    created, rejected = self._write(units)
+                break
+            except IntegrityError:
+                if attempt == IMPORT_CONFLICT_RETRIES - 1:
+                    raise
+                logger.info("Room booked concurrently during import %s, retrying batch", self.job.id)
+
+        errors.extend(rejected)
+        self.job.records_processed += len(batch)
+        self.job.records_failed += len(errors)
+        self.job.events_created += created
+        room_left = MAX_REPORTED_ERRORS - len(self.job.errors)
+        if errors and room_left > 0:
+            errors.sort(key=lambda error: error.line)
+            # Новый список, чтобы SQLAlchemy заметил изменение JSON-колонки
+            self.job.errors = self.job.errors + [error._asdict() for error in errors[:room_left]]
+
+    def _attach_overrides(self, records: list[ImportRecord], errors: list[RecordError]) -> list[ImportRecord]:
+        series = {record.uid: record for record in records if record.uid and record.rule and not record.recurrence_id}
+        result = []
+        for record in records:
+            if record.recurrence_id is None:
+                result.append(record)
+                continue
+            master = series.get(record.uid)
+            if master is None:
+                errors.append(RecordError(record.line, "Изменённое вхождение (RECURRENCE-ID) без своей серии"))
+            else:
+                master.overrides[record.recurrence_id] = record
+        return result
+
+    def _resolve_users(self, records: list[ImportRecord]) -> None:
+        emails = {email for record in records for email in record.attendees}
+        emails -= self.users.keys() | self.missing_users
+        if not emails:
+            return
+        rows = self.session.execute(
+            sql_select(User.id, func.lower(User.email)).where(func.lower(User.email).in_(emails))
+        ).all()
+        for user_id, email in rows:
+            self.users[email] = user_id
+        # Внешние адреса (не пользователи системы) пропускаются
+        self.missing_users |= emails - self.users.keys()
+
+    def _resolve_rooms(self, records: list[ImportRecord]) -> None:
+        keys = {record.room.lower() for record in records if record.room} - self.rooms.keys()
+        if not keys:
+            return
+        ids = []
+        for key in keys:
+            try:
+                ids.append(UUID(key))
+            except ValueError:
+                pass
+        rows = self.session.execute(
+            sql_select(Room.id, Room.name).where(
+                Room.is_active.is_(True),
+                or_(Room.id.in_(ids), func.lower(Room.name).in_(keys)),
+            )
+        ).all()
+        for room_id, name in rows:
+            self.rooms[str(room_id)] = room_id
+            self.rooms[name.lower()] = room_id
+
+    def _expand(self, record: ImportRecord, errors: list[RecordError]) -> _Unit:
+        room_id = None
+        if record.room:
+            room_id = self.rooms.get(record.room.lower())
+            if room_id is None:
+                raise ValueError(f"Переговорка «{record.room}» не найдена")
+
+        root_id = uuid4()
+        rule = None
+        starts = [(record.starts_at, record.overrides.get(record.starts_at, record))]
+        matched = {record.starts_at}
+        if record.rule:
+            rule = record.rule
+            additional = _occurrence_starts(record, rule)
+            if not rule.count and not rule.until:
+                # Бесконечное правило обрезается, как и при создании серии
+                rule = rule.model_copy(update={"count": len(additional) + 1})
+            for start in additional:
+                override = record.overrides.get(start)
+                if override is not None:
+                    matched.add(start)
+                if start in record.exdates or (override and override.status == "cancelled"):
+                    continue
+                starts.append((start, override or record))
+        for recurrence_id, override in record.overrides.items():
+            if recurrence_id not in matched:
+                errors.append(
+                    RecordError(
+                        override.line,
+                        "Изменённое вхождение (RECURRENCE-ID) не совпадает ни с одним вхождением серии",
+                    )
+                )
+
+        now = datetime.utcnow()
+        duration = record.ends_at - record.starts_at
+        rows, bookings = [], []
+        for index, (start, source) in enumerate(starts):
+            event_id = root_id if index == 0 else uuid4()
+            starts_at = source.starts_at if source is not record else start
+            ends_at = source.ends_at if source is not record else start + duration
+            rows.append(
+                {
+                    "id": event_id,
+                    "calendar_id": self.job.calendar_id,
+                    "room_id": room_id,
+                    "title": source.title,
+                    "description": source.description,
+                    "location": source.location,
+                    "timezone": self.job.timezone,
+                    "starts_at": starts_at,
+                    "ends_at": ends_at,
+                    "all_day": source.all_day,
+                    "status": source.status,
+                    "recurrence_rule": rule.model_dump(mode="json", exclude_none=True) if index == 0 and rule else None,
+                    "recurrence_parent_id": root_id if index else None,
+                    "attachments_size": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            bookings.append(RoomBooking(event_id, room_id, starts_at, ends_at))
+        return _Unit(record, rows, bookings)
+
+    def _write(self, units: list[_Unit]) -> tuple[int, list[RecordError]]:
+        accepted = partition_room_bookings(self.session, [unit.bookings for unit in units])
+        rejected = [
+            RecordError(unit.record.line, "Переговорка занята в это время")
+            for unit, ok in zip(units, accepted)
+            if not ok
+        ]
+        units = [unit for unit, ok in zip(units, accepted) if ok]
+        if not units:
+            return 0, rejected
+
+        creator_id = self.job.user_id
+        event_rows, participant_rows, reservation_rows = [], [], []
+        for unit in units:
+            attendee_ids = {self.users[email] for email in unit.record.attendees if email in self.users}
+            attendee_ids.discard(creator_id)
+            for row in unit.rows:
+                event_rows.append(row)
+                participant_rows.append(
+                    {"event_id": row["id"], "user_id": creator_id, "response_status": "accepted", "added_at": row["created_at"]}
+                )
+                participant_rows.extend(
+                    {"event_id": row["id"], "user_id": user_id, "response_status": "needs_action", "added_at": row["created_at"]}
+                    for user_id in attendee_ids
+                )
+            reservation_rows.extend(booking._asdict() for booking in unit.bookings if booking.room_id is not None)
+
+        self.session.execute(insert(Event), event_rows)
+        self.session.execute(insert(EventParticipant), participant_rows)
+        if reservation_rows:
+            self.session.execute(insert(RoomReservation), reservation_rows)
+        return len(event_rows), rejected
+
+
+def _occurrence_starts(record: ImportRecord, rule: RecurrenceRule) -> list[datetime]:
+    """Starts (naive UTC) of the occurrences after the first, stepped in the zone of DTSTART."""
+    zone = record.zone
+    local_rule = rule
+    if rule.until is not None:
+        until = rule.until if rule.until.tzinfo else rule.until.replace(tzinfo=timezone.utc)
+        local_rule = rule.model_copy(update={"until": until.astimezone(zone).replace(tzinfo=None)})
+    local_start = record.local_start or record.starts_at
+    return [_to_utc(local, zone) for local in generate_recurrence_starts(local_start, local_rule)]
+
+
+# --- ICS ---
+
+
+def parse_ics(lines: Iterable[str], zone: ZoneInfo) -> Iterator[ParsedItem]:
+    """VEVENTs of an iCalendar stream, one record (or error) per component."""
+    props: Optional[list[tuple[str, dict, str]]] = None
+    event_line = 0
+    nested = 0
+    for line_number, line in _unfold(lines):
+        parsed = _split_content_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if props is not None:
+                nested += 1  # VALARM и прочие вложенные компоненты пропускаются
+            elif value.upper() == "VEVENT":
+                props, event_line = [], line_number
+        elif name == "END":
+            if props is None:
+                continue
+            if nested:
+                nested -= 1
+            elif value.upper() == "VEVENT":
+                try:
+                    yield _ics_record(event_line, props, zone)
+                except ValueError as exc:
+                    yield RecordError(event_line, str(exc))
+                props = None
+        elif props is not None and not nested:
+            props.append((name, params, value))
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    current: Optional[str] = None
+    start = 0
+    for number, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield start, current
+        current, start = line, number
+    if current:
+        yield start, current
+
+
+def _split_content_line(line: str) -> Optional[tuple[str, dict, str]]:
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        return None
+    name, *raw_params = head.split(";")
+    params = {}
+    for raw_param in raw_params:
+        key, _, param_value = raw_param.partition("=")
+        params[key.strip().upper()] = param_value.strip().strip('"')
+    return name.strip().upper(), params, value
+
+
+def _ics_text(value: str) -> str:
+    return _ICS_UNESCAPE.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), value).strip()
+
+
+def _ics_datetime(value: str, params: dict, zone: ZoneInfo) -> _Moment:
+    """A DATE or DATE-TIME value (``TZID`` or, for floating time, the import zone)."""
+    value = value.strip()
+    try:
+        if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+            moment = datetime.strptime(value, "%Y%m%d")
+            return _Moment(moment, moment, True, timezone.utc)
+        if value.endswith(("Z", "z")):
+            moment = datetime.strptime(value[:-1], "%Y%m%dT%H%M%S")
+            return _Moment(moment, moment, False, timezone.utc)
+        local = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise ValueError(f"Некорректная дата «{value}»") from None
+    value_zone = _zone(params.get("TZID"), zone)
+    return _Moment(_to_utc(local, value_zone), local, False, value_zone)
+
+
+def _zone(tzid: Optional[str], default: ZoneInfo) -> ZoneInfo:
+    if not tzid:
+        return default
+    try:
+        return ZoneInfo(tzid.strip().lstrip("/"))
+    except (ZoneInfoNotFoundError, ValueError):
+        # Например, имена Windows из Outlook — считаем их часовым поясом импорта
+        return default
+
+
+def _to_utc(local: datetime, zone: ZoneInfo) -> datetime:
+    return local.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _ics_record(line: int, props: list[tuple[str, dict, str]], zone: ZoneInfo) -> ImportRecord:
+    first: dict[str, tuple[dict, str]] = {}
+    exdates: set[datetime] = set()
+    attendees: list[str] = []
+    for name, params, value in props:
+        if name == "EXDATE":
+            for item in value.split(","):
+                exdates.add(_ics_datetime(item, params, zone).utc)
+        elif name == "ATTENDEE":
+            if value.lower().startswith("mailto:"):
+                attendees.append(value[len("mailto:"):].strip().lower())
+        else:
+            first.setdefault(name, (params, value))
+
+    if "DTSTART" not in first:
+        raise ValueError("Нет DTSTART")
+    start = _ics_datetime(first["DTSTART"][1], first["DTSTART"][0], zone)
+    starts_at, all_day = start.utc, start.is_date
+    if "DTEND" in first:
+        ends_at = _ics_datetime(first["DTEND"][1], first["DTEND"][0], zone).utc
+    elif "DURATION" in first:
+        ends_at = starts_at + _ics_duration(first["DURATION"][1])
+    else:
+        ends_at = starts_at + timedelta(days=1) if all_day else starts_at
+    if ends_at < starts_at:
+        raise ValueError("Окончание раньше начала")
+
+    recurrence_id = None
+    if "RECURRENCE-ID" in first:
+        recurrence_id = _ics_datetime(first["RECURRENCE-ID"][1], first["RECURRENCE-ID"][0], zone).utc
+    rule = None
+    if "RRULE" in first and recurrence_id is None:
+        rule = _parse_rrule(first["RRULE"][1], start.local, zone)
+
+    def text(name: str, limit: int) -> Optional[str]:
+        if name not in first:
+            return None
+        return _ics_text(first[name][1])[:limit] or None
+
+    status = first.get("STATUS", ({}, "confirmed"))[1].strip().lower()
+    return ImportRecord(
+        line=line,
+        title=text("SUMMARY", _TITLE_MAX) or "(без названия)",
+        starts_at=starts_at,
+        ends_at=ends_at,
+        local_start=start.local,
+        zone=start.zone,
+        all_day=all_day,
+        description=text("DESCRIPTION", _DESCRIPTION_MAX),
+        location=text("LOCATION", _LOCATION_MAX),
+        status=status if status in _STATUSES else "confirmed",
+        attendees=attendees,
+        rule=rule,
+        exdates=exdates,
+        uid=first["UID"][1].strip() if "UID" in first else None,
+        recurrence_id=recurrence_id,
+    )
+
+
+_DURATION_RE = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def _ics_duration(value: str) -> timedelta:
+    match = _DURATION_RE.match(value.strip().upper())
+    if not match:
+        raise ValueError(f"Некорректная длительность «{value}»")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+    return -duration if sign == "-" else duration
+
+
+def _parse_rrule(value: str, local_start: datetime, zone: ZoneInfo) -> RecurrenceRule:
+    """RRULE with the subset the planner supports; BY* parts are allowed only when they repeat DTSTART."""
+    parts = {}
+    for part in value.strip().upper().split(";"):
+        key, _, part_value = part.partition("=")
+        if key:
+            parts[key] = part_value
+    frequency = parts.pop("FREQ", "").lower()
+    parts.pop("WKST", None)
+    # Outlook и Google дублируют день DTSTART в BYDAY/BYMONTHDAY — это то же правило
+    if parts.get("BYDAY") == _WEEKDAYS[local_start.weekday()] and frequency == "weekly":
+        parts.pop("BYDAY")
+    if parts.get("BYMONTHDAY") == str(local_start.day) and frequency == "monthly":
+        parts.pop("BYMONTHDAY")
+    unsupported = set(parts) - {"INTERVAL", "COUNT", "UNTIL"}
+    if frequency not in ("daily", "weekly", "monthly") or unsupported:
+        raise ValueError(f"Правило повторения «{value}» не поддерживается")
+
+    until = None
+    if "UNTIL" in parts:
+        until_moment = _ics_datetime(parts["UNTIL"], {}, zone)
+        until = until_moment.utc
+        if until_moment.is_date:
+            # UNTIL-дата включает весь этот день
+            until += timedelta(days=1) - timedelta(seconds=1)
+    try:
+        return RecurrenceRule(
+            frequency=frequency,
+            interval=int(parts.get("INTERVAL", 1)),
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=until,
+        )
+    except (ValidationError, ValueError):
+        raise ValueError(f"Некорректное правило повторения «{value}»") from None
+
+
+# --- CSV ---
+
+
+def parse_csv(lines: Iterable[str], zone: ZoneInfo) -> Iterator[ParsedItem]:
+    """Rows of a CSV file with a header line (delimiter ``,`` or ``;``)."""
+    lines = iter(lines)
+    header = next(lines, "")
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    reader = csv.reader(_prepend(header, lines), delimiter=delimiter)
+    columns = [column.strip().lower() for column in next(reader, [])]
+    missing = {"title", "starts_at"} - set(columns)
+    if missing:
+        yield RecordError(1, f"Нет обязательных колонок: {', '.join(sorted(missing))}")
+        return
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        row = {column: value.strip() for column, value in zip(columns, values)}
+        try:
+            yield _csv_record(reader.line_num, row, zone)
+        except ValueError as exc:
+            yield RecordError(reader.line_num, str(exc))
+
+
+def _prepend(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def _csv_datetime(value: str, zone: ZoneInfo) -> _Moment:
+    """An ISO 8601 date or datetime (without an offset — in the import zone)."""
+    try:
+        if len(value) == 10:
+            moment = datetime.combine(date.fromisoformat(value), datetime.min.time())
+            return _Moment(moment, moment, True, timezone.utc)
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Некорректная дата «{value}»") from None
+    if moment.tzinfo is not None:
+        utc = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return _Moment(utc, moment.replace(tzinfo=None), False, moment.tzinfo)
+    return _Moment(_to_utc(moment, zone), moment, False, zone)
+
+
+def _csv_record(line: int, row: dict[str, str], zone: ZoneInfo) -> ImportRecord:
+    if not row.get("title"):
+        raise ValueError("Пустое название")
+    if not row.get("starts_at"):
+        raise ValueError("Нет даты начала")
+    start = _csv_datetime(row["starts_at"], zone)
+    starts_at = start.utc
+    all_day = row.get("all_day", "").lower() in _TRUE_VALUES or (start.is_date and not row.get("all_day"))
+    if row.get("ends_at"):
+        ends_at = _csv_datetime(row["ends_at"], zone).utc
+    elif all_day:
+        ends_at = starts_at + timedelta(days=1)
+    else:
+        raise ValueError("Нет даты окончания")
+    if ends_at < starts_at:
+        raise ValueError("Окончание раньше начала")
+
+    status = (row.get("status") or "confirmed").lower()
+    attendees = [email.strip().lower() for email in re.split(r"[;,]", row.get("attendees", "")) if email.strip()]
+    return ImportRecord(
+        line=line,
+        title=row["title"][:_TITLE_MAX],
+        starts_at=starts_at,
+        ends_at=ends_at,
+        local_start=start.local,
+        zone=start.zone,
+        all_day=all_day,
+        description=row.get("description", "")[:_DESCRIPTION_MAX] or None,
+        location=row.get("location", "")[:_LOCATION_MAX] or None,
+        status=status if status in _STATUSES else "confirmed",
+        room=row.get("room") or None,
+        attendees=attendees,
+        rule=_parse_rrule(row["rrule"].removeprefix("RRULE:"), start.local, zone) if row.get("rrule") else None,
+    )
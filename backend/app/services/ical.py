@@ -0,0 +1,228 @@
+"""
+Экспорт событий в iCalendar (RFC 5545).
+
+События читаются из БД порциями (``yield_per``) и сразу превращаются в текст,
+который отдаётся кусками — выгрузка календаря на десятки тысяч событий не
+собирается в памяти целиком.
+
+Серия выгружается одним ``VEVENT`` с ``RRULE`` по ``recurrence_rule`` первого
+события. Дочерние события сверяются с вхождениями, которые даёт правило:
+отсутствующие вхождения попадают в ``EXDATE``, изменённые (название, время
+окончания, место и т. п.) — отдельным ``VEVENT`` с ``RECURRENCE-ID``, а
+перенесённые на другое время — самостоятельными событиями. Если правило не
+выражается через ``RRULE`` без потерь (ежемесячно с 29-го числа и позже:
+приложение сдвигает такие вхождения на конец месяца, а RFC 5545 — пропускает
+месяц), вхождения выгружаются по одному.
+
+Все времена хранятся как naive UTC и выгружаются в UTC (``...Z``).
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import func
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import Event
+from app.schemas import RecurrenceRule
+from app.services.recurrence import MAX_RECURRENCE_OCCURRENCES, generate_recurrence_starts
+
+ICAL_MEDIA_TYPE = "text/calendar; charset=utf-8"
+ICAL_FETCH_BATCH = 500
+# Размер куска ответа: меньше — больше мелких записей в сокет
+ICAL_CHUNK_SIZE = 64 * 1024
+PRODID = "-//Planner//Calendar Export//RU"
+
+_STATUSES = {"confirmed": "CONFIRMED", "tentative": "TENTATIVE", "cancelled": "CANCELLED"}
+_FREQUENCIES = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY", "yearly": "YEARLY"}
+# Поля, по которым вхождение серии считается изменённым относительно первого события
+_OVERRIDE_FIELDS = ("title", "description", "location", "status", "all_day")
+
+
+def series_order(statement):
+    """Order events so that each series comes together, its first event first."""
+    series_key = func.coalesce(Event.recurrence_parent_id, Event.id)
+    return statement.order_by(series_key, Event.recurrence_parent_id.is_not(None), Event.starts_at)
+
+
+def stream_ics(statement, *, name: Optional[str] = None) -> Iterator[str]:
+    """:func:`iter_ics` with its own session (the request session is closed before the body is sent)."""
+    with Session(engine) as session:
+        yield from iter_ics(session, statement, name=name)
+
+
+def iter_ics(session: Session, statement, *, name: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream a VCALENDAR for events selected by ``statement``.
+
+    ``statement`` must select ``Event`` rows ordered with :func:`series_order`.
+    """
+    header = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH"]
+    if name:
+        header.append(f"X-WR-CALNAME:{_escape(name)}")
+    buffer = [_lines(header)]
+    size = len(buffer[0])
+
+    events = session.exec(statement.execution_options(yield_per=ICAL_FETCH_BATCH))
+    for _, series in groupby(events, key=lambda event: event.recurrence_parent_id or event.id):
+        for component in _series_components(list(series)):
+            buffer.append(component)
+            size += len(component)
+        if size >= ICAL_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+
+    buffer.append(_lines(["END:VCALENDAR"]))
+    yield "".join(buffer)
+
+
+def export_etag(*parts: object) -> str:
+    """Weak ETag from values that change whenever the exported content does."""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _series_components(events: Sequence[Event]) -> Iterator[str]:
+    root = events[0]
+    children = events[1:]
+    if root.recurrence_parent_id is not None or not root.recurrence_rule:
+        # Первого события серии нет в выгрузке (например, пользователь его отклонил)
+        for event in events:
+            yield _vevent(event)
+        return
+
+    rule = RecurrenceRule.model_validate(root.recurrence_rule)
+    if not _rrule_compatible(root.starts_at, rule):
+        for event in events:
+            yield _vevent(event)
+        return
+
+    additional = generate_recurrence_starts(root.starts_at, rule)
+    expected = set(additional)
+    children_by_start = {child.starts_at: child for child in children if child.starts_at in expected}
+    exdates = [start for start in additional if start not in children_by_start]
+
+    yield _vevent(
+        root,
+        rrule=_rrule(rule, occurrences=len(additional) + 1),
+        exdates=exdates,
+    )
+    for child in children:
+        if child.starts_at not in expected or children_by_start[child.starts_at] is not child:
+            yield _vevent(child)
+        elif _differs(child, root):
+            yield _vevent(child, uid=str(root.id), recurrence_id=child.starts_at)
+
+
+def _rrule_compatible(start: datetime, rule: RecurrenceRule) -> bool:
+    if rule.frequency not in _FREQUENCIES:
+        return False
+    if rule.frequency in ("monthly", "yearly") and start.day > 28:
+        return False
+    return True
+
+
+def _rrule(rule: RecurrenceRule, *, occurrences: int) -> str:
+    parts = [f"FREQ={_FREQUENCIES[rule.frequency]}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.until and not rule.count and occurrences <= MAX_RECURRENCE_OCCURRENCES:
+        parts.append(f"UNTIL={_format_datetime(rule.until.replace(tzinfo=None))}")
+    else:
+        # Серия обрезана лимитом вхождений (или задана числом) — фиксируем фактическое число
+        parts.append(f"COUNT={occurrences}")
+    return ";".join(parts)
+
+
+def _differs(child: Event, root: Event) -> bool:
+    if child.ends_at - child.starts_at != root.ends_at - root.starts_at:
+        return True
+    return any(getattr(child, field) != getattr(root, field) for field in _OVERRIDE_FIELDS)
+
+
+def _vevent(
+    event: Event,
+    *,
+    uid: Optional[str] = None,
+    rrule: Optional[str] = None,
+    exdates: Iterable[datetime] = (),
+    recurrence_id: Optional[datetime] = None,
+) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid or event.id}",
+        f"DTSTAMP:{_format_datetime(event.updated_at)}",
+        f"CREATED:{_format_datetime(event.created_at)}",
+        f"LAST-MODIFIED:{_format_datetime(event.updated_at)}",
+    ]
+    if event.all_day:
+        end_date = event.ends_at.date()
+        if event.ends_at.time() != datetime.min.time() or end_date <= event.starts_at.date():
+            end_date += timedelta(days=1)
+        lines.append(f"DTSTART;VALUE=DATE:{event.starts_at:%Y%m%d}")
+        lines.append(f"DTEND;VALUE=DATE:{end_date:%Y%m%d}")
+    else:
+        lines.append(f"DTSTART:{_format_datetime(event.starts_at)}")
+        lines.append(f"DTEND:{_format_datetime(event.ends_at)}")
+    if recurrence_id is not None:
+        if event.all_day:
+            lines.append(f"RECURRENCE-ID;VALUE=DATE:{recurrence_id:%Y%m%d}")
+        else:
+            lines.append(f"RECURRENCE-ID:{_format_datetime(recurrence_id)}")
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    exdates = list(exdates)
+    if exdates:
+        if event.all_day:
+            lines.append("EXDATE;VALUE=DATE:" + ",".join(f"{start:%Y%m%d}" for start in exdates))
+        else:
+            lines.append("EXDATE:" + ",".join(map(_format_datetime, exdates)))
+    lines.append(f"SUMMARY:{_escape(event.title)}")
+    if event.description:
+        lines.append(f"DESCRIPTION:{_escape(event.description)}")
+    if event.location:
+        lines.append(f"LOCATION:{_escape(event.location)}")
+    status = _STATUSES.get((event.status or "").lower())
+    if status:
+        lines.append(f"STATUS:{status}")
+    lines.append("END:VEVENT")
+    return _lines(lines)
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _lines(lines: Iterable[str]) -> str:
+    return "".join(_fold(line) for line in lines)
+
+
+def _fold(line: str) -> str:
+    """CRLF-terminated content line folded at 75 octets without splitting UTF-8 characters."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    start, limit = 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        # Строки продолжения начинаются с пробела, он тоже входит в 75 октетов
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
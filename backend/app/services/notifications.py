@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime, timedelta
 from uuid import UUID
 
@@ -7,6 +8,8 @@ from sqlmodel import Session
 
 from app.models import Event, Notification, User
 
+logger = logging.getLogger(__name__)
+
 
 def create_notification(
     session: Session,
@@ -44,7 +47,9 @@ def notify_event_invited(
         message=f"Вас пригласили на встречу «{event.title}»{inviter_text}",
         event_id=event.id,
     )
-    print(f"[Notification] Created invitation notification {notification.id} for user {user_id} about event {event.id}")
+    logger.debug(
+        "Created invitation notification %s for user %s about event %s", notification.id, user_id, event.id
+    )
 
 
 def notify_event_updated(
@@ -0,0 +1,100 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Курсор — это непрозрачная base64-строка с последним значением колонки сортировки
+и id последней записи страницы. Следующая страница выбирается условием
+``(sort_col, id) > (value, id)`` вместо OFFSET, поэтому глубина страницы
+не влияет на стоимость запроса.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import operator
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, and_, or_, text
+from sqlalchemy.exc import CompileError, SQLAlchemyError
+from sqlmodel import Session
+
+
+def encode_cursor(value: Any, last_id: UUID) -> str:
+    """Encode the sort value and id of the last row into an opaque cursor."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"v": value, "id": str(last_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, column) -> Tuple[Any, UUID]:
+    """Decode a cursor produced by ``encode_cursor`` for the given sort column."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        last_id = UUID(payload["id"])
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from None
+    return value, last_id
+
+
+def keyset_order_by(column, id_column, descending: bool) -> list:
+    """
+    ORDER BY для keyset-пагинации. NULL всегда в конце (и в SQLite, и в Postgres),
+    id используется как уникальный tie-breaker.
+    """
+    if descending:
+        return [column.desc().nulls_last(), id_column.desc()]
+    return [column.asc().nulls_last(), id_column.asc()]
+
+
+def keyset_condition(column, id_column, value: Any, last_id: UUID, descending: bool):
+    """WHERE-условие «строки после курсора» для порядка из ``keyset_order_by``."""
+    cmp = operator.lt if descending else operator.gt
+    nullable = getattr(column, "nullable", True)
+
+    if value is None:
+        # Курсор уже в хвосте NULL-значений: дальше идут только NULL с большим/меньшим id
+        return and_(column.is_(None), cmp(id_column, last_id))
+
+    condition = or_(
+        cmp(column, value),
+        and_(column == value, cmp(id_column, last_id)),
+    )
+    if nullable:
+        condition = or_(condition, column.is_(None))
+    return condition
+
+
+def estimate_row_count(session: Session, statement) -> Optional[int]:
+    """
+    Approximate row count from the Postgres planner (EXPLAIN), without executing the query.
+    Returns None for other dialects, where the caller should fall back to an exact count.
+    """
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        compiled = statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+    except CompileError:
+        # Не все типы параметров рендерятся в литералы — тогда считаем точно
+        return None
+    try:
+        # Ошибка EXPLAIN откатывает только точку сохранения, а не транзакцию запроса
+        with session.begin_nested():
+            plan = session.connection().execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    except SQLAlchemyError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (LookupError, TypeError, ValueError):
+        return None
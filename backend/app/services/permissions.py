@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import Iterable
 from uuid import UUID
 
@@ -9,6 +10,8 @@ from sqlmodel import Session
 
 from app.models import Calendar, CalendarMember, User
 
+logger = logging.getLogger(__name__)
+
 
 def calendar_access_condition(user_id: UUID):
     member_subquery = (
@@ -69,19 +72,17 @@ def get_user_calendar_role(
         
         # Убеждаемся, что membership это объект CalendarMember
         if not hasattr(membership, 'role'):
-            print(f"[WARNING] Membership object doesn't have 'role' attribute: {type(membership)}")
+            logger.warning("Membership object doesn't have 'role' attribute: %s", type(membership))
             return None
         
         role = getattr(membership, 'role', None)
         if role is None:
-            print(f"[WARNING] Membership role is None for calendar {calendar.id}, user {user.id}")
+            logger.warning("Membership role is None for calendar %s, user %s", calendar.id, user.id)
             return None
         
         return role
-    except Exception as e:
-        import traceback
-        print(f"[ERROR] Error in get_user_calendar_role: {str(e)}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Error in get_user_calendar_role")
         raise
 
 
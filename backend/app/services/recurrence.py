@@ -0,0 +1,58 @@
+"""
+Разворачивание правил повторения событий.
+
+Серия хранится как первое событие с ``recurrence_rule`` и дочерние события
+(``recurrence_parent_id``) на каждое следующее вхождение. Здесь считаются
+начала этих вхождений — и при создании серии, и при экспорте в iCalendar,
+где по ним восстанавливается, какие вхождения удалены или изменены.
+"""
+from __future__ import annotations
+
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import List
+
+from app.schemas import RecurrenceRule
+
+MAX_RECURRENCE_OCCURRENCES = 180
+
+
+def add_months(base: datetime, months: int) -> datetime:
+    month_index = base.month - 1 + months
+    year = base.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(base.day, monthrange(year, month)[1])
+    return base.replace(year=year, month=month, day=day)
+
+
+def advance_recurrence(start: datetime, rule: RecurrenceRule) -> datetime:
+    if rule.frequency == "daily":
+        return start + timedelta(days=rule.interval)
+    elif rule.frequency == "weekly":
+        return start + timedelta(weeks=rule.interval)
+    elif rule.frequency == "monthly":
+        return add_months(start, rule.interval)
+    elif rule.frequency == "yearly":
+        return add_months(start, rule.interval * 12)
+    return start
+
+
+def generate_recurrence_starts(
+    base_start: datetime, rule: RecurrenceRule
+) -> List[datetime]:
+    """Starts of the occurrences after ``base_start`` (at most ``MAX_RECURRENCE_OCCURRENCES``)."""
+    additional: List[datetime] = []
+    current = base_start
+    until = rule.until.replace(tzinfo=None) if rule.until else None
+
+    while len(additional) < MAX_RECURRENCE_OCCURRENCES:
+        current = advance_recurrence(current, rule)
+        if until and current > until:
+            break
+        if rule.count and len(additional) >= rule.count - 1:
+            break
+        additional.append(current)
+        if not rule.count and until is None and len(additional) >= MAX_RECURRENCE_OCCURRENCES:
+            break
+
+    return additional
@@ -13,6 +13,7 @@ import redis.asyncio as aioredis
 from redis.asyncio.client import PubSub
 
 from app.core.config import settings
+from app.core.metrics import REDIS_PUBSUB_MESSAGES
 from app.services.websocket_manager import manager
 
 logger = logging.getLogger(__name__)
@@ -45,7 +46,7 @@ class RedisPubSubService:
             self._listener_task = asyncio.create_task(self._listen())
             
         except Exception as e:
-            logger.error(f"Failed to connect to Redis Pub/Sub: {e}")
+            logger.error("Failed to connect to Redis Pub/Sub: %s", e)
             raise
 
     async def disconnect(self):
@@ -73,6 +74,7 @@ class RedisPubSubService:
         try:
             async for message in self.pubsub.listen():
                 if message["type"] == "message":
+                    REDIS_PUBSUB_MESSAGES.labels("notifications", "received").inc()
                     try:
                         data = json.loads(message["data"])
                         user_id = UUID(data.get("user_id"))
@@ -86,15 +88,15 @@ class RedisPubSubService:
                             user_id=user_id
                         )
                         
-                        logger.info(f"Notification broadcasted to user {user_id} via WebSocket")
+                        logger.info("Notification broadcasted to user %s via WebSocket", user_id)
                         
                     except Exception as e:
-                        logger.error(f"Error processing Redis message: {e}", exc_info=True)
+                        logger.error("Error processing Redis message: %s", e, exc_info=True)
         
         except asyncio.CancelledError:
             logger.info("Redis Pub/Sub listener cancelled")
         except Exception as e:
-            logger.error(f"Redis Pub/Sub listener error: {e}", exc_info=True)
+            logger.error("Redis Pub/Sub listener error: %s", e, exc_info=True)
 
     async def publish_notification(self, user_id: UUID, notification_data: dict):
         """Publish notification to Redis channel."""
@@ -108,9 +110,10 @@ class RedisPubSubService:
                 **notification_data
             }
             await self.redis.publish("notifications", json.dumps(message))
-            logger.debug(f"Published notification to Redis for user {user_id}")
+            REDIS_PUBSUB_MESSAGES.labels("notifications", "published").inc()
+            logger.debug("Published notification to Redis for user %s", user_id)
         except Exception as e:
-            logger.error(f"Error publishing to Redis: {e}")
+            logger.error("Error publishing to Redis: %s", e)
 
 
 # Global instance
@@ -0,0 +1,192 @@
+"""
+Бронирование переговорок.
+
+Занятость переговорки хранится в ``room_reservations`` (строка на событие),
+пересечения запрещены на уровне хранилища, а не предварительным поиском по
+``events``:
+
+- PostgreSQL — ограничение исключения ``EXCLUDE USING gist`` по
+  ``(room_id, tsrange(starts_at, ends_at))``: бронирование — одна вставка,
+  которая при пересечении сразу падает с ``exclusion_violation``;
+- SQLite и прочие — строка ``room_locks`` на переговорку: её обновление берёт
+  блокировку записи (как ``BEGIN IMMEDIATE``), поэтому проверка пересечений по
+  ``room_reservations`` и вставка выполняются без гонок.
+
+Текст ошибки (название мешающего события) ищется только после отказа.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterable, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, update
+from sqlalchemy import select as sql_select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete
+
+from app.models import Event, RoomLock, RoomReservation
+from app.services.conflicts import find_overlap
+
+_STARTS_AT = attrgetter("starts_at")
+_ENDS_AT = attrgetter("ends_at")
+
+
+class RoomBooking(NamedTuple):
+    """Requested time range of an event in a room (``room_id=None`` frees the room)."""
+
+    event_id: UUID
+    room_id: Optional[UUID]
+    starts_at: datetime
+    ends_at: datetime
+
+
+def release_rooms(session: Session, event_ids: Iterable[UUID]) -> None:
+    """Drop room reservations of the events (before deleting them). The caller commits."""
+    event_ids = list(event_ids)
+    if event_ids:
+        session.exec(delete(RoomReservation).where(RoomReservation.event_id.in_(event_ids)))
+
+
+def book_rooms(session: Session, bookings: Iterable[RoomBooking]) -> None:
+    """
+    Replace reservations of the given events with ``bookings``; raise 409 on overlap.
+
+    Старые брони этих событий снимаются до вставки, поэтому сдвиг серии или
+    изменение времени не конфликтует само с собой. The caller commits.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return
+    release_rooms(session, {booking.event_id for booking in bookings})
+    booked = [booking for booking in bookings if booking.room_id is not None]
+    if not booked:
+        return
+
+    by_room: dict[UUID, list[RoomBooking]] = defaultdict(list)
+    for booking in booked:
+        by_room[booking.room_id].append(booking)
+    for room_bookings in by_room.values():
+        if find_overlap(room_bookings, (), start=_STARTS_AT, end=_ENDS_AT):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Вхождения серии пересекаются друг с другом в одной переговорке.",
+            )
+
+    rows = [booking._asdict() for booking in booked]
+    if session.get_bind().dialect.name == "postgresql":
+        try:
+            with session.begin_nested():
+                session.execute(insert(RoomReservation), rows)
+        except IntegrityError:
+            _raise_conflict(session, by_room)
+            raise
+        return
+
+    _lock_rooms(session, sorted(by_room))
+    _raise_conflict(session, by_room)
+    session.execute(insert(RoomReservation), rows)
+
+
+def partition_room_bookings(session: Session, units: Sequence[Sequence[RoomBooking]]) -> list[bool]:
+    """
+    For each unit (bookings of one event or a whole series) tell whether it can be booked.
+
+    Для массового импорта: вместо 409 на первый конфликт — решение по каждой
+    единице. Занятость переговорок читается одним запросом на пачку, единицы
+    проверяются по порядку, и принятые занимают время для следующих (двойная
+    бронь внутри файла тоже отклоняется). Вставку броней делает вызывающий —
+    на PostgreSQL конкурентная бронь между проверкой и вставкой даст
+    ``IntegrityError``, и пачку нужно повторить.
+    """
+    rooms = sorted({booking.room_id for unit in units for booking in unit if booking.room_id is not None})
+    if not rooms:
+        return [True] * len(units)
+    if session.get_bind().dialect.name != "postgresql":
+        _lock_rooms(session, rooms)
+
+    booked = [booking for unit in units for booking in unit if booking.room_id is not None]
+    taken = session.execute(
+        sql_select(RoomReservation.room_id, RoomReservation.starts_at, RoomReservation.ends_at)
+        .where(
+            RoomReservation.room_id.in_(rooms),
+            RoomReservation.starts_at < max(booking.ends_at for booking in booked),
+            RoomReservation.ends_at > min(booking.starts_at for booking in booked),
+        )
+        .order_by(RoomReservation.room_id, RoomReservation.starts_at)
+    ).all()
+    # Интервалы одной переговорки не пересекаются, поэтому отсортированы и по началу, и по концу
+    starts: dict[UUID, list[datetime]] = defaultdict(list)
+    ends: dict[UUID, list[datetime]] = defaultdict(list)
+    for row in taken:
+        starts[row.room_id].append(row.starts_at)
+        ends[row.room_id].append(row.ends_at)
+
+    def is_free(booking: RoomBooking) -> bool:
+        index = bisect_left(starts[booking.room_id], booking.ends_at)
+        return index == 0 or ends[booking.room_id][index - 1] <= booking.starts_at
+
+    accepted = []
+    for unit in units:
+        unit_booked = [booking for booking in unit if booking.room_id is not None]
+        by_room: dict[UUID, list[RoomBooking]] = defaultdict(list)
+        for booking in unit_booked:
+            by_room[booking.room_id].append(booking)
+        ok = all(map(is_free, unit_booked)) and not any(
+            find_overlap(room_bookings, (), start=_STARTS_AT, end=_ENDS_AT) for room_bookings in by_room.values()
+        )
+        if ok:
+            for booking in unit_booked:
+                index = bisect_left(starts[booking.room_id], booking.starts_at)
+                starts[booking.room_id].insert(index, booking.starts_at)
+                ends[booking.room_id].insert(index, booking.ends_at)
+        accepted.append(ok)
+    return accepted
+
+
+def _lock_rooms(session: Session, room_ids: list[UUID]) -> None:
+    # Порядок по room_id исключает взаимные блокировки при брони нескольких переговорок
+    for room_id in room_ids:
+        result = session.execute(
+            update(RoomLock)
+            .where(RoomLock.room_id == room_id)
+            .values(version=RoomLock.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            session.execute(insert(RoomLock).values(room_id=room_id, version=1))
+
+
+def _raise_conflict(session: Session, by_room: dict[UUID, list[RoomBooking]]) -> None:
+    """Raise 409 naming the event that already holds one of the requested ranges."""
+    range_start = min(booking.starts_at for bookings in by_room.values() for booking in bookings)
+    range_end = max(booking.ends_at for bookings in by_room.values() for booking in bookings)
+    taken = session.execute(
+        sql_select(
+            Event.title,
+            RoomReservation.room_id,
+            RoomReservation.starts_at,
+            RoomReservation.ends_at,
+        )
+        .join(Event, Event.id == RoomReservation.event_id)
+        .where(
+            RoomReservation.room_id.in_(list(by_room)),
+            RoomReservation.starts_at < range_end,
+            RoomReservation.ends_at > range_start,
+        )
+    ).all()
+    taken_by_room = defaultdict(list)
+    for row in taken:
+        taken_by_room[row.room_id].append(row)
+    for room_id, bookings in by_room.items():
+        overlap = find_overlap(bookings, taken_by_room.get(room_id, ()), start=_STARTS_AT, end=_ENDS_AT)
+        if overlap:
+            _, other = overlap
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Переговорка занята событием «{other.title}».",
+            )
@@ -0,0 +1,100 @@
+"""
+Потоковое сохранение загруженных файлов.
+
+Файл копируется блоками фиксированного размера во временный файл в целевой
+директории; копирование идёт в пуле потоков, чтобы не блокировать event loop.
+Лимит размера проверяется по ходу копирования, SHA-256 считается на лету.
+В итоговое место файл попадает атомарным ``os.replace``, поэтому читатели
+никогда не видят недописанный файл.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+CHUNK_SIZE = 1024 * 1024  # 1 МБ
+TEMP_PREFIX = ".upload-"
+
+
+@dataclass
+class StoredFile:
+    """Uploaded content staged in a temporary file."""
+
+    temp_path: Path
+    size: int
+    sha256: str
+
+    def commit(self, destination: Path) -> Path:
+        """Atomically move the staged file to ``destination``."""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.temp_path, destination)
+        return destination
+
+    def discard(self) -> None:
+        """Remove the staged file if it is still there."""
+        try:
+            self.temp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File size exceeds maximum allowed size of {max_size / (1024 * 1024):.0f} MB",
+    )
+
+
+def _copy_to_temp(source: BinaryIO, directory: Path, max_size: Optional[int]) -> StoredFile:
+    directory.mkdir(parents=True, exist_ok=True)
+    # Временный файл в той же директории — тогда os.replace атомарен (одна ФС)
+    fd, temp_name = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+    temp_path = Path(temp_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise _file_too_large(max_size)
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return StoredFile(temp_path=temp_path, size=size, sha256=digest.hexdigest())
+
+
+async def stage_upload(file: UploadFile, directory: Path, max_size: Optional[int] = None) -> StoredFile:
+    """
+    Stream an upload into a temporary file inside ``directory``.
+
+    Raises HTTP 400 as soon as more than ``max_size`` bytes have been read.
+    The caller either ``commit()``s the result or ``discard()``s it.
+    """
+    if max_size is not None and file.size is not None and file.size > max_size:
+        raise _file_too_large(max_size)
+    await file.seek(0)
+    return await run_in_threadpool(_copy_to_temp, file.file, directory, max_size)
+
+
+async def save_upload(
+    file: UploadFile,
+    destination: Path,
+    max_size: Optional[int] = None,
+) -> StoredFile:
+    """Stream an upload straight to ``destination`` (staged next to it, then renamed)."""
+    stored = await stage_upload(file, destination.parent, max_size)
+    await run_in_threadpool(stored.commit, destination)
+    return stored
@@ -0,0 +1,168 @@
+"""
+SLA тикетов.
+
+Для каждого открытого тикета в ``Ticket.sla_due_at`` хранится ближайший дедлайн
+(первый ответ или решение). Колонка индексирована и очищается, когда тикет закрыт
+или SLA уже нарушен, поэтому индекс содержит только тикеты, которые ещё могут
+нарушить SLA, а периодической задаче достаточно range-скана ``sla_due_at <= now``.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Notification, Ticket, TicketCategory, User
+from app.models.ticket import TicketStatus
+
+# Статусы, в которых SLA больше не отслеживается
+SLA_STOPPED_STATUSES = (TicketStatus.RESOLVED, TicketStatus.CLOSED)
+
+
+def _hours(category: Optional[TicketCategory], attr: str, defaults: dict, priority: str) -> Optional[float]:
+    if category is not None and getattr(category, attr):
+        return getattr(category, attr)
+    return defaults.get(priority)
+
+
+def compute_sla_due_at(ticket: Ticket, category: Optional[TicketCategory] = None) -> Optional[datetime]:
+    """Return the nearest SLA deadline of a ticket, or None if SLA is not tracked for it."""
+    if ticket.is_deleted or ticket.sla_breach or ticket.status in SLA_STOPPED_STATUSES:
+        return None
+
+    deadlines = []
+    if ticket.due_date:
+        due_date = ticket.due_date
+        # Дедлайны сравниваются как naive UTC (значение могло прийти из запроса со смещением)
+        if due_date.tzinfo is not None:
+            due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+        deadlines.append(due_date)
+    else:
+        resolution_hours = _hours(
+            category, "sla_resolution_hours", settings.TICKET_SLA_RESOLUTION_HOURS, ticket.priority
+        )
+        if resolution_hours:
+            deadlines.append(ticket.created_at + timedelta(hours=resolution_hours))
+
+    if ticket.first_response_at is None:
+        response_hours = _hours(
+            category, "sla_response_hours", settings.TICKET_SLA_RESPONSE_HOURS, ticket.priority
+        )
+        if response_hours:
+            deadlines.append(ticket.created_at + timedelta(hours=response_hours))
+
+    return min(deadlines) if deadlines else None
+
+
+def refresh_ticket_sla(session: Session, ticket: Ticket) -> None:
+    """Recompute ``sla_due_at`` for a single ticket (the caller commits)."""
+    category = session.get(TicketCategory, ticket.category_id) if ticket.category_id else None
+    ticket.sla_due_at = compute_sla_due_at(ticket, category)
+    session.add(ticket)
+
+
+def refresh_sla_deadlines(session: Session, ticket_ids: Iterable[UUID]) -> int:
+    """
+    Recompute ``sla_due_at`` for a set of tickets with one SELECT per table
+    and one executemany UPDATE (the caller commits).
+    """
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return 0
+
+    tickets = session.exec(select(Ticket).where(Ticket.id.in_(ticket_ids))).all()
+    category_ids = {ticket.category_id for ticket in tickets if ticket.category_id}
+    categories = {}
+    if category_ids:
+        categories = {
+            category.id: category
+            for category in session.exec(
+                select(TicketCategory).where(TicketCategory.id.in_(category_ids))
+            ).all()
+        }
+
+    rows = [
+        {"id": ticket.id, "sla_due_at": compute_sla_due_at(ticket, categories.get(ticket.category_id))}
+        for ticket in tickets
+    ]
+    if rows:
+        session.execute(update(Ticket), rows)
+    return len(rows)
+
+
+def evaluate_sla_breaches(
+    session: Session,
+    now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+) -> dict[str, int]:
+    """
+    Flip ``sla_breach`` for tickets whose SLA deadline has passed since the previous run.
+
+    Works in batches over the ``sla_due_at`` index: each batch is one UPDATE ... RETURNING,
+    one multi-row notification INSERT and one commit.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.TICKET_SLA_BATCH_SIZE
+
+    breached_total = 0
+    notifications_total = 0
+    staff_ids: Optional[list[UUID]] = None
+
+    while True:
+        due_ids = session.exec(
+            select(Ticket.id)
+            .where(Ticket.sla_due_at <= now)
+            .order_by(Ticket.sla_due_at)
+            .limit(batch_size)
+        ).all()
+        if not due_ids:
+            break
+
+        breached = session.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(due_ids), Ticket.sla_due_at <= now)
+            .values(sla_breach=True, sla_due_at=None)
+            .returning(Ticket.id, Ticket.title, Ticket.assigned_to, Ticket.is_deleted)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        notification_rows = []
+        for ticket_id, title, assigned_to, is_deleted in breached:
+            if is_deleted:
+                continue
+            if assigned_to:
+                recipients = [assigned_to]
+            else:
+                # Unassigned tickets: notify all active staff (loaded once per run)
+                if staff_ids is None:
+                    staff_ids = list(session.exec(
+                        select(User.id).where(User.role.in_(["admin", "it"]), User.is_active == True)
+                    ).all())
+                recipients = staff_ids
+            for user_id in recipients:
+                notification_rows.append(Notification(
+                    user_id=user_id,
+                    ticket_id=ticket_id,
+                    type="ticket_sla_breach",
+                    title="Нарушен SLA",
+                    message=f"Истёк срок SLA по тикету «{title}»",
+                    created_at=now,
+                ).model_dump())
+
+        if notification_rows:
+            session.execute(insert(Notification), notification_rows)
+        session.commit()
+
+        breached_total += len(breached)
+        notifications_total += len(notification_rows)
+        if len(due_ids) < batch_size:
+            break
+
+    return {
+        "tickets_breached": breached_total,
+        "notifications_created": notifications_total,
+    }
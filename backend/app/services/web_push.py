@@ -49,7 +49,7 @@ def send_web_push_to_user(
         subscriptions = session.exec(statement).all()
         
         if not subscriptions:
-            logger.info(f"No active push subscriptions for user {user_id}")
+            logger.info("No active push subscriptions for user %s", user_id)
             return 0
         
         # Prepare notification data
@@ -86,19 +86,19 @@ def send_web_push_to_user(
                 session.add(subscription)
                 sent_count += 1
                 
-                logger.info(f"Web push sent to user {user_id}, endpoint: {subscription.endpoint[:50]}...")
+                logger.info("Web push sent to user %s, endpoint: %s...", user_id, subscription.endpoint[:50])
                 
             except WebPushException as e:
-                logger.error(f"Failed to send web push to user {user_id}: {e}")
+                logger.error("Failed to send web push to user %s: %s", user_id, e)
                 
                 # If subscription is expired or invalid, deactivate it
                 if e.response and e.response.status_code in [404, 410]:
-                    logger.info(f"Deactivating invalid subscription for user {user_id}")
+                    logger.info("Deactivating invalid subscription for user %s", user_id)
                     subscription.is_active = False
                     session.add(subscription)
         
         session.commit()
         
-        logger.info(f"Web push: sent {sent_count}/{len(subscriptions)} to user {user_id}")
+        logger.info("Web push: sent %s/%s to user %s", sent_count, len(subscriptions), user_id)
         return sent_count
 
@@ -11,6 +11,8 @@ from uuid import UUID
 
 from fastapi import WebSocket
 
+from app.core.metrics import WEBSOCKET_CONNECTIONS
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,8 +32,9 @@ class ConnectionManager:
             if user_id not in self.active_connections:
                 self.active_connections[user_id] = set()
             self.active_connections[user_id].add(websocket)
+            self._update_metrics()
         
-        logger.info(f"WebSocket connected: user_id={user_id}, total_connections={len(self.active_connections[user_id])}")
+        logger.info("WebSocket connected: user_id=%s, total_connections=%s", user_id, len(self.active_connections[user_id]))
 
     async def disconnect(self, websocket: WebSocket, user_id: UUID):
         """Remove WebSocket connection from active connections."""
@@ -40,13 +43,14 @@ class ConnectionManager:
                 self.active_connections[user_id].discard(websocket)
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
+            self._update_metrics()
         
-        logger.info(f"WebSocket disconnected: user_id={user_id}")
+        logger.info("WebSocket disconnected: user_id=%s", user_id)
 
     async def send_personal_message(self, message: dict, user_id: UUID):
         """Send message to all WebSocket connections of a specific user."""
         if user_id not in self.active_connections:
-            logger.debug(f"No active connections for user {user_id}")
+            logger.debug("No active connections for user %s", user_id)
             return
         
         disconnected = []
@@ -55,9 +59,9 @@ class ConnectionManager:
         for websocket in connections:
             try:
                 await websocket.send_json(message)
-                logger.debug(f"Message sent to user {user_id}: {message.get('type')}")
+                logger.debug("Message sent to user %s: %s", user_id, message.get('type'))
             except Exception as e:
-                logger.error(f"Error sending message to user {user_id}: {e}")
+                logger.error("Error sending message to user %s: %s", user_id, e)
                 disconnected.append(websocket)
         
         # Clean up disconnected sockets
@@ -67,6 +71,7 @@ class ConnectionManager:
                     self.active_connections[user_id].discard(ws)
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
+                self._update_metrics()
 
     async def broadcast(self, message: dict):
         """Broadcast message to all connected users."""
@@ -84,6 +89,13 @@ class ConnectionManager:
         """Get number of active connections for a user."""
         return len(self.active_connections.get(user_id, set()))
 
+    def get_total_connections(self) -> int:
+        """Get number of active connections of all users in this process."""
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    def _update_metrics(self) -> None:
+        WEBSOCKET_CONNECTIONS.set(self.get_total_connections())
+
 
 # Global instance
 manager = ConnectionManager()
@@ -0,0 +1,61 @@
+"""Celery tasks for user avatar processing."""
+
+from __future__ import annotations
+
+import logging
+from uuid import UUID
+
+from sqlmodel import Session
+
+from app.celery_app import celery_app
+from app.db import engine
+from app.models import User
+from app.services.avatars import (
+    AVATAR_DEFAULT_SIZE,
+    remove_stale_thumbnails,
+    render_thumbnails,
+    url_to_path,
+)
+from app.services.cache import USERS_VERSION, bump_cache_version
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.avatars.process_avatar")
+def process_avatar(user_id: str, source_url: str) -> dict:
+    """
+    Построить миниатюры аватара и переключить пользователя на них.
+
+    Если пока задача ждала в очереди пользователь загрузил новый аватар
+    (``avatar_url`` уже другой), результат отбрасывается.
+    """
+    source = url_to_path(source_url)
+    if source is None or not source.exists():
+        return {"status": "skipped", "reason": "source not found"}
+
+    user_uuid = UUID(user_id)
+    try:
+        variants = render_thumbnails(source, user_uuid)
+    except ImportError:
+        logger.warning("Pillow is not installed, avatar thumbnails are not generated")
+        return {"status": "skipped", "reason": "pillow not installed"}
+    except Exception:
+        logger.exception("Failed to process avatar %s of user %s", source_url, user_id)
+        return {"status": "error"}
+
+    with Session(engine) as session:
+        user = session.get(User, user_uuid)
+        if not user or user.avatar_url != source_url:
+            source.unlink(missing_ok=True)
+            return {"status": "superseded"}
+
+        user.avatar_url = variants[str(AVATAR_DEFAULT_SIZE)]["webp"]
+        user.avatar_variants = variants
+        session.add(user)
+        bump_cache_version(session, USERS_VERSION)
+        session.commit()
+
+    # Оригинал больше не нужен — отдаются только миниатюры
+    source.unlink(missing_ok=True)
+    remove_stale_thumbnails(user_uuid, keep=variants)
+    return {"status": "ok", "avatar_url": variants[str(AVATAR_DEFAULT_SIZE)]["webp"]}
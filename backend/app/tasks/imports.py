@@ -0,0 +1,14 @@
+"""Celery tasks for bulk event import."""
+
+from __future__ import annotations
+
+from uuid import UUID
+
+from app.celery_app import celery_app
+from app.services.event_import import process_import_job
+
+
+@celery_app.task(name="app.tasks.imports.import_events")
+def import_events(job_id: str) -> None:
+    """Process an uploaded ICS/CSV file; progress is stored in the job row."""
+    process_import_job(UUID(job_id))
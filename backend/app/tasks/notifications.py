@@ -69,8 +69,10 @@ def create_notification_task(
             session.refresh(notification)
             
             logger.info(
-                f"Created notification {notification.id} for user {user_id} "
-                f"about event {event_id}"
+                "Created notification %s for user %s about event %s",
+                notification.id,
+                user_id,
+                event_id,
             )
             
             # WebSocket temporarily disabled - using HTTP polling
@@ -83,7 +85,9 @@ def create_notification_task(
             }
     except Exception as exc:
         logger.error(
-            f"Error creating notification for user {user_id}: {exc}",
+            "Error creating notification for user %s: %s",
+            user_id,
+            exc,
             exc_info=True,
         )
         # Retry on failure
@@ -112,7 +116,7 @@ def notify_event_invited_task(
         with Session(engine) as session:
             event = session.get(Event, UUID(event_id))
             if not event:
-                logger.warning(f"Event {event_id} not found for notification")
+                logger.warning("Event %s not found for notification", event_id)
                 return {"success": False, "error": "Event not found"}
             
             inviter_text = f" от {inviter_name}" if inviter_name else ""
@@ -129,8 +133,10 @@ def notify_event_invited_task(
             session.refresh(notification)
             
             logger.info(
-                f"Created invitation notification {notification.id} "
-                f"for user {user_id} about event {event_id}"
+                "Created invitation notification %s for user %s about event %s",
+                notification.id,
+                user_id,
+                event_id,
             )
             
             # WebSocket and Web Push temporarily disabled - using HTTP polling
@@ -145,7 +151,7 @@ def notify_event_invited_task(
             #         url=f"/?eventId={event_id}",
             #     )
             # except Exception as e:
-            #     logger.error(f"Failed to send web push: {e}")
+            #     logger.error("Failed to send web push: %s", e)
             #     # Continue even if web push fails
             
             return {
@@ -156,8 +162,10 @@ def notify_event_invited_task(
             }
     except Exception as exc:
         logger.error(
-            f"Error in notify_event_invited_task for user {user_id}, "
-            f"event {event_id}: {exc}",
+            "Error in notify_event_invited_task for user %s, event %s: %s",
+            user_id,
+            event_id,
+            exc,
             exc_info=True,
         )
         raise self.retry(exc=exc)
@@ -185,7 +193,7 @@ def notify_event_updated_task(
         with Session(engine) as session:
             event = session.get(Event, UUID(event_id))
             if not event:
-                logger.warning(f"Event {event_id} not found for notification")
+                logger.warning("Event %s not found for notification", event_id)
                 return {"success": False, "error": "Event not found"}
             
             updater_text = f" {updater_name}" if updater_name else ""
@@ -218,8 +226,10 @@ def notify_event_updated_task(
             session.refresh(notification)
             
             logger.info(
-                f"Created update notification {notification.id} "
-                f"for user {user_id} about event {event_id}"
+                "Created update notification %s for user %s about event %s",
+                notification.id,
+                user_id,
+                event_id,
             )
             
             # WebSocket and Web Push temporarily disabled - using HTTP polling
@@ -234,7 +244,7 @@ def notify_event_updated_task(
             #         url=f"/?eventId={event_id}",
             #     )
             # except Exception as e:
-            #     logger.error(f"Failed to send web push: {e}")
+            #     logger.error("Failed to send web push: %s", e)
             
             return {
                 "success": True,
@@ -244,8 +254,10 @@ def notify_event_updated_task(
             }
     except Exception as exc:
         logger.error(
-            f"Error in notify_event_updated_task for user {user_id}, "
-            f"event {event_id}: {exc}",
+            "Error in notify_event_updated_task for user %s, event %s: %s",
+            user_id,
+            event_id,
+            exc,
             exc_info=True,
         )
         raise self.retry(exc=exc)
@@ -273,7 +285,7 @@ def notify_event_cancelled_task(
         with Session(engine) as session:
             event = session.get(Event, UUID(event_id))
             if not event:
-                logger.warning(f"Event {event_id} not found for notification")
+                logger.warning("Event %s not found for notification", event_id)
                 return {"success": False, "error": "Event not found"}
             
             canceller_text = f" {canceller_name}" if canceller_name else ""
@@ -290,8 +302,10 @@ def notify_event_cancelled_task(
             session.refresh(notification)
             
             logger.info(
-                f"Created cancellation notification {notification.id} "
-                f"for user {user_id} about event {event_id}"
+                "Created cancellation notification %s for user %s about event %s",
+                notification.id,
+                user_id,
+                event_id,
             )
             
             # WebSocket and Web Push temporarily disabled - using HTTP polling
@@ -306,7 +320,7 @@ def notify_event_cancelled_task(
             #         url=f"/?eventId={event_id}",
             #     )
             # except Exception as e:
-            #     logger.error(f"Failed to send web push: {e}")
+            #     logger.error("Failed to send web push: %s", e)
             
             return {
                 "success": True,
@@ -316,8 +330,10 @@ def notify_event_cancelled_task(
             }
     except Exception as exc:
         logger.error(
-            f"Error in notify_event_cancelled_task for user {user_id}, "
-            f"event {event_id}: {exc}",
+            "Error in notify_event_cancelled_task for user %s, event %s: %s",
+            user_id,
+            event_id,
+            exc,
             exc_info=True,
         )
         raise self.retry(exc=exc)
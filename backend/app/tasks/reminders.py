@@ -1,5 +1,6 @@
 """Celery tasks for event reminders."""
 
+import logging
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
@@ -9,6 +10,8 @@ from app.celery_app import celery_app
 from app.db import engine
 from app.models import Event, EventParticipant, Notification
 
+logger = logging.getLogger(__name__)
+
 
 @celery_app.task(name="app.tasks.reminders.send_event_reminders")
 def send_event_reminders() -> dict[str, int]:
@@ -79,10 +82,11 @@ def send_event_reminders() -> dict[str, int]:
                 session.add(notification)
                 reminders_created += 1
                 
-                # Логируем для отладки
-                print(
-                    f"[Reminder] Created reminder for user {participant.user_id} "
-                    f"about event '{event.title}' (starts at {event.starts_at})"
+                logger.debug(
+                    "Created reminder for user %s about event %s (starts at %s)",
+                    participant.user_id,
+                    event.id,
+                    event.starts_at,
                 )
         
         # Сохраняем все напоминания
@@ -94,9 +98,12 @@ def send_event_reminders() -> dict[str, int]:
         "events_checked": len(events),
     }
     
-    print(
-        f"[Reminder Task] Finished: {reminders_created} created, "
-        f"{reminders_skipped} skipped, {len(events)} events checked"
+    logger.info(
+        "Reminder task finished: %s created, %s skipped, %s events checked",
+        reminders_created,
+        reminders_skipped,
+        len(events),
+        extra=result,
     )
     
     return result
@@ -0,0 +1,69 @@
+"""Celery tasks for ticket SLA tracking."""
+
+from __future__ import annotations
+
+import logging
+
+from sqlmodel import Session, select
+
+from app.celery_app import celery_app
+from app.db import engine
+from app.models import Ticket
+from app.models.ticket import TicketStatus
+from app.services.ticket_sla import evaluate_sla_breaches, refresh_sla_deadlines
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.sla.check_ticket_sla")
+def check_ticket_sla() -> dict[str, int]:
+    """
+    Периодическая задача SLA-движка.
+
+    Запускается каждую минуту через Celery Beat. Выбирает по индексу ``sla_due_at``
+    только тикеты, дедлайн которых наступил с прошлого запуска, и помечает их
+    ``sla_breach`` пачками.
+    """
+    with Session(engine) as session:
+        result = evaluate_sla_breaches(session)
+
+    if result["tickets_breached"]:
+        logger.info(
+            "SLA check: %s tickets breached, %s notifications created",
+            result["tickets_breached"],
+            result["notifications_created"],
+        )
+    return result
+
+
+@celery_app.task(name="app.tasks.sla.recompute_ticket_sla_deadlines")
+def recompute_ticket_sla_deadlines(batch_size: int = 1000) -> dict[str, int]:
+    """
+    Пересчитать ``sla_due_at`` для всех открытых тикетов (разовый бэкфилл,
+    например после изменения SLA по приоритетам в настройках).
+    """
+    processed = 0
+    last_id = None
+    with Session(engine) as session:
+        while True:
+            statement = (
+                select(Ticket.id)
+                .where(
+                    Ticket.is_deleted == False,
+                    Ticket.sla_breach == False,
+                    Ticket.status.notin_([TicketStatus.RESOLVED, TicketStatus.CLOSED]),
+                )
+                .order_by(Ticket.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                statement = statement.where(Ticket.id > last_id)
+            ticket_ids = session.exec(statement).all()
+            if not ticket_ids:
+                break
+            processed += refresh_sla_deadlines(session, ticket_ids)
+            session.commit()
+            last_id = ticket_ids[-1]
+
+    logger.info("SLA deadlines recomputed for %s tickets", processed)
+    return {"tickets_processed": processed}
@@ -0,0 +1,33 @@
+"""Celery tasks for the attachment blob store."""
+
+from __future__ import annotations
+
+import logging
+
+from sqlmodel import Session
+
+from app.celery_app import celery_app
+from app.db import engine
+from app.services.blob_store import collect_garbage
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.storage.collect_blob_garbage")
+def collect_blob_garbage() -> dict[str, int]:
+    """
+    Удалить блобы, на которые больше нет ссылок (дольше grace-периода),
+    файлы без строки в БД и временные файлы прерванных загрузок.
+    """
+    with Session(engine) as session:
+        result = collect_garbage(session)
+
+    if result["blobs_deleted"] or result["orphan_files_deleted"] or result["staging_files_deleted"]:
+        logger.info(
+            "Blob GC: %s blobs deleted (%s bytes), %s orphan files and %s staging files removed",
+            result["blobs_deleted"],
+            result["bytes_freed"],
+            result["orphan_files_deleted"],
+            result["staging_files_deleted"],
+        )
+    return result
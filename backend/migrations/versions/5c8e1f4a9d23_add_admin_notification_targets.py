@@ -0,0 +1,84 @@
+"""add_admin_notification_targets
+
+Revision ID: 5c8e1f4a9d23
+Revises: 0b6e5d2c8a17
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import json
+import logging
+from typing import Sequence, Union
+from uuid import UUID
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e1f4a9d23'
+down_revision: Union[str, None] = '0b6e5d2c8a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(f"alembic.runtime.migration.{revision}")
+
+
+def upgrade() -> None:
+    op.add_column('admin_notifications', sa.Column('is_broadcast', sa.Boolean(), nullable=False, server_default='0'))
+    op.create_index(op.f('ix_admin_notifications_is_broadcast'), 'admin_notifications', ['is_broadcast'], unique=False)
+    targets = op.create_table('admin_notification_targets',
+        sa.Column('notification_id', sa.Uuid(), nullable=False),
+        sa.Column('target_type', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('target_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['notification_id'], ['admin_notifications.id'], ),
+        sa.PrimaryKeyConstraint('notification_id', 'target_type', 'target_id')
+    )
+    op.create_index('ix_admin_notification_targets_lookup', 'admin_notification_targets', ['target_type', 'target_id'], unique=False)
+
+    # Переносим получателей из JSON-колонок в нормализованную таблицу
+    bind = op.get_bind()
+    notifications = sa.table(
+        'admin_notifications',
+        sa.column('id', sa.Uuid()),
+        sa.column('target_user_ids', sa.JSON()),
+        sa.column('target_department_ids', sa.JSON()),
+        sa.column('is_broadcast', sa.Boolean()),
+    )
+    rows = []
+    broadcast_ids = []
+    for notification_id, user_ids, department_ids in bind.execute(
+        sa.select(notifications.c.id, notifications.c.target_user_ids, notifications.c.target_department_ids)
+    ):
+        if isinstance(user_ids, str):
+            user_ids = json.loads(user_ids)
+        if isinstance(department_ids, str):
+            department_ids = json.loads(department_ids)
+        if not user_ids and not department_ids:
+            broadcast_ids.append(notification_id)
+            continue
+        for target_type, ids in (("user", user_ids or []), ("department", department_ids or [])):
+            parsed_ids = []
+            for target_id in ids:
+                # Как и старое чтение JSON-колонок: битые id пропускаем, а не роняем миграцию
+                try:
+                    parsed_ids.append(UUID(str(target_id)))
+                except (ValueError, TypeError):
+                    logger.warning(
+                        "Skipping invalid %s id %r of admin notification %s", target_type, target_id, notification_id
+                    )
+            for target_id in dict.fromkeys(parsed_ids):
+                rows.append({"notification_id": notification_id, "target_type": target_type, "target_id": target_id})
+    if rows:
+        op.bulk_insert(targets, rows)
+    if broadcast_ids:
+        bind.execute(
+            notifications.update().where(notifications.c.id.in_(broadcast_ids)).values(is_broadcast=True)
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_notification_targets_lookup', table_name='admin_notification_targets')
+    op.drop_table('admin_notification_targets')
+    op.drop_index(op.f('ix_admin_notifications_is_broadcast'), table_name='admin_notifications')
+    op.drop_column('admin_notifications', 'is_broadcast')
@@ -0,0 +1,82 @@
+"""add_attachment_blob_store
+
+Revision ID: 7d3f9b2e6a41
+Revises: 5c8e1f4a9d23
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f9b2e6a41'
+down_revision: Union[str, None] = '5c8e1f4a9d23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stored_blobs',
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('storage_path', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('released_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(op.f('ix_stored_blobs_ref_count'), 'stored_blobs', ['ref_count'], unique=False)
+
+    with op.batch_alter_table('event_attachments') as batch_op:
+        batch_op.add_column(sa.Column('blob_sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_event_attachments_blob_sha256'), ['blob_sha256'], unique=False)
+        batch_op.create_foreign_key('fk_event_attachments_blob_sha256', 'stored_blobs', ['blob_sha256'], ['sha256'])
+
+    with op.batch_alter_table('ticket_attachments') as batch_op:
+        batch_op.add_column(sa.Column('blob_sha256', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_ticket_attachments_blob_sha256'), ['blob_sha256'], unique=False)
+        batch_op.create_foreign_key('fk_ticket_attachments_blob_sha256', 'stored_blobs', ['blob_sha256'], ['sha256'])
+
+    op.add_column('events', sa.Column('attachments_size', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('tickets', sa.Column('attachments_size', sa.Integer(), nullable=False, server_default='0'))
+
+    # Счётчики для уже загруженных файлов (сами файлы остаются на прежних путях)
+    op.execute(
+        """
+        UPDATE events SET attachments_size = (
+            SELECT COALESCE(SUM(file_size), 0) FROM event_attachments
+            WHERE event_attachments.event_id = events.id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE tickets SET attachments_size = (
+            SELECT COALESCE(SUM(file_size), 0) FROM ticket_attachments
+            WHERE ticket_attachments.ticket_id = tickets.id
+              AND ticket_attachments.is_deleted = false
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tickets', 'attachments_size')
+    op.drop_column('events', 'attachments_size')
+
+    with op.batch_alter_table('ticket_attachments') as batch_op:
+        batch_op.drop_constraint('fk_ticket_attachments_blob_sha256', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_ticket_attachments_blob_sha256'))
+        batch_op.drop_column('blob_sha256')
+
+    with op.batch_alter_table('event_attachments') as batch_op:
+        batch_op.drop_constraint('fk_event_attachments_blob_sha256', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_event_attachments_blob_sha256'))
+        batch_op.drop_column('blob_sha256')
+
+    op.drop_index(op.f('ix_stored_blobs_ref_count'), table_name='stored_blobs')
+    op.drop_table('stored_blobs')
@@ -0,0 +1,25 @@
+"""add_events_room_starts_index
+
+Revision ID: b7e2d4a91c36
+Revises: 9a4c2e7f1b58
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d4a91c36'
+down_revision: Union[str, None] = '9a4c2e7f1b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_room_id_starts_at', 'events', ['room_id', 'starts_at', 'ends_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_room_id_starts_at', table_name='events')
@@ -0,0 +1,62 @@
+"""add_room_reservations
+
+Revision ID: c4f81e0a7d25
+Revises: b7e2d4a91c36
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f81e0a7d25'
+down_revision: Union[str, None] = 'b7e2d4a91c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    if is_postgres:
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    op.create_table('room_reservations',
+        sa.Column('event_id', sa.Uuid(), nullable=False),
+        sa.Column('room_id', sa.Uuid(), nullable=False),
+        sa.Column('starts_at', sa.DateTime(), nullable=False),
+        sa.Column('ends_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+        sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('ix_room_reservations_room_id_starts_at', 'room_reservations', ['room_id', 'starts_at', 'ends_at'], unique=False)
+    op.create_table('room_locks',
+        sa.Column('room_id', sa.Uuid(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+        sa.PrimaryKeyConstraint('room_id')
+    )
+
+    backfill = """
+        INSERT INTO room_reservations (event_id, room_id, starts_at, ends_at)
+        SELECT id, room_id, starts_at, ends_at FROM events
+        WHERE room_id IS NOT NULL AND ends_at > starts_at
+    """
+    if is_postgres:
+        op.execute(
+            "ALTER TABLE room_reservations ADD CONSTRAINT room_reservations_no_overlap "
+            "EXCLUDE USING gist (room_id WITH =, tsrange(starts_at, ends_at, '[)') WITH &&)"
+        )
+        # Уже существующие двойные брони: бронь остаётся за более ранним событием
+        op.execute(backfill + " ORDER BY created_at ON CONFLICT DO NOTHING")
+    else:
+        op.execute(backfill)
+
+
+def downgrade() -> None:
+    op.drop_table('room_locks')
+    op.drop_index('ix_room_reservations_room_id_starts_at', table_name='room_reservations')
+    op.drop_table('room_reservations')
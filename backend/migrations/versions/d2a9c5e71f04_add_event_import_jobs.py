@@ -0,0 +1,53 @@
+"""add_event_import_jobs
+
+Revision ID: d2a9c5e71f04
+Revises: c4f81e0a7d25
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a9c5e71f04'
+down_revision: Union[str, None] = 'c4f81e0a7d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('event_import_jobs',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('calendar_id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('format', sqlmodel.sql.sqltypes.AutoString(length=8), nullable=False),
+        sa.Column('timezone', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+        sa.Column('file_name', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column('file_path', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('bytes_processed', sa.Integer(), nullable=False),
+        sa.Column('records_processed', sa.Integer(), nullable=False),
+        sa.Column('records_failed', sa.Integer(), nullable=False),
+        sa.Column('events_created', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.JSON(), nullable=False),
+        sa.Column('error', sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['calendar_id'], ['calendars.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_import_jobs_calendar_id'), 'event_import_jobs', ['calendar_id'], unique=False)
+    op.create_index(op.f('ix_event_import_jobs_id'), 'event_import_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_event_import_jobs_id'), table_name='event_import_jobs')
+    op.drop_index(op.f('ix_event_import_jobs_calendar_id'), table_name='event_import_jobs')
+    op.drop_table('event_import_jobs')
@@ -0,0 +1,34 @@
+"""add_ticket_sla_due_at
+
+Revision ID: f2a7c91d3b40
+Revises: 22a45ee15fd2, e1a2b3c4d5f6
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c91d3b40'
+down_revision: Union[str, Sequence[str], None] = ('22a45ee15fd2', 'e1a2b3c4d5f6')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индекс дедлайнов SLA для периодической задачи app.tasks.sla.check_ticket_sla.
+    # После миграции заполнить колонку задачей app.tasks.sla.recompute_ticket_sla_deadlines.
+    op.add_column('tickets', sa.Column('sla_due_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_tickets_sla_due_at'), 'tickets', ['sla_due_at'], unique=False)
+    op.add_column('ticket_categories', sa.Column('sla_response_hours', sa.Float(), nullable=True))
+    op.add_column('ticket_categories', sa.Column('sla_resolution_hours', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ticket_categories', 'sla_resolution_hours')
+    op.drop_column('ticket_categories', 'sla_response_hours')
+    op.drop_index(op.f('ix_tickets_sla_due_at'), table_name='tickets')
+    op.drop_column('tickets', 'sla_due_at')
@@ -0,0 +1,351 @@
+"""
+Воспроизводимый бенчмарк API.
+
+Наполняет SQLite или локальный Postgres синтетической организацией
+(scripts/generate_dataset.py: дерево отделов, пользователи, переговорки,
+события за год, включая повторяющиеся серии, тикеты) и замеряет горячие эндпоинты в процессе через
+TestClient. Результаты пишутся в JSON, чтобы сравнивать коммиты между собой.
+
+Использование:
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --database-url postgresql://localhost/planner_bench --users 5000
+    python scripts/benchmark.py --reuse --load --concurrency 16 --duration 30
+
+Число SQL-запросов и время в БД берутся из заголовка ``Server-Timing``
+(см. app/core/instrumentation.py). Celery работает в режиме ``task_always_eager``,
+поэтому брокер не нужен, а уведомления выполняются внутри замеряемого запроса.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from scripts.generate_dataset import add_dataset_arguments, generate_dataset, options_from_args  # noqa: E402
+
+_SERVER_TIMING_DB_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+# Сценарии, которые гоняются в режиме нагрузки (только чтение)
+# События, созданные сценарием create_event; удаляются перед каждым запуском
+BENCHMARK_EVENT_TITLE = "Benchmark series"
+LOAD_SCENARIOS = ("list_events", "get_user_availability", "get_conflicts", "get_statistics", "list_tickets")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed a synthetic organization and benchmark hot API endpoints.")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Target database (default: SQLite file in the temp directory). Its contents are replaced unless --reuse.",
+    )
+    parser.add_argument("--reuse", action="store_true", help="Benchmark an already seeded database")
+    add_dataset_arguments(parser)
+    parser.set_defaults(users=2000, tickets=3000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--load", action="store_true", help="Also run the concurrent load driver")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Load phase duration in seconds")
+    parser.add_argument("--output", default="benchmark.json")
+    return parser.parse_args(argv)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summarize(latencies: list[float], queries: list[int], db_times: list[float]) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index], 3)
+
+    result = {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1], 3),
+    }
+    if queries:
+        result["queries_mean"] = round(statistics.fmean(queries), 1)
+        result["queries_max"] = max(queries)
+        result["db_mean_ms"] = round(statistics.fmean(db_times), 3)
+    return result
+
+
+class Recorder:
+    """Collects latency and SQL stats of requests made by a scenario."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.queries: list[int] = []
+        self.db_times: list[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, response, elapsed: float, expected: int) -> None:
+        match = _SERVER_TIMING_DB_RE.search(response.headers.get("server-timing", ""))
+        with self._lock:
+            self.latencies.append(elapsed * 1000)
+            if match:
+                self.db_times.append(float(match.group(1)))
+                self.queries.append(int(match.group(2)))
+            if response.status_code != expected:
+                self.errors += 1
+
+    def summary(self) -> dict:
+        if not self.latencies:
+            return {"count": 0, "errors": self.errors}
+        result = _summarize(self.latencies, self.queries, self.db_times)
+        result["errors"] = self.errors
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Сценарии
+# ---------------------------------------------------------------------------
+
+def _delete_benchmark_events() -> None:
+    """Remove series left by previous runs so that reused databases stay comparable."""
+    from sqlalchemy import delete, select
+
+    from app.db import engine
+    from app.models import AvailabilitySlot, Event, EventComment, EventGroupParticipant, EventParticipant, Notification, RoomReservation
+
+    created = select(Event.id).where(Event.title == BENCHMARK_EVENT_TITLE).scalar_subquery()
+    with engine.begin() as connection:
+        for model in (AvailabilitySlot, EventComment, EventGroupParticipant, EventParticipant, Notification, RoomReservation):
+            connection.execute(delete(model).where(model.event_id.in_(created)))
+        # Сначала экземпляры серий, затем родители
+        connection.execute(delete(Event).where(Event.title == BENCHMARK_EVENT_TITLE, Event.recurrence_parent_id.is_not(None)))
+        connection.execute(delete(Event).where(Event.title == BENCHMARK_EVENT_TITLE))
+
+
+def _pick_subjects(args: argparse.Namespace) -> dict:
+    """Admin (acts as the current user), their calendar and a busy colleague to query."""
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+
+    from app.db import engine
+    from app.models import Calendar, EventParticipant, User
+
+    with Session(engine) as session:
+        admin = session.exec(select(User).where(User.role == "admin").order_by(User.email)).first()
+        if admin is None:
+            raise SystemExit("No admin user in the database; run without --reuse to seed it")
+        calendar = session.exec(select(Calendar).where(Calendar.owner_id == admin.id)).first()
+        busiest = session.exec(
+            select(EventParticipant.user_id)
+            .group_by(EventParticipant.user_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+        return {"admin_id": admin.id, "calendar_id": calendar.id, "member_id": busiest or admin.id}
+
+
+def build_scenarios(client, subjects: dict, rng: random.Random) -> dict[str, Callable[[Recorder], None]]:
+    from app.core.security import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token(subjects['admin_id'])}"}
+    calendar_id = subjects["calendar_id"]
+    member_id = subjects["member_id"]
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    # Новые серии — после окна синтетических данных, в рабочие часы (07:00-10:00 UTC, пн-чт),
+    # каждая в своём 15-минутном слоте, чтобы не конфликтовать друг с другом
+    series_base = (now + timedelta(days=400)).replace(hour=7)
+    series_base -= timedelta(days=series_base.weekday())
+    slots = iter(range(10**6))
+
+    def window(days: int) -> dict:
+        start = now - timedelta(days=rng.randrange(150))
+        return {"from": start.isoformat(), "to": (start + timedelta(days=days)).isoformat()}
+
+    def timed(recorder: Recorder, method: str, url: str, expected: int = 200, **kwargs) -> None:
+        started = time.perf_counter()
+        response = client.request(method, url, headers=headers, **kwargs)
+        recorder.record(response, time.perf_counter() - started, expected)
+
+    def list_events(recorder: Recorder) -> None:
+        timed(recorder, "GET", "/api/v1/events/", params=window(31))
+
+    def create_event(recorder: Recorder) -> None:
+        block, slot = divmod(next(slots), 48)
+        day, quarter = divmod(slot, 12)
+        starts_at = series_base + timedelta(weeks=10 * block, days=day, minutes=15 * quarter)
+        payload = {
+            "calendar_id": str(calendar_id),
+            "title": BENCHMARK_EVENT_TITLE,
+            "starts_at": starts_at.isoformat(),
+            "ends_at": (starts_at + timedelta(minutes=10)).isoformat(),
+            "participant_ids": [str(member_id)],
+            "recurrence_rule": {"frequency": "weekly", "interval": 1, "count": 10},
+        }
+        timed(recorder, "POST", "/api/v1/events/", expected=201, json=payload)
+
+    def get_user_availability(recorder: Recorder) -> None:
+        timed(recorder, "GET", f"/api/v1/calendars/{calendar_id}/members/{member_id}/availability", params=window(7))
+
+    def get_conflicts(recorder: Recorder) -> None:
+        timed(recorder, "GET", f"/api/v1/calendars/{calendar_id}/conflicts", params=window(31))
+
+    def get_statistics(recorder: Recorder) -> None:
+        params = window(31)
+        timed(recorder, "GET", "/api/v1/statistics/", params={"from_date": params["from"], "to_date": params["to"]})
+
+    def list_tickets(recorder: Recorder) -> None:
+        timed(recorder, "GET", "/api/v1/tickets/")
+
+    return {
+        "list_events": list_events,
+        "create_event": create_event,
+        "get_user_availability": get_user_availability,
+        "get_conflicts": get_conflicts,
+        "get_statistics": get_statistics,
+        "list_tickets": list_tickets,
+    }
+
+
+def run_sequential(scenarios: dict, iterations: int, warmup: int) -> dict:
+    results = {}
+    for name, scenario in scenarios.items():
+        for _ in range(warmup):
+            scenario(Recorder())
+        recorder = Recorder()
+        for _ in range(iterations):
+            scenario(recorder)
+        results[name] = recorder.summary()
+        print(f"  {name:<24} p50 {results[name].get('p50_ms', 0):9.2f} ms  p95 {results[name].get('p95_ms', 0):9.2f} ms")
+    return results
+
+
+def run_load(make_scenarios: Callable[[int], dict], concurrency: int, duration: float) -> dict:
+    """Each worker thread loops over read scenarios with its own client until the deadline."""
+    recorders = {name: Recorder() for name in LOAD_SCENARIOS}
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        scenarios = make_scenarios(index)
+        while time.perf_counter() < deadline:
+            for name in LOAD_SCENARIOS:
+                scenarios[name](recorders[name])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, index) for index in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(recorder.latencies) for recorder in recorders.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "scenarios": {name: recorder.summary() for name, recorder in recorders.items()},
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.gettempdir()) / 'planner_benchmark.db'}"
+    # Настройки читаются при импорте app, поэтому окружение задаётся до него
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SLOW_REQUEST_LOG_SAMPLE_RATE", "0")
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel
+
+    from app.celery_app import celery_app
+    from app.db import engine, init_db
+    from app.main import app
+
+    celery_app.conf.task_always_eager = True
+
+    counts: dict[str, int] = {}
+    if not args.reuse:
+        print(f"Seeding {database_url} ...")
+        SQLModel.metadata.drop_all(engine)
+        init_db()
+        seed_started = time.perf_counter()
+        counts = generate_dataset(engine, options_from_args(args))
+        print(f"  done in {time.perf_counter() - seed_started:.1f} s: {counts}")
+
+    _delete_benchmark_events()
+    subjects = _pick_subjects(args)
+    print("Sequential run:")
+    with TestClient(app) as client:
+        sequential = run_sequential(
+            build_scenarios(client, subjects, random.Random(args.seed)),
+            args.iterations,
+            args.warmup,
+        )
+
+    load = None
+    if args.load:
+        print(f"Load run: {args.concurrency} workers for {args.duration:.0f} s")
+        clients: list[TestClient] = []
+
+        def make_scenarios(index: int) -> dict:
+            client = TestClient(app)
+            clients.append(client)
+            return build_scenarios(client, subjects, random.Random(args.seed + index + 1))
+
+        load = run_load(make_scenarios, args.concurrency, args.duration)
+        for client in clients:
+            client.close()
+        print(f"  {load['requests']} requests, {load['throughput_rps']} req/s")
+
+    result = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "dataset": {
+                **asdict(options_from_args(args)),
+                "rows": counts,
+                "reused": args.reuse,
+            },
+        },
+        "scenarios": sequential,
+        "load": load,
+    }
+    Path(args.output).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,11 +20,12 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(BASE_DIR))
 
-from sqlmodel import Session, select
+from sqlmodel import Session, delete, select
 from app.db import engine
 from app.models.event import Event
 from app.models.event_participant import EventParticipant
 from app.models.event_attachment import EventAttachment
+from app.models.room_reservation import RoomReservation
 
 
 def delete_all_events():
@@ -74,6 +75,9 @@ def delete_all_events():
                     session.delete(participant)
                 print("✓ Участники событий удалены")
             
+            # Снимаем брони переговорок
+            session.exec(delete(RoomReservation))
+
             # Удаляем события
             print(f"Удаление {events_count} событий...")
             events = session.exec(select(Event)).all()
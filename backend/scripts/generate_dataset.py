@@ -0,0 +1,501 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+
+Создаёт воспроизводимый (по ``--seed``) набор данных: организацию с деревом
+отделов, пользователей с расписаниями доступности, переговорки, личные
+календари, события за период вокруг текущей даты (включая еженедельные серии)
+с участниками, тикеты с комментариями и историей, уведомления. Строки пишутся
+пакетными Core INSERT без ORM, поэтому миллионы строк создаются за минуты.
+
+Использование:
+    python scripts/generate_dataset.py --users 20000 --reset
+    python scripts/generate_dataset.py --database-url postgresql://localhost/planner_scale --users 50000
+
+Все пользователи получают пароль ``--password``; первый (``user0@<slug>.example.com``)
+— администратор.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from pydantic_core import PydanticUndefined  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.engine import Connection, Engine  # noqa: E402
+
+from app.models import (  # noqa: E402
+    Calendar,
+    Department,
+    Event,
+    EventParticipant,
+    Notification,
+    Organization,
+    Room,
+    RoomReservation,
+    Ticket,
+    TicketCategory,
+    TicketComment,
+    TicketHistory,
+    TicketHistoryAction,
+    User,
+    UserAvailabilitySchedule,
+    UserDepartment,
+    UserOrganization,
+)
+
+# Порядок вставки: родительские таблицы раньше дочерних (внешние ключи)
+INSERT_ORDER = (
+    Organization,
+    Department,
+    User,
+    UserDepartment,
+    UserOrganization,
+    UserAvailabilitySchedule,
+    Room,
+    Calendar,
+    Event,
+    EventParticipant,
+    RoomReservation,
+    TicketCategory,
+    Ticket,
+    TicketComment,
+    TicketHistory,
+    Notification,
+)
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+WORKING_HOURS = (("08:00", "17:00"), ("09:00", "18:00"), ("10:00", "19:00"))
+EVENT_DURATIONS = (15, 30, 30, 45, 60, 60, 60, 90, 120)
+# Число приглашённых помимо владельца: в основном 0-4, изредка крупные встречи
+INVITEE_BUCKETS = ((0, 0), (1, 2), (3, 4), (5, 10), (11, 40))
+INVITEE_WEIGHTS = (30, 35, 20, 12, 3)
+TICKET_STATUSES = ("open", "in_progress", "waiting_response", "on_hold", "resolved", "closed")
+TICKET_STATUS_WEIGHTS = (20, 15, 10, 5, 25, 25)
+TICKET_PRIORITIES = ("low", "medium", "high", "urgent", "critical")
+TICKET_PRIORITY_WEIGHTS = (25, 45, 20, 8, 2)
+# Сколько случайных переговорок пробовать, прежде чем оставить событие без переговорки
+ROOM_ATTEMPTS = 3
+
+
+@dataclass
+class DatasetOptions:
+    """Size and shape of the generated dataset."""
+
+    users: int = 1000
+    departments: int = 50
+    rooms: int = 30
+    days_back: int = 182
+    days_ahead: int = 182
+    events_per_user: int = 40
+    series_per_user: int = 2
+    max_series_length: int = 26
+    tickets: int = 2000
+    comments_per_ticket: int = 3
+    notification_rate: float = 0.3
+    seed: int = 42
+    slug: str = "synthetic"
+    password: str = "Password123!"
+    batch_size: int = 5000
+
+
+def _is_free(schedule: list[tuple[datetime, datetime]], starts_at: datetime, ends_at: datetime) -> bool:
+    # schedule — непересекающиеся брони переговорки, отсортированные по началу
+    index = bisect.bisect_left(schedule, (starts_at,))
+    if index < len(schedule) and schedule[index][0] < ends_at:
+        return False
+    return not (index and schedule[index - 1][1] > starts_at)
+
+
+class _BulkWriter:
+    """Buffers rows per table and flushes them with executemany INSERTs in dependency order."""
+
+    def __init__(self, connection: Connection, batch_size: int, rng: random.Random) -> None:
+        self.connection = connection
+        self.batch_size = batch_size
+        self.rng = rng
+        self.counts: dict[str, int] = {}
+        self._buffers: dict[Any, list[dict]] = {model: [] for model in INSERT_ORDER}
+        self._templates = {model: _row_template(model) for model in INSERT_ORDER}
+
+    def add(self, model, **values) -> dict:
+        static, factories = self._templates[model]
+        row = dict(static)
+        for name, factory in factories:
+            if name not in values:
+                row[name] = self.new_id() if name == "id" else factory()
+        row.update(values)
+        buffer = self._buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+        return row
+
+    def new_id(self) -> UUID:
+        # Идентификаторы из того же генератора — набор данных полностью воспроизводим
+        return UUID(int=self.rng.getrandbits(128), version=4)
+
+    def flush(self) -> None:
+        for model, buffer in self._buffers.items():
+            if buffer:
+                self.connection.execute(insert(model), buffer)
+                table = model.__tablename__
+                self.counts[table] = self.counts.get(table, 0) + len(buffer)
+                buffer.clear()
+        self.connection.commit()
+
+
+def _row_template(model) -> tuple[dict, list]:
+    # Core INSERT не применяет default/default_factory из SQLModel — подставляем сами
+    static: dict[str, Any] = {}
+    factories: list = []
+    for name, info in model.model_fields.items():
+        if info.default_factory is not None:
+            factories.append((name, info.default_factory))
+        elif info.default is not PydanticUndefined:
+            static[name] = info.default
+    return static, factories
+
+
+def _weekly_schedule(rng: random.Random) -> dict:
+    start, end = rng.choice(WORKING_HOURS)
+    days = WEEKDAYS[:5] if rng.random() < 0.9 else WEEKDAYS[:4]
+    if rng.random() < 0.2:
+        # Обеденный перерыв
+        return {day: [{"start": start, "end": "13:00"}, {"start": "14:00", "end": end}] for day in days}
+    return {day: [{"start": start, "end": end}] for day in days}
+
+
+def generate_dataset(engine: Engine, options: DatasetOptions) -> dict[str, int]:
+    """Insert a synthetic organization into an existing schema. Returns row counts per table."""
+    from app.core.security import get_password_hash
+
+    rng = random.Random(options.seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    period_start = now - timedelta(days=options.days_back)
+    period_days = max(options.days_back + options.days_ahead, 1)
+    hashed_password = get_password_hash(options.password)
+
+    def working_time(day_offset: int) -> datetime:
+        return period_start + timedelta(days=day_offset, hours=rng.randint(6, 16), minutes=rng.choice((0, 15, 30, 45)))
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        writer = _BulkWriter(connection, options.batch_size, random.Random(options.seed ^ 0x5EED))
+
+        org_id = writer.add(
+            Organization,
+            name=f"Synthetic {options.slug}",
+            slug=options.slug,
+            timezone="Europe/Moscow",
+        )["id"]
+
+        department_ids: list[UUID] = []
+        for index in range(options.departments):
+            # Родитель из первой трети уже созданных — дерево получается широким и неглубоким
+            parent_id = department_ids[rng.randrange(max(1, len(department_ids) // 3))] if department_ids else None
+            department_ids.append(
+                writer.add(
+                    Department,
+                    name=f"Department {index}",
+                    organization_id=org_id,
+                    parent_id=parent_id,
+                )["id"]
+            )
+
+        user_ids: list[UUID] = []
+        user_departments: dict[UUID, Optional[UUID]] = {}
+        members_by_department: dict[UUID, list[UUID]] = {}
+        for index in range(options.users):
+            department_id = rng.choice(department_ids) if department_ids else None
+            user = writer.add(
+                User,
+                email=f"user{index}@{options.slug}.example.com",
+                full_name=f"User {index}",
+                position=rng.choice(("Engineer", "Manager", "Analyst", "Designer", "Support")),
+                department_id=department_id,
+                hashed_password=hashed_password,
+                role="admin" if index == 0 else "employee",
+                organization_id=org_id,
+                created_at=period_start,
+            )
+            user_ids.append(user["id"])
+            user_departments[user["id"]] = department_id
+            writer.add(UserOrganization, user_id=user["id"], organization_id=org_id)
+            if department_id is not None:
+                members_by_department.setdefault(department_id, []).append(user["id"])
+                writer.add(UserDepartment, user_id=user["id"], department_id=department_id)
+            if rng.random() < 0.6:
+                writer.add(
+                    UserAvailabilitySchedule,
+                    user_id=user["id"],
+                    schedule=_weekly_schedule(rng),
+                    timezone="Europe/Moscow",
+                )
+
+        room_ids = [
+            writer.add(
+                Room,
+                name=f"Room {index}",
+                capacity=rng.choice((4, 6, 8, 10, 12, 20, 40)),
+                location=f"Floor {index % 10 + 1}",
+                organization_id=org_id,
+            )["id"]
+            for index in range(options.rooms)
+        ]
+
+        room_schedules: dict[UUID, list[tuple[datetime, datetime]]] = {room_id: [] for room_id in room_ids}
+
+        def pick_room(intervals: list[tuple[datetime, datetime]]) -> Optional[UUID]:
+            # Переговорка свободна на все интервалы (брони не пересекаются, как в БД)
+            for _ in range(ROOM_ATTEMPTS if room_ids else 0):
+                room_id = rng.choice(room_ids)
+                schedule = room_schedules[room_id]
+                if all(_is_free(schedule, starts_at, ends_at) for starts_at, ends_at in intervals):
+                    for interval in intervals:
+                        bisect.insort(schedule, interval)
+                    return room_id
+            return None
+
+        def pick_invitees(owner_id: UUID, department_id: Optional[UUID]) -> set[UUID]:
+            low, high = rng.choices(INVITEE_BUCKETS, INVITEE_WEIGHTS)[0]
+            wanted = rng.randint(low, high)
+            colleagues = members_by_department.get(department_id, ()) if department_id else ()
+            invitees: set[UUID] = set()
+            # Чаще приглашают коллег по отделу
+            while len(invitees) < min(wanted, len(user_ids) - 1):
+                pool = colleagues if colleagues and rng.random() < 0.7 else user_ids
+                candidate = rng.choice(pool)
+                if candidate != owner_id:
+                    invitees.add(candidate)
+            return invitees
+
+        def add_event(
+            calendar_id: UUID, owner_id: UUID, starts_at: datetime, minutes: int, invitees, room_id, **extra
+        ) -> dict:
+            event = writer.add(
+                Event,
+                calendar_id=calendar_id,
+                title=f"Meeting {rng.randrange(10**6)}",
+                starts_at=starts_at,
+                ends_at=starts_at + timedelta(minutes=minutes),
+                room_id=room_id,
+                created_at=min(starts_at, now) - timedelta(days=rng.randint(1, 14)),
+                **extra,
+            )
+            if room_id is not None:
+                writer.add(
+                    RoomReservation,
+                    event_id=event["id"],
+                    room_id=room_id,
+                    starts_at=event["starts_at"],
+                    ends_at=event["ends_at"],
+                )
+            writer.add(EventParticipant, event_id=event["id"], user_id=owner_id, response_status="accepted")
+            for user_id in invitees:
+                writer.add(
+                    EventParticipant,
+                    event_id=event["id"],
+                    user_id=user_id,
+                    response_status=rng.choices(("needs_action", "accepted", "declined"), (30, 60, 10))[0],
+                )
+                if rng.random() < options.notification_rate:
+                    writer.add(
+                        Notification,
+                        user_id=user_id,
+                        event_id=event["id"],
+                        type="event_invited",
+                        title="New event invitation",
+                        message=event["title"],
+                        is_read=event["ends_at"] < now and rng.random() < 0.8,
+                        created_at=event["created_at"],
+                    )
+            return event
+
+        for owner_id in user_ids:
+            calendar_id = writer.add(
+                Calendar,
+                name="Personal",
+                owner_id=owner_id,
+                organization_id=org_id,
+                timezone="Europe/Moscow",
+            )["id"]
+            department_id = user_departments[owner_id]
+            for _ in range(options.events_per_user):
+                starts_at = working_time(rng.randrange(period_days))
+                minutes = rng.choice(EVENT_DURATIONS)
+                invitees = pick_invitees(owner_id, department_id)
+                room_id = (
+                    pick_room([(starts_at, starts_at + timedelta(minutes=minutes))])
+                    if invitees and rng.random() < 0.4
+                    else None
+                )
+                add_event(calendar_id, owner_id, starts_at, minutes, invitees, room_id)
+            for _ in range(options.series_per_user):
+                occurrences = rng.randint(4, max(4, options.max_series_length))
+                starts_at = working_time(rng.randrange(max(period_days - occurrences * 7, 1)))
+                minutes = rng.choice(EVENT_DURATIONS)
+                invitees = pick_invitees(owner_id, department_id)
+                occurrence_starts = [starts_at + timedelta(weeks=week) for week in range(occurrences)]
+                room_id = (
+                    pick_room([(start, start + timedelta(minutes=minutes)) for start in occurrence_starts])
+                    if invitees and rng.random() < 0.4
+                    else None
+                )
+                rule = {"frequency": "weekly", "interval": 1, "count": occurrences}
+                parent = add_event(calendar_id, owner_id, starts_at, minutes, invitees, room_id, recurrence_rule=rule)
+                for occurrence_start in occurrence_starts[1:]:
+                    add_event(
+                        calendar_id,
+                        owner_id,
+                        occurrence_start,
+                        minutes,
+                        invitees,
+                        room_id,
+                        recurrence_parent_id=parent["id"],
+                    )
+
+        category_ids = [
+            writer.add(TicketCategory, name=name, sort_order=index)["id"]
+            for index, name in enumerate(("Hardware", "Software", "Access", "Network", "Facilities", "Other"))
+        ]
+        staff_ids = user_ids[: max(1, len(user_ids) // 50)]
+        for index in range(options.tickets):
+            created_at = period_start + timedelta(minutes=rng.randrange(period_days * 24 * 60))
+            if created_at > now:
+                created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 30))
+            status = rng.choices(TICKET_STATUSES, TICKET_STATUS_WEIGHTS)[0]
+            author_id = rng.choice(user_ids)
+            assignee_id = rng.choice(staff_ids) if status != "open" or rng.random() < 0.3 else None
+            done_at = created_at + timedelta(hours=rng.randint(1, 240)) if status in ("resolved", "closed") else None
+            ticket = writer.add(
+                Ticket,
+                title=f"Ticket {index}",
+                description="Synthetic ticket generated for scale testing",
+                status=status,
+                priority=rng.choices(TICKET_PRIORITIES, TICKET_PRIORITY_WEIGHTS)[0],
+                category_id=rng.choice(category_ids),
+                created_by=author_id,
+                assigned_to=assignee_id,
+                created_at=created_at,
+                updated_at=done_at or created_at,
+                first_response_at=created_at + timedelta(hours=rng.randint(1, 24)) if assignee_id else None,
+                resolved_at=done_at,
+                closed_at=done_at if status == "closed" else None,
+            )
+            writer.add(
+                TicketHistory,
+                ticket_id=ticket["id"],
+                user_id=author_id,
+                action=TicketHistoryAction.CREATED,
+                created_at=created_at,
+            )
+            if assignee_id is not None:
+                writer.add(
+                    TicketHistory,
+                    ticket_id=ticket["id"],
+                    user_id=assignee_id,
+                    action=TicketHistoryAction.ASSIGNED,
+                    field_name="assigned_to",
+                    new_value=str(assignee_id),
+                    created_at=created_at + timedelta(minutes=5),
+                )
+                writer.add(
+                    Notification,
+                    user_id=assignee_id,
+                    ticket_id=ticket["id"],
+                    type="ticket_assigned",
+                    title="Ticket assigned",
+                    message=ticket["title"],
+                    is_read=rng.random() < 0.7,
+                    created_at=created_at + timedelta(minutes=5),
+                )
+            if status != "open":
+                writer.add(
+                    TicketHistory,
+                    ticket_id=ticket["id"],
+                    user_id=assignee_id or author_id,
+                    action=TicketHistoryAction.STATUS_CHANGED,
+                    field_name="status",
+                    old_value="open",
+                    new_value=status,
+                    created_at=ticket["updated_at"],
+                )
+            for number in range(rng.randint(0, options.comments_per_ticket * 2)):
+                comment_at = created_at + timedelta(hours=number + 1)
+                writer.add(
+                    TicketComment,
+                    ticket_id=ticket["id"],
+                    user_id=assignee_id if assignee_id and number % 2 else author_id,
+                    content=f"Comment {number}",
+                    created_at=comment_at,
+                    updated_at=comment_at,
+                )
+                writer.add(
+                    TicketHistory,
+                    ticket_id=ticket["id"],
+                    user_id=assignee_id if assignee_id and number % 2 else author_id,
+                    action=TicketHistoryAction.COMMENT_ADDED,
+                    created_at=comment_at,
+                )
+
+        writer.flush()
+        return writer.counts
+
+
+def options_from_args(args: argparse.Namespace) -> DatasetOptions:
+    return DatasetOptions(**{f.name: getattr(args, f.name) for f in fields(DatasetOptions) if hasattr(args, f.name)})
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register ``DatasetOptions`` as command-line flags (shared with scripts/benchmark.py)."""
+    defaults = DatasetOptions()
+    for f in fields(DatasetOptions):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}",
+            dest=f.name,
+            type=type(getattr(defaults, f.name)),
+            default=getattr(defaults, f.name),
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-generate a seeded synthetic dataset.")
+    parser.add_argument("--database-url", default=None, help="Target database (default: DATABASE_URL from settings)")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    add_dataset_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    from sqlmodel import SQLModel
+
+    from app.db import engine, init_db
+
+    if args.reset:
+        SQLModel.metadata.drop_all(engine)
+    init_db()
+
+    started = time.perf_counter()
+    counts = generate_dataset(engine, options_from_args(args))
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"  {table:<28} {count:>10}")
+    print(f"Inserted {total} rows in {elapsed:.1f} s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Бенчмарк старта приложения на основе ``python -X importtime``.
+
+Каждый прогон — новый интерпретатор, который импортирует ``app.main`` (то же,
+что делает uvicorn в каждом воркере). Из вывода importtime берётся общее время
+импорта и самые тяжёлые модули; дополнительно проверяется, что при старте не
+загружаются модули, которые должны импортироваться лениво (Celery, pywebpush,
+Pillow). Скрипт завершается с ненулевым кодом, если медиана превышает
+``--max-ms`` или загружен запрещённый модуль, — так его можно запускать в CI.
+
+Использование:
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py --runs 10 --max-ms 3000 --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# Не должны импортироваться при старте веб-воркера
+DEFAULT_FORBIDDEN = ("celery", "kombu", "pywebpush", "PIL")
+TARGET_MODULE = "app.main"
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure app import time with python -X importtime.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest modules to print")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument(
+        "--forbid",
+        default=",".join(DEFAULT_FORBIDDEN),
+        help="Comma-separated top-level modules that must not be imported at startup (empty to disable)",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+def _import_once(env: dict) -> list[tuple[str, int, int]]:
+    """Import the app in a new interpreter; return (module, self_us, cumulative_us) rows."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET_MODULE}"],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Importing {TARGET_MODULE} failed with exit code {result.returncode}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    forbidden = {name.strip() for name in args.forbid.split(",") if name.strip()}
+
+    env = dict(os.environ)
+    # Импорт не должен трогать рабочую БД
+    env.setdefault("DATABASE_URL", f"sqlite:///{Path(tempfile.gettempdir()) / 'planner_startup.db'}")
+
+    totals_ms: list[float] = []
+    cumulative: dict[str, list[int]] = {}
+    loaded: set[str] = set()
+    for _ in range(args.runs):
+        rows = _import_once(env)
+        total = next(cumulative_us for name, _, cumulative_us in rows if name == TARGET_MODULE)
+        totals_ms.append(total / 1000)
+        for name, _, cumulative_us in rows:
+            cumulative.setdefault(name, []).append(cumulative_us)
+            loaded.add(name.split(".")[0])
+
+    median_ms = statistics.median(totals_ms)
+    heaviest = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in cumulative.items() if name != TARGET_MODULE),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+    violations = sorted(forbidden & loaded)
+
+    print(f"{TARGET_MODULE} import: median {median_ms:.0f} ms, min {min(totals_ms):.0f} ms, max {max(totals_ms):.0f} ms ({args.runs} runs)")
+    print("Heaviest modules (cumulative, median):")
+    for name, elapsed_ms in heaviest:
+        print(f"  {elapsed_ms:8.1f} ms  {name}")
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "python": sys.version.split()[0],
+                    "runs": args.runs,
+                    "median_ms": round(median_ms, 1),
+                    "totals_ms": [round(value, 1) for value in totals_ms],
+                    "heaviest": [{"module": name, "cumulative_ms": round(value, 1)} for name, value in heaviest],
+                    "forbidden_loaded": violations,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Results written to {args.output}")
+
+    failed = False
+    if violations:
+        print(f"FAIL: imported at startup: {', '.join(violations)}")
+        failed = True
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"FAIL: median import time {median_ms:.0f} ms exceeds {args.max_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())